@@ -1,93 +1,117 @@
 import os
-import yaml
+
+from ament_index_python.packages import get_package_share_directory
+from node_utils.instrumentation import Instrumentation
+from panda_fk.kinematics import matrix_to_quaternion
+from panda_fk.urdf_tree import KinematicTree
 import rclpy
 from rclpy.node import Node
-from ament_index_python.packages import get_package_share_directory
+from rclpy.qos import QoSProfile
 from sensor_msgs.msg import JointState
-from tf2_ros import TransformBroadcaster
+from tf2_msgs.msg import TFMessage
 from tf2_ros import StaticTransformBroadcaster
 from tf2_ros import TransformStamped
-from urdf_parser_py.urdf import URDF
-from robot_state_publisher.robot_state_publisher import RobotStatePublisher
- 
-package_name = "urdf_tutorial_r2d2"
-urdf_name = "r2d2.urdf.xml"
+
+package_name = 'urdf_tutorial_r2d2'
+urdf_name = 'r2d2.urdf.xml'
+
+
+def make_transform(parent, child, T):
+    t = TransformStamped()
+    t.header.frame_id = parent
+    t.child_frame_id = child
+    t.transform.translation.x = float(T[0, 3])
+    t.transform.translation.y = float(T[1, 3])
+    t.transform.translation.z = float(T[2, 3])
+    quaternion = matrix_to_quaternion(T[0:3, 0:3])
+    t.transform.rotation.x = float(quaternion[0])
+    t.transform.rotation.y = float(quaternion[1])
+    t.transform.rotation.z = float(quaternion[2])
+    t.transform.rotation.w = float(quaternion[3])
+    return t
+
 
 class DummyRobotPublisherNode(Node):
-    
+
     def __init__(self):
         super().__init__('dummy_robot_publisher_node')
- 
+
         # Get the package path where the URDF file is located
         package_path = get_package_share_directory(package_name)
- 
-        # Load the URDF file
-        with open(os.path.join(package_path, 'urdf', urdf_name), 'r') as file:
-            urdf_file = file.read()
-        self.urdf = URDF.from_xml_string(urdf_file)
- 
-        # Initialize the robot state publisher
-        self.robot_state_publisher = RobotStatePublisher(self.urdf)
- 
+
+        # Load the URDF file once into arrays (parents, origins, axes, joint types)
+        self.tree = KinematicTree.from_file(os.path.join(package_path, 'urdf', urdf_name))
+        self.movable = self.tree.movable.tolist()
+
+        # Callback latency statistics on /diagnostics (parameter instrumentation:=true)
+        self.instrumentation = Instrumentation(self)
+        self.instrumentation.instrument(self, 'joint_state_callback')
+
+        # Fixed joints never change: computed once and sent once on the latched /tf_static
+        self.static_transform_broadcaster = StaticTransformBroadcaster(self)
+        stamp = self.get_clock().now().to_msg()
+        static_transforms = [self.make_joint_transform(i) for i in self.tree.fixed.tolist()]
+        for t in static_transforms:
+            t.header.stamp = stamp
+        self.static_transform_broadcaster.sendTransform(static_transforms)
+
+        # Movable joints: one reused transform each, all sent in one TFMessage per joint state
+        self.publisher = self.create_publisher(TFMessage, '/tf', QoSProfile(depth=100))
+        self.tf_message = TFMessage(
+            transforms=[self.make_joint_transform(i) for i in self.movable])
+        self.q = self.tree.joint_vector([], [])
+
         # Initialize the joint states subscriber
         self.joint_state_subscriber = self.create_subscription(
             JointState,
             'joint_states',
             self.joint_state_callback,
             10)
- 
-        # Initialize the transform broadcaster
-        self.transform_broadcaster = TransformBroadcaster(self)
-        self.static_transform_broadcaster = StaticTransformBroadcaster(self)
- 
+
+        self.get_logger().info(
+            f'{len(static_transforms)} fixed joints on /tf_static, '
+            f"movable: {', '.join(self.tree.variable_names)}")
+
+    def make_joint_transform(self, i):
+        """Transform of link i in its parent link at the joint origin."""
+        return make_transform(self.tree.link_names[self.tree.parent[i]], self.tree.link_names[i],
+                              self.tree.origins[i])
+
     def joint_state_callback(self, msg):
-        # Update the robot state publisher with the current joint states
-        self.robot_state_publisher.publish_joint_state(msg)
- 
-        # Publish the transforms for each link in the URDF
-        for link_name in self.urdf.link_map.keys():
-            if link_name != self.urdf.get_root():
-                tf = self.robot_state_publisher.get_link_transform(link_name)
-                transform_stamped = TransformStamped()
-                transform_stamped.header.stamp = self.get_clock().now().to_msg()
-                transform_stamped.header.frame_id = self.urdf.get_root()
-                transform_stamped.child_frame_id = link_name
-                transform_stamped.transform.translation.x = tf.translation.x
-                transform_stamped.transform.translation.y = tf.translation.y
-                transform_stamped.transform.translation.z = tf.translation.z
-                transform_stamped.transform.rotation.x = tf.rotation.x
-                transform_stamped.transform.rotation.y = tf.rotation.y
-                transform_stamped.transform.rotation.z = tf.rotation.z
-                transform_stamped.transform.rotation.w = tf.rotation.w
-                self.transform_broadcaster.sendTransform(transform_stamped)
- 
-        # Publish the static transforms in the URDF
-        for joint_name, joint in self.urdf.joint_map.items():
-            if joint.type != 'fixed':
-                continue
-            parent_link = self.urdf.get_joint(joint_name).parent
-            child_link = self.urdf.get_joint(joint_name).child
-            parent_frame_id = parent_link
-            child_frame_id = child_link
-            transform_stamped = TransformStamped()
-            transform_stamped.header.stamp = self.get_clock().now().to_msg()
-            transform_stamped.header.frame_id = parent_frame_id
-            transform_stamped.child_frame_id = child_frame_id
-            transform_stamped.transform.translation.x = joint.origin.xyz[0]
-            transform_stamped.transform.translation.y = joint.origin.xyz[1]
-            transform_stamped.transform.translation.z = joint.origin.xyz[2]
-            transform_stamped.transform.rotation.x = joint.origin.rpy[0]
-            transform_stamped.transform.rotation.y = joint.origin.rpy[1]
-            transform_stamped.transform.rotation.z = joint.origin.rpy[2]
-            transform_stamped.transform.rotation.w = 1.0
-            self.static_transform_broadcaster.sendTransform(transform_stamped)
- 
+        # Stamp with the sample time so lookups line up with the joint data
+        stamp = msg.header.stamp
+        if stamp.sec == 0 and stamp.nanosec == 0:
+            stamp = self.get_clock().now().to_msg()
+
+        # Joints missing from the message keep their last position
+        self.tree.joint_vector(msg.name, msg.position, out=self.q)
+        # Only the movable joints, the fixed ones went to /tf_static
+        local = self.tree.local_transforms(self.q, self.movable)
+
+        for t, T in zip(self.tf_message.transforms, local):
+            quaternion = matrix_to_quaternion(T[0:3, 0:3])
+            t.header.stamp = stamp
+            t.transform.translation.x = float(T[0, 3])
+            t.transform.translation.y = float(T[1, 3])
+            t.transform.translation.z = float(T[2, 3])
+            t.transform.rotation.x = float(quaternion[0])
+            t.transform.rotation.y = float(quaternion[1])
+            t.transform.rotation.z = float(quaternion[2])
+            t.transform.rotation.w = float(quaternion[3])
+        self.publisher.publish(self.tf_message)
+
+    def destroy_node(self):
+        self.instrumentation.destroy()
+        super().destroy_node()
+
+
 def main(args=None):
     rclpy.init(args=args)
-    node = RobotStatePublisherNode()
+    node = DummyRobotPublisherNode()
     rclpy.spin(node)
     node.destroy_node()
     rclpy.shutdown()
- 
+
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
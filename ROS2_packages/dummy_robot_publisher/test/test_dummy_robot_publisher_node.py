@@ -0,0 +1,72 @@
+# The fixed R2D2 joints go once to /tf_static, every joint state publishes
+# the movable joints in one TFMessage (needs a ROS 2 environment).
+
+import numpy as np
+from panda_fk.kinematics import matrix_to_quaternion
+import pytest
+
+rclpy = pytest.importorskip('rclpy')
+from sensor_msgs.msg import JointState  # noqa: E402
+
+from dummy_robot_publisher import dummy_robot_publisher_node  # noqa: E402, I100
+
+
+class FakeStaticBroadcaster(object):
+
+    def __init__(self, node):
+        self.sent = []
+
+    def sendTransform(self, transforms):  # noqa: N802
+        self.sent.append(transforms)
+
+
+@pytest.fixture
+def node(monkeypatch):
+    monkeypatch.setattr(dummy_robot_publisher_node, 'StaticTransformBroadcaster',
+                        FakeStaticBroadcaster)
+    rclpy.init()
+    node = dummy_robot_publisher_node.DummyRobotPublisherNode()
+    yield node
+    node.destroy_node()
+    rclpy.shutdown()
+
+
+def pose(t):
+    return ([t.transform.translation.x, t.transform.translation.y, t.transform.translation.z],
+            [t.transform.rotation.x, t.transform.rotation.y, t.transform.rotation.z,
+             t.transform.rotation.w])
+
+
+def test_fixed_joints_are_sent_once_on_tf_static(node):
+    (static_transforms,) = node.static_transform_broadcaster.sent
+    assert sorted(t.child_frame_id for t in static_transforms) == ['box', 'leg1', 'leg2']
+
+    published = []
+    node.publisher.publish = published.append
+    for _ in range(3):
+        node.joint_state_callback(JointState(name=['tilt'], position=[0.1]))
+    assert len(node.static_transform_broadcaster.sent) == 1
+    assert len(published) == 3
+
+
+def test_movable_joints_in_one_tf_message(node):
+    published = []
+    node.publisher.publish = published.append
+
+    msg = JointState(name=['swivel', 'tilt', 'periscope'], position=[0.4, -0.3, 0.1])
+    msg.header.stamp.sec = 12
+    node.joint_state_callback(msg)
+
+    (tf_message,) = published
+    tree = node.tree
+    assert [t.child_frame_id for t in tf_message.transforms] == [
+        tree.link_names[i] for i in tree.movable]
+    poses = tree.fk(tree.joint_vector(msg.name, msg.position))
+    for t in tf_message.transforms:
+        assert t.header.stamp.sec == 12
+        i = tree.link_index[t.child_frame_id]
+        assert t.header.frame_id == tree.link_names[tree.parent[i]]
+        expected = np.linalg.inv(poses[tree.parent[i]]) @ poses[i]
+        translation, rotation = pose(t)
+        np.testing.assert_allclose(translation, expected[0:3, 3], atol=1e-12)
+        np.testing.assert_allclose(rotation, matrix_to_quaternion(expected[0:3, 0:3]), atol=1e-9)
@@ -5,6 +5,8 @@ import rclpy
 from rclpy.node import Node
 from dummy_control_msgs.msg import DummyControlDebug
 from sensor_msgs.msg import JointState
+from node_utils.instrumentation import Instrumentation
+from node_utils.latest_wins import CoalescingSubscription
 import yaml 
 
 # pinocchio API:
@@ -44,21 +46,27 @@ class MeshcatVisualizerNode(Node):
             sys.exit(0)
 
 
+        # Maximum rendering rate, only the newest message is rendered (0 = no limit)
+        self.declare_parameter("max_rate", 30.0)
+        max_rate = self.get_parameter("max_rate").get_parameter_value().double_value
+
+        # Callback latency statistics on /diagnostics (parameter instrumentation:=true)
+        self.instrumentation = Instrumentation(self)
+        self.instrumentation.instrument(self, "dummy_listener_callback", "joint_listener_callback", "update")
+
         if topic_source == "/my_topic":
             # Create /my_topic subscriber
-            self.subscription = self.create_subscription(
-                DummyControlDebug, "/mytopic", self.dummy_listener_callback, 10
+            self.subscription = CoalescingSubscription(
+                self, DummyControlDebug, "/mytopic", self.dummy_listener_callback, max_rate
             )
-            self.subscription  # prevent unused variable warning
             # Call subsriber
             self.last_dummy = DummyControlDebug()
         
         else:
             # Create /joint_states subscriber
-            self.subscription = self.create_subscription(
-                JointState, "/joint_states", self.joint_listener_callback, 10
+            self.subscription = CoalescingSubscription(
+                self, JointState, "/joint_states", self.joint_listener_callback, max_rate
             )
-            self.subscription  # prevent unused variable warning
             # Call subsriber
             self.last_joint = JointState()
 
@@ -107,8 +115,6 @@ class MeshcatVisualizerNode(Node):
         self.create_axes("reference")
         self.create_axes("ee")
         self.viz.viewer["AXES"]["reference"].set_transform(tf.translation_matrix(np.array([0.5, - 0.5, 0])))
-        # Time for updating frequency
-        self.frame_count = 0
         self.ee_info_counter = 0
 
     # Callback function for /mytopic
@@ -118,20 +124,16 @@ class MeshcatVisualizerNode(Node):
 
     # Callback function for /joint_states
     def joint_listener_callback(self, msg):
-        self.frame_count += 1
-        if self.frame_count == 5:
-            self.last_joint
-            self.last_joint = msg
-            names = msg.name
-            positions = msg.position
-            out = []
-            for name, pos in zip(names, positions):
-                if "panda_joint" in name:
-                    out.append((name, pos))
-            out.sort(key=lambda x: x[0])
-            out_positions = [np[1] for np in out]
-            self.update(out_positions)
-            self.frame_count = 0
+        self.last_joint = msg
+        names = msg.name
+        positions = msg.position
+        out = []
+        for name, pos in zip(names, positions):
+            if "panda_joint" in name:
+                out.append((name, pos))
+        out.sort(key=lambda x: x[0])
+        out_positions = [np[1] for np in out]
+        self.update(out_positions)
 
     # Function for creating Axes for panda joints
     def create_axes(self, joint_name):
@@ -257,6 +259,12 @@ class MeshcatVisualizerNode(Node):
             self.ee_info_counter == 0
         '''
 
+    def destroy_node(self):
+        self.subscription.destroy()
+        self.instrumentation.destroy()
+        super().destroy_node()
+
+
 def main():
     rclpy.init()
     node = MeshcatVisualizerNode()
@@ -10,6 +10,8 @@ import meshcat
 import meshcat.geometry as g
 import meshcat.transformations as tf
 import meshcat_shapes
+# Playback at the recorded timestamps
+from node_utils.playback import PlaybackScheduler
 
 # Path to Waypoint CSV
 traces_csv_path = "/home/ros/dumps/saved/Waypointleft/q.csv"
@@ -97,9 +99,6 @@ viz.displayCollisions(DISPLAY_COLLISIONS)
 viz.displayVisuals(DISPLAY_VISUALS)
 
 
-start_trace_time = trace_list[0][0]
-
-step = 0.02 
 
 def create_text():
     # Create reference frame
@@ -148,78 +147,58 @@ def create_text():
         viz.viewer["world"]["reference"]["angle"].set_transform(t_matrix_angle)
         viz.viewer["world"]["reference"]["axis"].set_transform(t_matrix_axis)
 
-while True:
-
-    trace_ndx = 0
-    last_trace_ndx = None
-    render_time = 0
-
-    while trace_ndx < len(trace_list):
-
-        # Find row that will be displayed    
-        while True:
-            if trace_ndx >= len(trace_list):
-                break
-            time_from_start_s = (trace_list[trace_ndx][0] - start_trace_time) / 1e9
-
-            if time_from_start_s < render_time:
-                trace_ndx += 1
-
-            else:
-                last_trace_ndx = trace_ndx
-                trace_ndx += 1
-                break
-
-        if last_trace_ndx is not None:
-            trace = trace_list[last_trace_ndx]
-            # display it            
-            # Find the index of this trace
-            print(f"Displaying Trace {last_trace_ndx}")
-            q2 = trace
-
-            # Change q vector to this trace
-            for fname, fvalue in zip(names_list, q2):
-                if fname != "time_ns":
-                    q[joint_indices_dict[fname]] = fvalue
-
-            # Update model using pinocchio forward kinematics
-            pin.forwardKinematics(model, viz.data, q)
-            pin.updateFramePlacements(model, viz.data)
-            
-            # Update Trace Label
-            meshcat_shapes.textarea(viz.viewer["world"]["label"], f"Trace{last_trace_ndx}", font_size=20)
-            t_matrix = tf.translation_matrix(np.array([0, -0.66, 0]))
-            viz.viewer["world"]["label"].set_transform(t_matrix)
-            
-            # Update position of Joint labels and Joint frames
-            for frame, oMf in zip(model.frames, data.oMf):
-                # Joints
-                if str(frame.type) == "JOINT":
-                    meshcat_shapes.textarea(viz.viewer[frame.name]["name"], f"{frame.name}", font_size=10)
-                    meshcat_shapes.frame(viz.viewer[frame.name]["frame"],axis_length=0.2, axis_thickness=0.01, opacity=0.8, origin_radius=0.02)
-                    t_matrix_name = tf.translation_matrix(oMf.translation + np.array([0, -0.25, 0]))
-                    t_matrix_frame = tf.translation_matrix(oMf.translation)
-                    r_matrix_frame = oMf.rotation
-                    t_matrix_frame[0:3, 0:3] = r_matrix_frame
-                    viz.viewer[frame.name]["name"].set_transform(t_matrix_name)
-                    viz.viewer[frame.name]["frame"].set_transform(t_matrix_frame)
-                # EE
-                if str(frame.name) == "panda_hand_tcp":
-                    meshcat_shapes.textarea(viz.viewer[frame.name]["name"], f"{frame.name}", font_size=10)
-                    meshcat_shapes.frame(viz.viewer[frame.name]["frame"],axis_length=0.2, axis_thickness=0.01, opacity=0.8, origin_radius=0.02)
-                    t_matrix_name = tf.translation_matrix(oMf.translation + np.array([0, -0.25, 0]))
-                    t_matrix_frame = tf.translation_matrix(oMf.translation)
-                    r_matrix_frame = oMf.rotation
-                    t_matrix_frame[0:3, 0:3] = r_matrix_frame
-                    viz.viewer[frame.name]["name"].set_transform(t_matrix_name)
-                    viz.viewer[frame.name]["frame"].set_transform(t_matrix_frame)
-
-            create_text()
-            viz.display(q)
-            time.sleep(step)
-        render_time += step * speed_coefficient
-        
-    if repeat:     
-        continue
-    else:
-        exit()
\ No newline at end of file
+# Traces are shown at their recorded time_ns, speed_coefficient times faster; when rendering is slower than the
+# traces, late ones are skipped so playback stays in real time
+scheduler = PlaybackScheduler([trace[0] for trace in trace_list], rate=speed_coefficient, loop=repeat)
+
+for last_trace_ndx in scheduler:
+    trace = trace_list[last_trace_ndx]
+    # display it            
+    # Find the index of this trace
+    print(f"Displaying Trace {last_trace_ndx}")
+    q2 = trace
+
+    # Change q vector to this trace
+    for fname, fvalue in zip(names_list, q2):
+        if fname != "time_ns":
+            q[joint_indices_dict[fname]] = fvalue
+
+    # Update model using pinocchio forward kinematics
+    pin.forwardKinematics(model, viz.data, q)
+    pin.updateFramePlacements(model, viz.data)
+    
+    # Update Trace Label
+    meshcat_shapes.textarea(viz.viewer["world"]["label"], f"Trace{last_trace_ndx}", font_size=20)
+    t_matrix = tf.translation_matrix(np.array([0, -0.66, 0]))
+    viz.viewer["world"]["label"].set_transform(t_matrix)
+    
+    # Update position of Joint labels and Joint frames
+    for frame, oMf in zip(model.frames, data.oMf):
+        # Joints
+        if str(frame.type) == "JOINT":
+            meshcat_shapes.textarea(viz.viewer[frame.name]["name"], f"{frame.name}", font_size=10)
+            meshcat_shapes.frame(viz.viewer[frame.name]["frame"],axis_length=0.2, axis_thickness=0.01, opacity=0.8, origin_radius=0.02)
+            t_matrix_name = tf.translation_matrix(oMf.translation + np.array([0, -0.25, 0]))
+            t_matrix_frame = tf.translation_matrix(oMf.translation)
+            r_matrix_frame = oMf.rotation
+            t_matrix_frame[0:3, 0:3] = r_matrix_frame
+            viz.viewer[frame.name]["name"].set_transform(t_matrix_name)
+            viz.viewer[frame.name]["frame"].set_transform(t_matrix_frame)
+        # EE
+        if str(frame.name) == "panda_hand_tcp":
+            meshcat_shapes.textarea(viz.viewer[frame.name]["name"], f"{frame.name}", font_size=10)
+            meshcat_shapes.frame(viz.viewer[frame.name]["frame"],axis_length=0.2, axis_thickness=0.01, opacity=0.8, origin_radius=0.02)
+            t_matrix_name = tf.translation_matrix(oMf.translation + np.array([0, -0.25, 0]))
+            t_matrix_frame = tf.translation_matrix(oMf.translation)
+            r_matrix_frame = oMf.rotation
+            t_matrix_frame[0:3, 0:3] = r_matrix_frame
+            viz.viewer[frame.name]["name"].set_transform(t_matrix_name)
+            viz.viewer[frame.name]["frame"].set_transform(t_matrix_frame)
+
+    create_text()
+    viz.display(q)
+
+    if scheduler.frames % 100 == 0:
+        print(scheduler.summary())
+
+print(scheduler.summary())
@@ -0,0 +1,270 @@
+"""Per-callback latency instrumentation for the ROS 2 nodes.
+
+Every instrumented callback records its wall time and, if the message has a
+header, the message age (receive time minus header.stamp) in log-linear
+histograms, together with the number of calls. Summaries are published as
+diagnostic_msgs/DiagnosticArray on /diagnostics and logged on shutdown.
+
+Instrumentation is off unless the node parameter `instrumentation` is true.
+When it is off, wrap() returns the callback itself, so nothing is added to the
+call path:
+
+    self.instrumentation = Instrumentation(self)
+    # before the callbacks are handed to create_subscription / create_timer
+    self.instrumentation.instrument(self, "listener_callback", "update")
+
+    ros2 run panda_fk panda_fk_node --ros-args -p instrumentation:=true
+"""
+import functools
+import time
+
+NS_PER_US = 1000
+NS_PER_MS = 1000 * 1000
+NS_PER_S = 1000 * 1000 * 1000
+
+
+class LatencyHistogram(object):
+    """HDR-style histogram of non-negative integer values (nanoseconds).
+
+    Values below 2**sub_bucket_bits are counted exactly. Above that every
+    power-of-two range is split into 2**(sub_bucket_bits - 1) buckets, so a
+    reported percentile is within 2**-(sub_bucket_bits - 1) of the true value
+    (1.6% for the default 7 bits). Recording is a bit_length, a shift and a
+    list increment, memory is fixed by highest_value.
+    """
+
+    def __init__(self, highest_value=60 * NS_PER_S, sub_bucket_bits=7):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count >> 1
+        self.highest_value = highest_value
+        self.counts = [0] * (self.index_of(highest_value) + 1)
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def index_of(self, value):
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return shift * self.half_count + (value >> shift)
+
+    def value_at_index(self, index):
+        """Return the highest value counted in the bucket at index."""
+        if index < self.sub_bucket_count:
+            return index
+        shift = index // self.half_count - 1
+        mantissa = index - shift * self.half_count
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value):
+        if value < 0:
+            value = 0
+        if value > self.highest_value:
+            # Clamped into the last bucket, min/max/mean still see the true value
+            self.counts[-1] += 1
+        else:
+            self.counts[self.index_of(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """Return the value below which p percent of the recorded values fall (0 if empty)."""
+        if self.count == 0:
+            return 0
+        target = max(1, int(round(self.count * p / 100.0)))
+        seen = 0
+        for index, n in enumerate(self.counts[:-1]):
+            seen += n
+            if seen >= target:
+                return min(self.value_at_index(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count > 0 else 0.0
+
+
+class CallbackStats(object):
+    """Call count, wall time and message age of one callback."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.wall = LatencyHistogram()
+        self.age = LatencyHistogram()
+        self.last_calls = 0
+        self.last_time = time.monotonic()
+
+    def summary(self):
+        """Return (key, value) pairs in microseconds (wall time) and milliseconds (message age)."""
+        now = time.monotonic()
+        elapsed = now - self.last_time
+        rate = (self.calls - self.last_calls) / elapsed if elapsed > 0.0 else 0.0
+        self.last_calls = self.calls
+        self.last_time = now
+
+        values = [
+            ('calls', str(self.calls)),
+            ('errors', str(self.errors)),
+            ('rate_hz', f'{rate:.1f}'),
+            ('wall_mean_us', f'{self.wall.mean() / NS_PER_US:.1f}'),
+        ]
+        for p in (50, 90, 99):
+            values.append((f'wall_p{p}_us', f'{self.wall.percentile(p) / NS_PER_US:.1f}'))
+        values.append(('wall_max_us', f'{(self.wall.max or 0) / NS_PER_US:.1f}'))
+        if self.age.count > 0:
+            for p in (50, 99):
+                values.append((f'age_p{p}_ms', f'{self.age.percentile(p) / NS_PER_MS:.3f}'))
+            values.append(('age_max_ms', f'{self.age.max / NS_PER_MS:.3f}'))
+        return values
+
+
+def header_stamp_ns(msg):
+    """Return header.stamp of msg in nanoseconds, None for messages without a (set) stamp."""
+    header = getattr(msg, 'header', None)
+    if header is None:
+        return None
+    stamp_ns = header.stamp.sec * NS_PER_S + header.stamp.nanosec
+    return stamp_ns if stamp_ns > 0 else None
+
+
+class Instrumentation(object):
+    """Callback latency statistics of a node, published on a diagnostics topic.
+
+    Parameters declared on the node:
+        instrumentation         enable (default False)
+        instrumentation_period  seconds between DiagnosticArray messages (default 5.0)
+    """
+
+    def __init__(self, node, topic='/diagnostics'):
+        self.node = node
+        self.stats = {}
+        self.extra = {}
+        self.dumped = False
+
+        node.declare_parameter('instrumentation', False)
+        node.declare_parameter('instrumentation_period', 5.0)
+        self.enabled = node.get_parameter('instrumentation').get_parameter_value().bool_value
+        if not self.enabled:
+            return
+
+        from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+        self.DiagnosticArray = DiagnosticArray
+        self.DiagnosticStatus = DiagnosticStatus
+        self.KeyValue = KeyValue
+
+        # Header stamps follow the node clock, time.time_ns() is cheaper when that is the
+        # system clock
+        if node.get_parameter('use_sim_time').get_parameter_value().bool_value:
+            clock = node.get_clock()
+            self.now_ns = lambda: clock.now().nanoseconds
+        else:
+            self.now_ns = time.time_ns
+
+        period = node.get_parameter('instrumentation_period').get_parameter_value().double_value
+        self.publisher = node.create_publisher(DiagnosticArray, topic, 10)
+        self.timer = node.create_timer(period, self.publish)
+        # Also covers Ctrl+C, where destroy_node() is usually never reached
+        node.context.on_shutdown(self.dump)
+        node.get_logger().info(
+            f'Callback instrumentation enabled, summaries on {topic} every {period:.1f} s')
+
+    def wrap(self, callback, name=None):
+        """Return callback measured under name, or callback itself when instrumentation is off."""
+        if not self.enabled:
+            return callback
+        name = name or getattr(callback, '__name__', repr(callback))
+        stats = self.stats.setdefault(name, CallbackStats(name))
+        now_ns = self.now_ns
+        perf_counter_ns = time.perf_counter_ns
+
+        @functools.wraps(callback)
+        def instrumented(*args):
+            if args:
+                stamp_ns = header_stamp_ns(args[0])
+                if stamp_ns is not None:
+                    stats.age.record(now_ns() - stamp_ns)
+            start = perf_counter_ns()
+            try:
+                return callback(*args)
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                stats.wall.record(perf_counter_ns() - start)
+                stats.calls += 1
+
+        return instrumented
+
+    def instrument(self, obj, *names):
+        """Replace the methods names of obj with measured versions (no-op when off).
+
+        Must run before the bound methods are passed to create_subscription()
+        or create_timer(), which keep a reference to the original.
+        """
+        if not self.enabled:
+            return
+        for name in names:
+            setattr(obj, name, self.wrap(getattr(obj, name), name))
+
+    def add_status(self, name, values):
+        """Report values() - a dict of counters or similar - under name next to the callbacks."""
+        if self.enabled:
+            self.extra[name] = values
+
+    def statuses(self):
+        DiagnosticStatus = self.DiagnosticStatus
+        statuses = []
+        for stats in self.stats.values():
+            status = DiagnosticStatus()
+            status.level = DiagnosticStatus.OK if stats.errors == 0 else DiagnosticStatus.WARN
+            status.name = f'{self.node.get_name()}: {stats.name}'
+            status.hardware_id = self.node.get_fully_qualified_name()
+            status.message = f'{stats.calls} calls'
+            status.values = [self.KeyValue(key=key, value=value) for key, value in stats.summary()]
+            statuses.append(status)
+        for name, values in self.extra.items():
+            status = DiagnosticStatus()
+            status.level = DiagnosticStatus.OK
+            status.name = f'{self.node.get_name()}: {name}'
+            status.hardware_id = self.node.get_fully_qualified_name()
+            status.values = [self.KeyValue(key=key, value=str(value))
+                             for key, value in values().items()]
+            statuses.append(status)
+        return statuses
+
+    def publish(self):
+        msg = self.DiagnosticArray()
+        msg.header.stamp = self.node.get_clock().now().to_msg()
+        msg.status = self.statuses()
+        self.publisher.publish(msg)
+
+    def dump(self):
+        """Log the summary of every callback, once."""
+        if not self.enabled or self.dumped:
+            return
+        self.dumped = True
+        for stats in self.stats.values():
+            values = ' '.join(f'{key}={value}' for key, value in stats.summary()
+                              if key != 'rate_hz')
+            self.node.get_logger().info(f'{stats.name}: {values}')
+        for name, values in self.extra.items():
+            text = ' '.join(f'{key}={value}' for key, value in values().items())
+            self.node.get_logger().info(f'{name}: {text}')
+
+    def destroy(self):
+        if not self.enabled:
+            return
+        self.dump()
+        self.node.destroy_timer(self.timer)
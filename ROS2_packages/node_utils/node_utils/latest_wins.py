@@ -0,0 +1,105 @@
+"""Latest-wins message coalescing for high-rate subscriptions.
+
+The subscription callback only stores the newest message, a worker thread
+processes it at most max_rate times per second. When processing is slower
+than the publish rate, the messages in between are skipped (and counted)
+instead of piling up in the subscription queue.
+"""
+import threading
+import time
+import traceback
+
+
+class LatestMessage(object):
+    """Single-slot buffer that keeps only the newest message."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.msg = None
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+
+    def put(self, msg):
+        with self.condition:
+            if self.msg is not None:
+                # The previous message was never processed
+                self.dropped += 1
+            self.msg = msg
+            self.received += 1
+            self.condition.notify()
+
+    def take(self, timeout=None):
+        """Return the newest message and empty the slot, None if nothing arrived within timeout."""
+        with self.condition:
+            if self.msg is None:
+                self.condition.wait(timeout)
+            msg = self.msg
+            self.msg = None
+            if msg is not None:
+                self.processed += 1
+            return msg
+
+    def stats(self):
+        return {'received': self.received, 'processed': self.processed, 'dropped': self.dropped}
+
+
+class CoalescingSubscription(object):
+    """Subscription whose callback runs on a worker thread with the newest message only.
+
+    Example:
+
+        self.joint_states = CoalescingSubscription(
+            self, JointState, '/joint_states', self.joint_state_callback, max_rate=100.0)
+
+    max_rate <= 0 processes as fast as the callback allows.
+    """
+
+    def __init__(self, node, msg_type, topic, callback, max_rate=0.0, qos_profile=10):
+        self.node = node
+        self.topic = topic
+        self.callback = callback
+        self.period = 1.0 / max_rate if max_rate > 0.0 else 0.0
+        self.slot = LatestMessage()
+        self.running = True
+
+        self.subscription = node.create_subscription(msg_type, topic, self.slot.put, qos_profile)
+        self.worker = threading.Thread(
+            target=self.run, name=f"coalesce{topic.replace('/', '_')}", daemon=True)
+        self.worker.start()
+
+    def run(self):
+        last_start = None
+        while self.running:
+            # Keep at most max_rate calls per second, newer messages replace the stored one
+            # meanwhile
+            if self.period > 0.0 and last_start is not None:
+                delay = last_start + self.period - time.monotonic()
+                if delay > 0.0:
+                    time.sleep(delay)
+            msg = self.slot.take(timeout=0.1)
+            if msg is None:
+                continue
+            last_start = time.monotonic()
+            try:
+                self.callback(msg)
+            except Exception:
+                # The worker keeps running, the traceback is the only trace of the failure
+                self.node.get_logger().error(
+                    f'{self.topic} callback failed:\n{traceback.format_exc()}')
+
+    @property
+    def dropped(self):
+        return self.slot.dropped
+
+    def stats(self):
+        return self.slot.stats()
+
+    def destroy(self):
+        self.running = False
+        self.worker.join(timeout=1.0)
+        self.node.destroy_subscription(self.subscription)
+        stats = self.stats()
+        self.node.get_logger().info(
+            f"{self.topic}: received {stats['received']}, processed {stats['processed']}, "
+            f"dropped {stats['dropped']}")
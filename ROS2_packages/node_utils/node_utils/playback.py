@@ -0,0 +1,194 @@
+"""Real-time playback of timestamped frames (bag messages, recorded trajectories).
+
+The scheduler maps the recorded timestamps onto a monotonic clock: frame i is
+due rate-times faster than recorded, relative to when playback started. When
+rendering falls behind, the frames that are already late are skipped (and
+counted) and the newest due frame is played, so the timeline keeps real time
+instead of stretching by the rendering time.
+
+    scheduler = PlaybackScheduler(timestamps_ns, rate=2.0, loop=True)
+    for i in scheduler:
+        render(i)
+    print(scheduler.summary())
+
+pause(), resume(), set_rate() and seek() may be called from another thread,
+e.g. a keyboard handler.
+"""
+import bisect
+import threading
+import time
+
+from node_utils.instrumentation import LatencyHistogram, NS_PER_S
+
+PAUSE_POLL = 0.05
+
+
+class PlaybackScheduler(object):
+    """
+    Iterating yields the index of the frame to render next, see the module docstring. Playback
+    begins with frame start, loops go back to it.
+    """
+
+    def __init__(self, timestamps, rate=1.0, loop=False, start=0, clock=time.monotonic,
+                 sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError(f'Playback rate must be positive, got {rate}')
+        self.timestamps = [int(t) for t in timestamps]
+        if not 0 <= start < len(self.timestamps):
+            raise ValueError(f'Start frame {start} is not one of {len(self.timestamps)} frames')
+        self.rate = rate
+        self.loop = loop
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.start = start
+        self.position = start
+        self.position_origin = start
+        self.origin = None
+        self.paused_at = None
+        self.stopped = False
+
+        self.frames = 0
+        self.dropped = 0
+        self.passes = 0
+        self.started = None
+        self.ended = None
+        self.paused_time = 0.0
+        self.lateness = LatencyHistogram()
+
+    def due(self, i):
+        """Clock time at which frame i is played."""
+        elapsed = (self.timestamps[i] - self.timestamps[self.position_origin]) / NS_PER_S
+        return self.origin + elapsed / self.rate
+
+    def anchor(self, position, now):
+        """Play frame position at now."""
+        self.position = position
+        self.position_origin = position
+        self.origin = now
+
+    def media_time(self, now):
+        """Recorded timestamp playing at clock time now."""
+        return self.timestamps[self.position_origin] + (now - self.origin) * self.rate * NS_PER_S
+
+    def pause(self):
+        with self.lock:
+            if self.paused_at is None:
+                self.paused_at = self.clock()
+
+    def resume(self):
+        with self.lock:
+            if self.paused_at is not None:
+                paused = self.clock() - self.paused_at
+                if self.origin is not None:
+                    self.origin += paused
+                if self.started is not None:
+                    self.paused_time += paused
+                self.paused_at = None
+
+    def toggle(self):
+        if self.paused_at is None:
+            self.pause()
+        else:
+            self.resume()
+
+    @property
+    def paused(self):
+        return self.paused_at is not None
+
+    def set_rate(self, rate):
+        """Change the rate without a jump in the timeline."""
+        if rate <= 0:
+            raise ValueError(f'Playback rate must be positive, got {rate}')
+        with self.lock:
+            if self.origin is not None:
+                now = self.paused_at if self.paused_at is not None else self.clock()
+                media = self.media_time(now)
+                self.rate = rate
+                elapsed = (media - self.timestamps[self.position_origin]) / NS_PER_S
+                self.origin = now - elapsed / rate
+            else:
+                self.rate = rate
+
+    def seek(self, position):
+        """Continue with frame position."""
+        with self.lock:
+            position = min(max(position, 0), len(self.timestamps) - 1)
+            if self.origin is None:
+                self.position = position
+            else:
+                now = self.paused_at if self.paused_at is not None else self.clock()
+                self.anchor(position, now)
+
+    def stop(self):
+        self.stopped = True
+
+    def __iter__(self):
+        if not self.timestamps:
+            return
+        try:
+            yield from self.play()
+        finally:
+            self.ended = self.clock()
+
+    def play(self):
+        self.ended = None
+        while not self.stopped:
+            with self.lock:
+                paused = self.paused_at is not None
+                if not paused:
+                    now = self.clock()
+                    if self.origin is None:
+                        self.anchor(self.position, now)
+                        self.started = now
+                    if self.position >= len(self.timestamps):
+                        self.passes += 1
+                        if not self.loop:
+                            break
+                        self.anchor(self.start, now)
+                    due = self.due(self.position)
+            if paused:
+                self.sleep(PAUSE_POLL)
+                continue
+            if now < due:
+                # Short sleeps, so pause, seek and rate changes apply while waiting for a distant
+                # frame
+                self.sleep(min(due - now, PAUSE_POLL))
+                continue
+
+            with self.lock:
+                # Newest frame that is due, the ones before it are late and skipped
+                newest = bisect.bisect_right(self.timestamps, self.media_time(now)) - 1
+                i = min(max(newest, self.position), len(self.timestamps) - 1)
+                self.dropped += i - self.position
+                self.lateness.record(int((now - self.due(i)) * NS_PER_S))
+                self.position = i + 1
+            self.frames += 1
+            yield i
+
+    @property
+    def fps(self):
+        """Frames per second of playing time, pauses excluded."""
+        if self.started is None:
+            return 0.0
+        now = self.ended if self.ended is not None else self.clock()
+        elapsed = now - self.started - self.paused_time
+        if self.paused_at is not None and self.ended is None:
+            elapsed -= now - self.paused_at
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'dropped': self.dropped,
+            'passes': self.passes,
+            'fps': self.fps,
+            'lateness_p50_ms': self.lateness.percentile(50) / 1e6,
+            'lateness_p99_ms': self.lateness.percentile(99) / 1e6,
+            'lateness_max_ms': (self.lateness.max or 0) / 1e6}
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['frames']} frames, {stats['dropped']} dropped, {stats['fps']:.1f} fps, "
+                f"lateness p50 {stats['lateness_p50_ms']:.1f} ms "
+                f"p99 {stats['lateness_p99_ms']:.1f} ms max {stats['lateness_max_ms']:.1f} ms")
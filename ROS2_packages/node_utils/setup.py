@@ -0,0 +1,25 @@
+from setuptools import setup
+
+package_name = 'node_utils'
+
+setup(
+    name=package_name,
+    version='0.0.0',
+    packages=[package_name],
+    data_files=[
+        ('share/ament_index/resource_index/packages',
+            ['resource/' + package_name]),
+        ('share/' + package_name, ['package.xml']),
+    ],
+    install_requires=['setuptools'],
+    zip_safe=True,
+    maintainer='julius',
+    maintainer_email='julius@todo.todo',
+    description='Shared helpers for the RoboDemos ROS 2 nodes',
+    license='Apache 2.0',
+    tests_require=['pytest'],
+    entry_points={
+        'console_scripts': [
+        ],
+    },
+)
@@ -0,0 +1,46 @@
+import random
+
+from node_utils.instrumentation import LatencyHistogram
+
+
+def test_small_values_are_exact():
+    hist = LatencyHistogram()
+    for value in range(100):
+        hist.record(value)
+    assert hist.count == 100
+    assert hist.min == 0
+    assert hist.max == 99
+    assert hist.percentile(50) == 49
+    assert hist.percentile(100) == 99
+
+
+def test_bucket_bounds_are_contiguous():
+    hist = LatencyHistogram(highest_value=10 ** 6)
+    previous = -1
+    for index in range(len(hist.counts)):
+        highest = hist.value_at_index(index)
+        assert highest > previous
+        assert hist.index_of(previous + 1) == index
+        assert hist.index_of(highest) == index
+        previous = highest
+
+
+def test_percentile_relative_error():
+    rng = random.Random(1)
+    values = sorted(int(rng.lognormvariate(11, 1.5)) for _ in range(20000))
+    hist = LatencyHistogram()
+    for value in values:
+        hist.record(value)
+    for p in (50, 90, 99, 99.9):
+        exact = values[int(round(len(values) * p / 100.0)) - 1]
+        assert abs(hist.percentile(p) - exact) <= exact / 2 ** (hist.sub_bucket_bits - 1) + 1
+
+
+def test_values_above_range_are_clamped():
+    hist = LatencyHistogram(highest_value=1000)
+    hist.record(10 ** 9)
+    hist.record(-5)
+    assert hist.count == 2
+    assert hist.max == 10 ** 9
+    assert hist.min == 0
+    assert hist.percentile(100) == 10 ** 9
@@ -0,0 +1,100 @@
+import threading
+
+from node_utils.latest_wins import CoalescingSubscription, LatestMessage
+
+
+class FakeLogger(object):
+
+    def __init__(self):
+        self.messages = []
+
+    def error(self, text):
+        self.messages.append(('error', text))
+
+    def info(self, text):
+        self.messages.append(('info', text))
+
+
+class FakeNode(object):
+    """The parts of rclpy.node.Node a CoalescingSubscription uses."""
+
+    def __init__(self):
+        self.logger = FakeLogger()
+        self.callback = None
+        self.destroyed = []
+
+    def create_subscription(self, msg_type, topic, callback, qos_profile):
+        self.callback = callback
+        return topic
+
+    def destroy_subscription(self, subscription):
+        self.destroyed.append(subscription)
+
+    def get_logger(self):
+        return self.logger
+
+
+def test_latest_message_keeps_the_newest():
+    slot = LatestMessage()
+    for i in range(5):
+        slot.put(i)
+    assert slot.take(timeout=0.0) == 4
+    assert slot.take(timeout=0.0) is None
+    assert slot.stats() == {'received': 5, 'processed': 1, 'dropped': 4}
+
+
+def test_burst_collapses_to_the_latest_message():
+    node = FakeNode()
+    started = threading.Event()
+    release = threading.Event()
+    done = threading.Event()
+    received = []
+
+    def callback(msg):
+        received.append(msg)
+        if msg == 0:
+            started.set()
+            release.wait(5.0)
+        if msg == 10:
+            done.set()
+
+    subscription = CoalescingSubscription(node, object, '/joint_states', callback)
+    node.callback(0)
+    assert started.wait(5.0)
+    # The worker is busy with message 0, the burst replaces itself in the slot
+    for i in range(1, 11):
+        node.callback(i)
+    release.set()
+    assert done.wait(5.0)
+    subscription.destroy()
+
+    assert received == [0, 10]
+    assert subscription.stats() == {'received': 11, 'processed': 2, 'dropped': 9}
+
+
+def test_worker_stops_on_destroy():
+    node = FakeNode()
+    subscription = CoalescingSubscription(node, object, '/joint_states', lambda msg: None)
+    assert subscription.worker.is_alive()
+    subscription.destroy()
+    assert not subscription.worker.is_alive()
+    assert node.destroyed == ['/joint_states']
+
+
+def test_callback_errors_are_logged_with_traceback():
+    node = FakeNode()
+    failed = threading.Event()
+
+    def callback(msg):
+        try:
+            raise ValueError(f'bad message {msg}')
+        finally:
+            failed.set()
+
+    subscription = CoalescingSubscription(node, object, '/joint_states', callback)
+    node.callback(1)
+    assert failed.wait(5.0)
+    subscription.destroy()
+    # The worker survived the exception and the error carries the traceback
+    (level, text), = [m for m in node.logger.messages if m[0] == 'error']
+    assert 'Traceback' in text and 'ValueError: bad message 1' in text
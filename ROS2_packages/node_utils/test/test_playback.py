@@ -0,0 +1,104 @@
+from node_utils.playback import PlaybackScheduler
+import pytest
+
+NS = 1000000000
+
+
+class FakeClock(object):
+    """Clock advanced by sleep() and by rendering."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def play(scheduler, clock, render_time=0.0, limit=1000):
+    played = []
+    for i in scheduler:
+        played.append((i, clock.now))
+        clock.now += render_time
+        if len(played) == limit:
+            break
+    return played
+
+
+def test_frames_play_at_their_timestamps():
+    clock = FakeClock()
+    scheduler = PlaybackScheduler([0, NS // 10, NS // 2, NS], clock=clock, sleep=clock.sleep)
+    played = play(scheduler, clock)
+    assert [i for i, _ in played] == [0, 1, 2, 3]
+    assert [round(t - 100.0, 6) for _, t in played] == [0.0, 0.1, 0.5, 1.0]
+    assert scheduler.dropped == 0
+    assert scheduler.lateness.max < 1e6
+
+
+def test_start_must_be_a_frame():
+    PlaybackScheduler([0, NS], start=1)
+    for start in [-1, 2]:
+        with pytest.raises(ValueError, match='not one of 2 frames'):
+            PlaybackScheduler([0, NS], start=start)
+    with pytest.raises(ValueError, match='not one of 0 frames'):
+        PlaybackScheduler([])
+
+
+def test_rate_multiplier():
+    clock = FakeClock()
+    scheduler = PlaybackScheduler([0, NS, 2 * NS], rate=4.0, clock=clock, sleep=clock.sleep)
+    played = play(scheduler, clock)
+    assert round(played[-1][1] - 100.0, 6) == 0.5
+
+
+def test_late_frames_are_skipped_instead_of_slowing_down():
+    clock = FakeClock()
+    timestamps = [i * NS // 100 for i in range(101)]  # 1 s at 100 Hz
+    scheduler = PlaybackScheduler(timestamps, clock=clock, sleep=clock.sleep)
+    played = play(scheduler, clock, render_time=0.035)
+    # Rendering at ~28 fps: every third or fourth frame is shown, the timeline still ends after 1 s
+    assert played[-1][0] == 100
+    assert played[-1][1] - 100.0 < 1.04
+    assert scheduler.dropped == 101 - len(played)
+    assert 25 < scheduler.fps < 30
+
+
+def test_loop_and_seek():
+    clock = FakeClock()
+    scheduler = PlaybackScheduler([0, NS, 2 * NS], loop=True, start=1, clock=clock,
+                                  sleep=clock.sleep)
+    played = play(scheduler, clock, limit=5)
+    assert [i for i, _ in played] == [1, 2, 1, 2, 1]
+    assert scheduler.passes == 2
+    scheduler = PlaybackScheduler([0, NS, 2 * NS], clock=clock, sleep=clock.sleep)
+    played = []
+    for i in scheduler:
+        played.append(i)
+        if i == 0:
+            scheduler.seek(2)
+    assert played == [0, 2]
+
+
+def test_pause_shifts_the_timeline():
+    clock = FakeClock()
+    scheduler = PlaybackScheduler([0, NS, 2 * NS], clock=clock, sleep=clock.sleep)
+    played = []
+    for i in scheduler:
+        played.append((i, clock.now))
+        if i == 0:
+            scheduler.pause()
+            clock.now += 5.0
+            scheduler.resume()
+    assert [round(t - 100.0, 6) for _, t in played] == [0.0, 6.0, 7.0]
+    assert abs(scheduler.fps - 3 / 2.0) < 1e-6
+
+
+def test_fps_stops_with_playback():
+    clock = FakeClock()
+    scheduler = PlaybackScheduler([0, NS // 2, NS], clock=clock, sleep=clock.sleep)
+    play(scheduler, clock)
+    fps = scheduler.fps
+    clock.now += 10.0
+    assert scheduler.fps == fps == 3.0
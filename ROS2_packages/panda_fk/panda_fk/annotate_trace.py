@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+# Annotates a joint trace CSV (waypoints/traces from ros2_teleop, q.csv from
+# trajectory_generating_script.py, ...) with end-effector pose columns and,
+# optionally, manipulability / condition number of the Jacobian.
+#
+# Example usage:
+#
+#    ros2 run panda_fk annotate_trace /home/ros/dumps/generated/q.csv -o q_ee.csv
+#
+
+import argparse
+import itertools
+import sys
+
+import numpy as np
+
+from panda_fk.kinematics import (condition_number, DEFAULT_CHUNK_SIZE, fk_pose_batch,
+                                 jacobian_batch, JOINT_NAMES, manipulability)
+
+POSE_COLUMNS = ['ee_x', 'ee_y', 'ee_z', 'ee_qx', 'ee_qy', 'ee_qz', 'ee_qw']
+JACOBIAN_COLUMNS = ['manipulability', 'condition_number']
+
+
+def annotate(infile, outfile, chunk_size=DEFAULT_CHUNK_SIZE, with_jacobian=False):
+    """Copy infile to outfile with the new columns, chunk_size lines at a time."""
+    header = infile.readline().rstrip('\r\n')
+    columns = header.split(',')
+    try:
+        joint_columns = [columns.index(name) for name in JOINT_NAMES]
+    except ValueError:
+        raise ValueError(f"Trace CSV must contain columns: {', '.join(JOINT_NAMES)}")
+
+    new_columns = POSE_COLUMNS + (JACOBIAN_COLUMNS if with_jacobian else [])
+    outfile.write(','.join(columns + new_columns) + '\n')
+    n = 0
+    lines = (line for line in infile if line.strip())
+    while True:
+        # Only one block of lines is held in memory, other columns (time_ns, ...) are
+        # copied as text, so nothing loses precision
+        rows = [line.rstrip('\r\n') for line in itertools.islice(lines, chunk_size)]
+        if not rows:
+            return n
+        q = np.loadtxt(rows, delimiter=',', usecols=joint_columns, ndmin=2)
+        poses = fk_pose_batch(q, chunk_size)
+        if with_jacobian:
+            J = jacobian_batch(q, chunk_size=chunk_size)
+            poses = np.column_stack([poses, manipulability(J), condition_number(J)])
+        outfile.write('\n'.join(row + ',' + ','.join(repr(v) for v in pose)
+                                for row, pose in zip(rows, poses.tolist())) + '\n')
+        n += len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Add end-effector pose columns to a joint trace CSV.')
+    parser.add_argument('input', help='trace CSV with panda_joint1..panda_joint7 columns')
+    parser.add_argument('-o', '--output', help='output CSV (default: stdout)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='number of lines read and computed at once (bounds memory)')
+    parser.add_argument('--jacobian', action='store_true',
+                        help='also add manipulability and condition_number columns')
+    args = parser.parse_args()
+
+    try:
+        with open(args.input, 'r', encoding='utf-8') as infile:
+            if args.output:
+                with open(args.output, 'w', encoding='utf-8') as outfile:
+                    n = annotate(infile, outfile, args.chunk_size, args.jacobian)
+                print(f'{n} rows written to {args.output}', file=sys.stderr)
+            else:
+                annotate(infile, sys.stdout, args.chunk_size, args.jacobian)
+    except ValueError as e:
+        parser.error(f'{args.input}: {e}')
+
+
+if __name__ == '__main__':
+    main()
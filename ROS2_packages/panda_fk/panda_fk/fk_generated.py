@@ -0,0 +1,232 @@
+# flake8: noqa
+"""Closed-form forward kinematics of the Franka Emika Panda.
+
+GENERATED by scripts/generate_fk.py from the DH table in panda_fk.kinematics,
+do not edit by hand. Same results as kinematics.fk_matrix() / fk_all().
+"""
+from math import cos, sin
+
+import numpy as np
+
+
+def fk_matrix(q):
+    """Return the 4x4 flange transform (panda_link8)."""
+    s1 = sin(q[0])
+    c1 = cos(q[0])
+    s2 = sin(q[1])
+    c2 = cos(q[1])
+    s3 = sin(q[2])
+    c3 = cos(q[2])
+    s4 = sin(q[3])
+    c4 = cos(q[3])
+    s5 = sin(q[4])
+    c5 = cos(q[4])
+    s6 = sin(q[5])
+    c6 = cos(q[5])
+    s7 = sin(q[6])
+    c7 = cos(q[6])
+    x0 = c3*s1
+    x1 = c1*s3
+    x2 = c2*x1 + x0
+    x3 = c1*s2
+    x4 = s4*x3
+    x5 = s1*s3
+    x6 = c1*c3
+    x7 = c2*x6
+    x8 = -x5 + x7
+    x9 = c4*x8
+    x10 = x4 + x9
+    x11 = c5*x2 + s5*x10
+    x12 = c4*x3
+    x13 = s4*x8
+    x14 = x12 - x13
+    x15 = s6*x14
+    x16 = c5*x10 - s5*x2
+    x17 = c6*x16
+    x18 = x15 + x17
+    x19 = c6*x14
+    x20 = c2*s1*s3 - x6
+    x21 = s1*s2
+    x22 = s4*x21
+    x23 = c2*x0
+    x24 = x1 + x23
+    x25 = c4*x24
+    x26 = x22 + x25
+    x27 = c5*x20 + s5*x26
+    x28 = c4*x21
+    x29 = s4*x24
+    x30 = x28 - x29
+    x31 = s6*x30
+    x32 = c5*x26 - s5*x20
+    x33 = c6*x32
+    x34 = x31 + x33
+    x35 = c6*x30
+    x36 = s2*s3
+    x37 = c2*s4
+    x38 = c3*s2
+    x39 = c4*x38
+    x40 = x37 - x39
+    x41 = -c5*x36 + s5*x40
+    x42 = c2*c4
+    x43 = s4*x38
+    x44 = x42 + x43
+    x45 = s6*x44
+    x46 = c5*x40 + s5*x36
+    x47 = c6*x46
+    x48 = x45 + x47
+    x49 = c6*x44
+    return np.array([[c7*x18 + s7*x11, c7*x11 - s7*x18, s6*x16 - x19, 0.107*s6*x16 + 0.384*x12 - 0.384*x13 + 0.088*x15 + 0.088*x17 - 0.107*x19 + 0.316*x3 - 0.0825*x4 - 0.0825*x5 + 0.0825*x7 - 0.0825*x9],
+         [c7*x34 + s7*x27, c7*x27 - s7*x34, s6*x32 - x35, 0.107*s6*x32 + 0.0825*x1 + 0.316*x21 - 0.0825*x22 + 0.0825*x23 - 0.0825*x25 + 0.384*x28 - 0.384*x29 + 0.088*x31 + 0.088*x33 - 0.107*x35],
+         [c7*x48 + s7*x41, c7*x41 - s7*x48, s6*x46 - x49, 0.316*c2 + 0.107*s6*x46 - 0.0825*x37 - 0.0825*x38 + 0.0825*x39 + 0.384*x42 + 0.384*x43 + 0.088*x45 + 0.088*x47 - 0.107*x49 + 0.333],
+         [0.0, 0.0, 0.0, 1.0]])
+
+
+def fk_all(q):
+    """Return (len(FRAME_NAMES), 4, 4) transforms of every frame in panda_link0."""
+    s1 = sin(q[0])
+    c1 = cos(q[0])
+    s2 = sin(q[1])
+    c2 = cos(q[1])
+    s3 = sin(q[2])
+    c3 = cos(q[2])
+    s4 = sin(q[3])
+    c4 = cos(q[3])
+    s5 = sin(q[4])
+    c5 = cos(q[4])
+    s6 = sin(q[5])
+    c6 = cos(q[5])
+    s7 = sin(q[6])
+    c7 = cos(q[6])
+    x0 = -s1
+    x1 = c1*c2
+    x2 = c1*s2
+    x3 = c2*s1
+    x4 = s1*s2
+    x5 = s1*s3
+    x6 = c3*x1
+    x7 = -x5 + x6
+    x8 = c3*s1 + s3*x1
+    x9 = 0.316*x2
+    x10 = c1*s3
+    x11 = c3*x3
+    x12 = x10 + x11
+    x13 = c1*c3 - s3*x3
+    x14 = 0.316*x4
+    x15 = c3*s2
+    x16 = s2*s3
+    x17 = 0.316*c2 + 0.333
+    x18 = s4*x2
+    x19 = c4*x7
+    x20 = x18 + x19
+    x21 = c4*x2
+    x22 = s4*x7
+    x23 = x21 - x22
+    x24 = 0.0825*x5
+    x25 = -x24 + 0.0825*x6 + x9
+    x26 = s4*x4
+    x27 = c4*x12
+    x28 = x26 + x27
+    x29 = c4*x4
+    x30 = s4*x12
+    x31 = x29 - x30
+    x32 = -x13
+    x33 = 0.0825*x10 + 0.0825*x11 + x14
+    x34 = c2*s4
+    x35 = c4*x15
+    x36 = x34 - x35
+    x37 = c2*c4
+    x38 = s4*x15
+    x39 = x37 + x38
+    x40 = -0.0825*x15 + x17
+    x41 = c5*x20 - s5*x8
+    x42 = c5*x8 + s5*x20
+    x43 = 0.0825*x18
+    x44 = 0.0825*x19
+    x45 = 0.384*x22
+    x46 = 0.0825*c1*c2*c3 + 0.384*c1*c4*s2 + 0.316*c1*s2 - x24 - x43 - x44 - x45
+    x47 = c5*x28 - s5*x32
+    x48 = c5*x32 + s5*x28
+    x49 = -0.0825*x26 - 0.0825*x27 + 0.384*x29 - 0.384*x30 + x33
+    x50 = c5*x36 + s5*x16
+    x51 = c5*x16 - s5*x36
+    x52 = -0.0825*x34 + 0.0825*x35 + 0.384*x37 + 0.384*x38 + x40
+    x53 = s6*x23
+    x54 = c6*x41
+    x55 = x53 + x54
+    x56 = c6*x23
+    x57 = s6*x41
+    x58 = x56 - x57
+    x59 = s6*x31
+    x60 = c6*x47
+    x61 = x59 + x60
+    x62 = c6*x31
+    x63 = s6*x47
+    x64 = x62 - x63
+    x65 = s6*x39
+    x66 = c6*x50
+    x67 = x65 + x66
+    x68 = c6*x39
+    x69 = s6*x50
+    x70 = x68 - x69
+    x71 = -x51
+    x72 = s7*x42
+    x73 = c7*x55
+    x74 = x72 + x73
+    x75 = c7*x42
+    x76 = s7*x55
+    x77 = x75 - x76
+    x78 = -x58
+    x79 = 0.384*x21 + x25 - x43 - x44 - x45 + 0.088*x53 + 0.088*x54
+    x80 = s7*x48
+    x81 = c7*x61
+    x82 = x80 + x81
+    x83 = c7*x48
+    x84 = s7*x61
+    x85 = x83 - x84
+    x86 = -x64
+    x87 = x49 + 0.088*x59 + 0.088*x60
+    x88 = s7*x71
+    x89 = c7*x67
+    x90 = x88 + x89
+    x91 = c7*x71
+    x92 = s7*x67
+    x93 = x91 - x92
+    x94 = -x70
+    x95 = x52 + 0.088*x65 + 0.088*x66
+    return np.array([
+        [[c1, x0, 0, 0],
+         [s1, c1, 0, 0],
+         [0, 0, 1.00000000000000, 0.333000000000000],
+         [0.0, 0.0, 0.0, 1.0]],
+        [[x1, -x2, x0, 0],
+         [x3, -x4, c1, 0],
+         [-s2, -c2, 0, 0.333000000000000],
+         [0.0, 0.0, 0.0, 1.0]],
+        [[x7, -x8, x2, x9],
+         [x12, x13, x4, x14],
+         [-x15, x16, c2, x17],
+         [0.0, 0.0, 0.0, 1.0]],
+        [[x20, x23, x8, x25],
+         [x28, x31, x32, x33],
+         [x36, x39, -x16, x40],
+         [0.0, 0.0, 0.0, 1.0]],
+        [[x41, -x42, x23, x46],
+         [x47, -x48, x31, x49],
+         [x50, x51, x39, x52],
+         [0.0, 0.0, 0.0, 1.0]],
+        [[x55, x58, x42, x46],
+         [x61, x64, x48, x49],
+         [x67, x70, x71, x52],
+         [0.0, 0.0, 0.0, 1.0]],
+        [[x74, x77, x78, x79],
+         [x82, x85, x86, x87],
+         [x90, x93, x94, x95],
+         [0.0, 0.0, 0.0, 1.0]],
+        [[x74, x77, x78, -0.107*x56 + 0.107*x57 + x79],
+         [x82, x85, x86, -0.107*x62 + 0.107*x63 + x87],
+         [x90, x93, x94, -0.107*x68 + 0.107*x69 + x95],
+         [0.0, 0.0, 0.0, 1.0]],
+        [[0.707106781186548*x72 + 0.707106781186548*x73 - 0.707106781186547*x75 + 0.707106781186547*x76, 0.707106781186547*x72 + 0.707106781186547*x73 + 0.707106781186548*x75 - 0.707106781186548*x76, x78, -0.2104*x56 + 0.2104*x57 + x79],
+         [0.707106781186548*x80 + 0.707106781186548*x81 - 0.707106781186547*x83 + 0.707106781186547*x84, 0.707106781186547*x80 + 0.707106781186547*x81 + 0.707106781186548*x83 - 0.707106781186548*x84, x86, -0.2104*x62 + 0.2104*x63 + x87],
+         [0.707106781186548*x88 + 0.707106781186548*x89 - 0.707106781186547*x91 + 0.707106781186547*x92, 0.707106781186547*x88 + 0.707106781186547*x89 + 0.707106781186548*x91 - 0.707106781186548*x92, x94, -0.2104*x68 + 0.2104*x69 + x95],
+         [0.0, 0.0, 0.0, 1.0]]])
@@ -0,0 +1,309 @@
+"""Numerical inverse kinematics of the Franka Emika Panda.
+
+Damped least squares with Levenberg-Marquardt damping, built on the FK and
+geometric Jacobian of panda_fk.kinematics. The flange (panda_link8) is
+solved for by default. IKSolver warm-starts from the last solution, or from
+the nearest cached configuration (e.g. recorded waypoints) when the last
+solution is far from the target or does not converge. solve_batch() runs
+the iterations of many targets at once.
+"""
+import functools
+from os import path
+
+import numpy as np
+from panda_fk import fk_generated
+from panda_fk.kinematics import (fk_all_batch, FLANGE_INDEX, jacobian_from_frames, JOINT_NAMES,
+                                 NUM_JOINTS)
+from panda_fk.urdf_tree import KinematicTree
+import yaml
+
+URDF_NAME = 'panda2_inertias.urdf'
+SOURCE_PACKAGES_DIR = path.dirname(path.dirname(path.dirname(path.realpath(__file__))))
+
+
+def panda_urdf_path():
+    """Return the Panda URDF of the installed panda2_description, or of the source tree."""
+    try:
+        from ament_index_python.packages import get_package_share_directory
+        return path.join(get_package_share_directory('panda2_description'), 'urdf', URDF_NAME)
+    except (ImportError, LookupError):
+        return path.join(SOURCE_PACKAGES_DIR, 'panda2_description', 'urdf', URDF_NAME)
+
+
+@functools.lru_cache(maxsize=None)
+def read_urdf_joint_limits():
+    # Parsed on first use, importing the module does not need panda2_description
+    lower, upper = KinematicTree.from_file(panda_urdf_path()).joint_limits(JOINT_NAMES)
+    lower.flags.writeable = False
+    upper.flags.writeable = False
+    return lower, upper
+
+
+def urdf_joint_limits():
+    """Return (lower, upper) position limits of the URDF, as copies."""
+    lower, upper = read_urdf_joint_limits()
+    return lower.copy(), upper.copy()
+
+
+def load_joint_limits(limits_path=None):
+    """Return (lower, upper) position limits.
+
+    Starts from the URDF limits and applies min_position/max_position entries
+    of a MoveIt joint_limits.yaml (panda2_description/config) when given.
+    Joints with has_position_limits: false get -inf/inf, they are not clamped.
+    """
+    lower, upper = urdf_joint_limits()
+    if limits_path is None:
+        return lower, upper
+    with open(limits_path, 'r', encoding='utf-8') as infile:
+        limits = yaml.safe_load(infile).get('joint_limits', {})
+    for i, name in enumerate(JOINT_NAMES):
+        joint = limits.get(name, {})
+        if joint.get('has_position_limits', True) is False:
+            lower[i], upper[i] = -np.inf, np.inf
+            continue
+        if 'min_position' in joint:
+            lower[i] = float(joint['min_position'])
+        if 'max_position' in joint:
+            upper[i] = float(joint['max_position'])
+    return lower, upper
+
+
+def pose_to_matrix(position, quaternion):
+    """Return the 4x4 transform for position (x, y, z) and quaternion (x, y, z, w)."""
+    x, y, z, w = quaternion
+    T = np.eye(4)
+    T[0:3, 0:3] = [[1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+                   [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+                   [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]]
+    T[0:3, 3] = position
+    return T
+
+
+def pose_error(T, T_target):
+    """Return (N, 6) errors [position; rotation vector] from T to T_target, both (N, 4, 4).
+
+    The rotation part is the axis-angle vector of R_target R^T in the base frame.
+    """
+    dp = T_target[:, 0:3, 3] - T[:, 0:3, 3]
+    R = T_target[:, 0:3, 0:3] @ np.swapaxes(T[:, 0:3, 0:3], -1, -2)
+    skew = np.stack([R[:, 2, 1] - R[:, 1, 2], R[:, 0, 2] - R[:, 2, 0], R[:, 1, 0] - R[:, 0, 1]],
+                    axis=1)
+    cos_angle = np.clip((R[:, 0, 0] + R[:, 1, 1] + R[:, 2, 2] - 1.0) / 2.0, -1.0, 1.0)
+    angle = np.arccos(cos_angle)
+    sin_angle = np.sin(angle)
+    # angle / (2 sin(angle)) -> 1/2 for small angles
+    scale = np.where(sin_angle > 1e-9, angle / (2.0 * np.maximum(sin_angle, 1e-9)), 0.5)
+    dr = skew * scale[:, None]
+    # Near pi the skew part vanishes and R ~ 2 a a^T - I: the axis is taken from
+    # the row and column of the largest diagonal term, whose component is the
+    # furthest from zero and fixes the signs of the others
+    flip = angle > np.pi - 1e-6
+    if flip.any():
+        Rf = R[flip]
+        rows = np.arange(len(Rf))
+        k = np.argmax(np.diagonal(Rf, axis1=1, axis2=2), axis=1)
+        a_k = np.sqrt(np.maximum((Rf[rows, k, k] + 1.0) / 2.0, 1e-12))
+        axis = (Rf[rows, k, :] + Rf[rows, :, k]) / (4.0 * a_k[:, None])
+        axis[rows, k] = a_k
+        axis /= np.linalg.norm(axis, axis=1)[:, None]
+        # Just below pi the skew part still tells the direction of the rotation
+        axis *= np.where(np.einsum('nk,nk->n', axis, skew[flip]) < 0.0, -1.0, 1.0)[:, None]
+        dr[flip] = axis * angle[flip, None]
+    return np.concatenate([dp, dr], axis=1)
+
+
+def damped_least_squares(J, err, lam):
+    """Return dq = J^T (J J^T + lambda^2 I)^-1 e for (N, 6, 7) J, (N, 6) e and (N,) lambda."""
+    A = J @ np.swapaxes(J, 1, 2) + (lam ** 2)[:, None, None] * np.eye(6)
+    return np.einsum('nji,nj->ni', J, np.linalg.solve(A, err[..., None])[..., 0])
+
+
+class IKSolver(object):
+    """Damped least squares / Levenberg-Marquardt IK with a warm-start cache.
+
+    warm_start_distance (m): the last solution is the first seed when its
+    frame is closer than this to the target, otherwise the nearest cached
+    configuration is tried first.
+    """
+
+    def __init__(self, lower=None, upper=None, frame_index=FLANGE_INDEX, max_iterations=100,
+                 position_tolerance=1e-4, rotation_tolerance=1e-3, damping=1e-2,
+                 restarts=4, cache_size=1000, warm_start_distance=0.1, seed=None):
+        urdf_lower, urdf_upper = urdf_joint_limits()
+        self.lower = urdf_lower if lower is None else np.asarray(lower, dtype=np.float64)
+        self.upper = urdf_upper if upper is None else np.asarray(upper, dtype=np.float64)
+        # Random restarts of joints without position limits are drawn from one turn
+        self.sample_lower = np.where(np.isfinite(self.lower), self.lower, -np.pi)
+        self.sample_upper = np.where(np.isfinite(self.upper), self.upper, np.pi)
+        self.frame_index = frame_index
+        self.max_iterations = max_iterations
+        self.position_tolerance = position_tolerance
+        self.rotation_tolerance = rotation_tolerance
+        self.damping = damping
+        self.restarts = restarts
+        self.rng = np.random.default_rng(seed)
+        self.warm_start_distance = warm_start_distance
+        self.last_solution = None
+        self.last_position = None
+
+        # Warm-start cache: configurations with the position and z axis of their frame
+        self.cache_size = cache_size
+        self.cache_q = np.empty((0, NUM_JOINTS))
+        self.cache_position = np.empty((0, 3))
+        self.cache_z = np.empty((0, 3))
+
+    def middle_configuration(self):
+        return (self.sample_lower + self.sample_upper) / 2.0
+
+    def add_to_cache(self, joint_positions):
+        """Add configurations (7,) or (N, 7) to the warm-start cache, the oldest are dropped."""
+        q = np.atleast_2d(np.asarray(joint_positions, dtype=np.float64))[:, 0:NUM_JOINTS]
+        T = fk_all_batch(q)[:, self.frame_index]
+        keep = slice(-self.cache_size, None)
+        self.cache_q = np.concatenate([self.cache_q, q])[keep]
+        self.cache_position = np.concatenate([self.cache_position, T[:, 0:3, 3]])[keep]
+        self.cache_z = np.concatenate([self.cache_z, T[:, 0:3, 2]])[keep]
+
+    def add_waypoints_csv(self, csv_path):
+        """Add the configurations of a waypoint/trace CSV (ros2_teleop format) to the cache."""
+        with open(csv_path, 'r', encoding='utf-8') as infile:
+            columns = infile.readline().strip().split(',')
+        usecols = [columns.index(name) for name in JOINT_NAMES]
+        self.add_to_cache(np.loadtxt(csv_path, delimiter=',', skiprows=1, usecols=usecols,
+                                     ndmin=2))
+
+    def nearest_cached(self, T_target):
+        """Return cached configurations closest to (N, 4, 4) targets, None if it is empty."""
+        if len(self.cache_q) == 0:
+            return None
+        # Position distance plus a rotation term (0.1 m per unit of 1 - cos of the z axes)
+        dp = np.linalg.norm(self.cache_position[None] - T_target[:, None, 0:3, 3], axis=2)
+        dz = 1.0 - np.einsum('nk,mk->nm', T_target[:, 0:3, 2], self.cache_z)
+        return self.cache_q[np.argmin(dp + 0.1 * dz, axis=1)]
+
+    def seeds(self, T_target, q0):
+        """Seeds of solve(), generated lazily: the cache is only searched when it is tried."""
+        if q0 is not None:
+            yield np.asarray(q0, dtype=np.float64)[0:NUM_JOINTS]
+        warm = (self.last_position is not None and np.linalg.norm(
+            self.last_position - T_target[0, 0:3, 3]) < self.warm_start_distance)
+        if warm:
+            yield self.last_solution
+        nearest = self.nearest_cached(T_target)
+        if nearest is not None:
+            yield nearest[0]
+        if self.last_solution is not None and not warm:
+            yield self.last_solution
+        if q0 is None and self.last_solution is None and nearest is None:
+            yield self.middle_configuration()
+        yield from self.random_configurations(self.restarts)
+
+    def solve(self, T_target, q0=None):
+        """Solve for one 4x4 target. Returns (q, success).
+
+        Seeds tried in order: q0, the last solution when it is within
+        warm_start_distance of the target, the nearest cached configuration,
+        the last solution when it is farther, the middle of the joint range
+        when there was no other seed, then random configurations within the
+        limits.
+        """
+        T_target = np.asarray(T_target, dtype=np.float64)[None]
+        best_q, best_err = None, np.inf
+        for seed in self.seeds(T_target, q0):
+            q, success, err = self.iterate(np.array(seed)[None], T_target)
+            if success[0]:
+                self.last_solution = q[0]
+                self.last_position = T_target[0, 0:3, 3].copy()
+                return q[0], True
+            if err[0] < best_err:
+                best_q, best_err = q[0], err[0]
+        return best_q, False
+
+    def solve_batch(self, T_targets, q0=None):
+        """Solve (N, 4, 4) targets at once. Returns ((N, 7) q, (N,) success).
+
+        Seeds are q0 when given, otherwise the nearest cached configurations
+        (or the middle of the joint range). Unconverged targets are retried
+        from random configurations, all of them together.
+        """
+        T_targets = np.asarray(T_targets, dtype=np.float64)
+        n = len(T_targets)
+        if q0 is not None:
+            seeds = np.asarray(q0, dtype=np.float64)[..., 0:NUM_JOINTS]
+        else:
+            seeds = self.nearest_cached(T_targets)
+            if seeds is None:
+                seeds = self.middle_configuration()
+        seeds = np.broadcast_to(seeds, (n, NUM_JOINTS)).copy()
+
+        q, success, _ = self.iterate(seeds, T_targets)
+        for _ in range(self.restarts):
+            failed = np.flatnonzero(~success)
+            if len(failed) == 0:
+                break
+            q_retry, success_retry, _ = self.iterate(self.random_configurations(len(failed)),
+                                                     T_targets[failed])
+            q[failed[success_retry]] = q_retry[success_retry]
+            success[failed] = success_retry
+        return q, success
+
+    def random_configurations(self, n):
+        return self.rng.uniform(self.sample_lower, self.sample_upper, size=(n, NUM_JOINTS))
+
+    def frames(self, q):
+        # The generated closed form is much cheaper than the batched chain for one sample
+        if len(q) == 1:
+            return fk_generated.fk_all(q[0])[None]
+        return fk_all_batch(q)
+
+    def iterate(self, q, T_target):
+        """Run LM iterations on (N, 7) seeds. Returns (q, success, error norm)."""
+        q = np.clip(q, self.lower, self.upper)
+        n = len(q)
+        lam = np.full(n, self.damping)
+        frames = self.frames(q)
+        err = pose_error(frames[:, self.frame_index], T_target)
+        err_norm = np.linalg.norm(err, axis=1)
+        success = np.zeros(n, dtype=bool)
+        active = np.arange(n)
+
+        for _ in range(self.max_iterations):
+            done = ((np.linalg.norm(err[active, 0:3], axis=1) < self.position_tolerance)
+                    & (np.linalg.norm(err[active, 3:6], axis=1) < self.rotation_tolerance))
+            success[active[done]] = True
+            keep = ~done
+            active = active[keep]
+            if len(active) == 0:
+                break
+            frames = frames[keep]
+
+            J = jacobian_from_frames(frames, self.frame_index)
+            dq = damped_least_squares(J, err[active], lam[active])
+            # Joints sitting at a limit and pushed further out are locked for this step
+            q_active = q[active]
+            blocked = (((q_active <= self.lower + 1e-9) & (dq < 0.0))
+                       | ((q_active >= self.upper - 1e-9) & (dq > 0.0)))
+            if blocked.any():
+                dq = damped_least_squares(J * ~blocked[:, None, :], err[active], lam[active])
+            q_new = np.clip(q_active + dq, self.lower, self.upper)
+
+            frames_new = self.frames(q_new)
+            err_new = pose_error(frames_new[:, self.frame_index], T_target[active])
+            err_new_norm = np.linalg.norm(err_new, axis=1)
+
+            # Levenberg-Marquardt: accept improving steps and relax damping, otherwise
+            # increase it
+            better = err_new_norm < err_norm[active]
+            improved = active[better]
+            q[improved] = q_new[better]
+            err[improved] = err_new[better]
+            err_norm[improved] = err_new_norm[better]
+            frames[better] = frames_new[better]
+            lam[active] = np.where(better, lam[active] * 0.5, lam[active] * 4.0)
+            np.clip(lam, 1e-6, 1e3, out=lam)
+        else:
+            done = ((np.linalg.norm(err[active, 0:3], axis=1) < self.position_tolerance)
+                    & (np.linalg.norm(err[active, 3:6], axis=1) < self.rotation_tolerance))
+            success[active[done]] = True
+        return q, success, err_norm
@@ -0,0 +1,392 @@
+"""Numeric forward kinematics of the Franka Emika Panda.
+
+Float64 NumPy version of the DH chain shared by panda_fk_node and
+panda_tf_broadcaster. The constant alpha/a/d terms of the DH table are
+evaluated once at import, so a call only has to compute sin/cos of the joint
+angles and multiply seven 4x4 matrices.
+"""
+import math
+
+import numpy as np
+
+M_PI = math.pi
+
+# DH parameters (data given by maker franka-emika), modified DH convention.
+# Columns: alpha, a, d - theta is the joint variable
+DH_TABLE = np.array([
+    [0, 0, 0.333],
+    [-M_PI / 2, 0, 0],
+    [M_PI / 2, 0, 0.316],
+    [M_PI / 2, 0.0825, 0],
+    [-M_PI / 2, -0.0825, 0.384],
+    [M_PI / 2, 0, 0],
+    [M_PI / 2, 0.088, 0]], dtype=np.float64)
+
+NUM_JOINTS = len(DH_TABLE)
+JOINT_NAMES = ['panda_joint%d' % (i + 1) for i in range(NUM_JOINTS)]
+
+# Fixed transforms after joint 7 (panda2_inertias.urdf): panda_link7 -> flange
+# (panda_link8) -> panda_hand, rotated by -pi/4 -> panda_hand_tcp
+FLANGE_OFFSET = 0.107
+TCP_OFFSET = 0.1034
+
+T_7_FLANGE = np.eye(4)
+T_7_FLANGE[2, 3] = FLANGE_OFFSET
+
+T_FLANGE_HAND = np.eye(4)
+T_FLANGE_HAND[0:2, 0:2] = [[math.cos(-M_PI / 4), -math.sin(-M_PI / 4)],
+                           [math.sin(-M_PI / 4), math.cos(-M_PI / 4)]]
+
+T_HAND_TCP = np.eye(4)
+T_HAND_TCP[2, 3] = TCP_OFFSET
+
+T_FLANGE_TCP = T_FLANGE_HAND @ T_HAND_TCP
+
+# Frames returned by fk_all(), all expressed in panda_link0
+BASE_FRAME = 'panda_link0'
+FRAME_NAMES = ['panda_link1',
+               'panda_link2',
+               'panda_link3',
+               'panda_link4',
+               'panda_link5',
+               'panda_link6',
+               'panda_link7',
+               'panda_link8',
+               'panda_hand_tcp']
+FLANGE_INDEX = FRAME_NAMES.index('panda_link8')
+TCP_INDEX = FRAME_NAMES.index('panda_hand_tcp')
+
+# Constant terms of the DH transforms (precomputed once)
+DH_ALPHA = DH_TABLE[:, 0]
+DH_A = DH_TABLE[:, 1]
+DH_D = DH_TABLE[:, 2]
+SIN_ALPHA = np.sin(DH_ALPHA)
+COS_ALPHA = np.cos(DH_ALPHA)
+
+
+def dh_transform(i, q):
+    """Return the 4x4 transform of joint i for joint angle q."""
+    sq = math.sin(q)
+    cq = math.cos(q)
+    sa = SIN_ALPHA[i]
+    ca = COS_ALPHA[i]
+    d = DH_D[i]
+    return np.array([
+        [cq, -sq, 0.0, DH_A[i]],
+        [sq * ca, cq * ca, -sa, -sa * d],
+        [sq * sa, cq * sa, ca, ca * d],
+        [0.0, 0.0, 0.0, 1.0]])
+
+
+def fk_matrix(joint_positions):
+    """Return the 4x4 flange transform (panda_link8) for the first seven joint positions."""
+    T = dh_transform(0, joint_positions[0])
+    for i in range(1, NUM_JOINTS):
+        T = T @ dh_transform(i, joint_positions[i])
+    return T @ T_7_FLANGE
+
+
+def fk_all(joint_positions):
+    """Return (len(FRAME_NAMES), 4, 4) transforms of every frame in panda_link0.
+
+    One pass over the chain, each frame reuses the prefix product of the
+    previous one.
+    """
+    frames = np.empty((len(FRAME_NAMES), 4, 4))
+    T = dh_transform(0, joint_positions[0])
+    frames[0] = T
+    for i in range(1, NUM_JOINTS):
+        T = T @ dh_transform(i, joint_positions[i])
+        frames[i] = T
+    frames[FLANGE_INDEX] = T @ T_7_FLANGE
+    frames[TCP_INDEX] = frames[FLANGE_INDEX] @ T_FLANGE_TCP
+    return frames
+
+
+def matrix_to_quaternion(R):
+    """Convert a 3x3 rotation matrix to a quaternion (x, y, z, w)."""
+    trace = R[0, 0] + R[1, 1] + R[2, 2]
+    # Shepperd's method - pick the largest diagonal term for stability
+    if trace > 0.0:
+        s = 2.0 * math.sqrt(trace + 1.0)
+        w = 0.25 * s
+        x = (R[2, 1] - R[1, 2]) / s
+        y = (R[0, 2] - R[2, 0]) / s
+        z = (R[1, 0] - R[0, 1]) / s
+    elif R[0, 0] > R[1, 1] and R[0, 0] > R[2, 2]:
+        s = 2.0 * math.sqrt(1.0 + R[0, 0] - R[1, 1] - R[2, 2])
+        w = (R[2, 1] - R[1, 2]) / s
+        x = 0.25 * s
+        y = (R[0, 1] + R[1, 0]) / s
+        z = (R[0, 2] + R[2, 0]) / s
+    elif R[1, 1] > R[2, 2]:
+        s = 2.0 * math.sqrt(1.0 + R[1, 1] - R[0, 0] - R[2, 2])
+        w = (R[0, 2] - R[2, 0]) / s
+        x = (R[0, 1] + R[1, 0]) / s
+        y = 0.25 * s
+        z = (R[1, 2] + R[2, 1]) / s
+    else:
+        s = 2.0 * math.sqrt(1.0 + R[2, 2] - R[0, 0] - R[1, 1])
+        w = (R[1, 0] - R[0, 1]) / s
+        x = (R[0, 2] + R[2, 0]) / s
+        y = (R[1, 2] + R[2, 1]) / s
+        z = 0.25 * s
+    # Keep w >= 0 so equal rotations give equal quaternions
+    if w < 0.0:
+        return np.array([-x, -y, -z, -w])
+    return np.array([x, y, z, w])
+
+
+def fk(joint_positions):
+    """Return end-effector position (x, y, z) and quaternion (x, y, z, w)."""
+    T = fk_matrix(joint_positions)
+    return T[0:3, 3].copy(), matrix_to_quaternion(T[0:3, 0:3])
+
+
+# Batched versions - all samples of a chunk are computed at once with broadcasting
+
+# Number of samples processed at once, bounds the temporary (chunk, 4, 4) arrays
+DEFAULT_CHUNK_SIZE = 8192
+
+
+def fk_matrix_batch(joint_positions, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return (N, 4, 4) flange transforms for an (N, 7) joint array."""
+    q = np.asarray(joint_positions, dtype=np.float64)[:, 0:NUM_JOINTS]
+    out = np.zeros((len(q), 4, 4))
+    out[:, 3, 3] = 1.0
+    for start in range(0, len(q), chunk_size):
+        chunk = q[start:start + chunk_size].T
+        # Rotation columns x, y, z and origin p of the chain so far, each (3, n).
+        # Right-multiplying by a DH transform only mixes these columns, so a
+        # joint costs a few elementwise products instead of a 4x4 matmul.
+        x = np.zeros((3, chunk.shape[1]))
+        y = np.zeros_like(x)
+        z = np.zeros_like(x)
+        p = np.zeros_like(x)
+        x[0] = y[1] = z[2] = 1.0
+        for i in range(NUM_JOINTS):
+            sq = np.sin(chunk[i])
+            cq = np.cos(chunk[i])
+            u = y * COS_ALPHA[i] + z * SIN_ALPHA[i]
+            z_new = z * COS_ALPHA[i] - y * SIN_ALPHA[i]
+            p = p + x * DH_A[i] + z_new * DH_D[i]
+            x, y, z = x * cq + u * sq, u * cq - x * sq, z_new
+        p = p + z * FLANGE_OFFSET
+        block = out[start:start + chunk_size]
+        block[:, 0:3, 0] = x.T
+        block[:, 0:3, 1] = y.T
+        block[:, 0:3, 2] = z.T
+        block[:, 0:3, 3] = p.T
+    return out
+
+
+def fk_all_batch(joint_positions, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return (N, len(FRAME_NAMES), 4, 4) transforms of every frame for an (N, 7) joint array."""
+    q = np.asarray(joint_positions, dtype=np.float64)[:, 0:NUM_JOINTS]
+    out = np.zeros((len(q), len(FRAME_NAMES), 4, 4))
+    out[:, :, 3, 3] = 1.0
+    for start in range(0, len(q), chunk_size):
+        chunk = q[start:start + chunk_size].T
+        block = out[start:start + chunk_size]
+        # Same column update as fk_matrix_batch(), every prefix is stored
+        x = np.zeros((3, chunk.shape[1]))
+        y = np.zeros_like(x)
+        z = np.zeros_like(x)
+        p = np.zeros_like(x)
+        x[0] = y[1] = z[2] = 1.0
+        for i in range(NUM_JOINTS):
+            sq = np.sin(chunk[i])
+            cq = np.cos(chunk[i])
+            u = y * COS_ALPHA[i] + z * SIN_ALPHA[i]
+            z_new = z * COS_ALPHA[i] - y * SIN_ALPHA[i]
+            p = p + x * DH_A[i] + z_new * DH_D[i]
+            x, y, z = x * cq + u * sq, u * cq - x * sq, z_new
+            block[:, i, 0:3, 0] = x.T
+            block[:, i, 0:3, 1] = y.T
+            block[:, i, 0:3, 2] = z.T
+            block[:, i, 0:3, 3] = p.T
+        block[:, FLANGE_INDEX] = block[:, NUM_JOINTS - 1] @ T_7_FLANGE
+        block[:, TCP_INDEX] = block[:, FLANGE_INDEX] @ T_FLANGE_TCP
+    return out
+
+
+def matrix_to_quaternion_batch(R):
+    """Convert (N, 3, 3) rotation matrices to (N, 4) quaternions (x, y, z, w)."""
+    m00, m01, m02 = R[:, 0, 0], R[:, 0, 1], R[:, 0, 2]
+    m10, m11, m12 = R[:, 1, 0], R[:, 1, 1], R[:, 1, 2]
+    m20, m21, m22 = R[:, 2, 0], R[:, 2, 1], R[:, 2, 2]
+    trace = m00 + m11 + m22
+
+    # Same case split as matrix_to_quaternion(), evaluated with masks
+    case_w = trace > 0.0
+    case_x = ~case_w & (m00 > m11) & (m00 > m22)
+    case_y = ~case_w & ~case_x & (m11 > m22)
+    case_z = ~case_w & ~case_x & ~case_y
+
+    quat = np.empty((len(R), 4))
+    s = 2.0 * np.sqrt(np.maximum(np.where(case_w, trace + 1.0, 1.0), 1e-300))
+    quat[:, 0] = (m21 - m12) / s
+    quat[:, 1] = (m02 - m20) / s
+    quat[:, 2] = (m10 - m01) / s
+    quat[:, 3] = 0.25 * s
+    if case_x.any():
+        k = case_x
+        s = 2.0 * np.sqrt(1.0 + m00[k] - m11[k] - m22[k])
+        quat[k] = np.stack([0.25 * s, (m01[k] + m10[k]) / s, (m02[k] + m20[k]) / s,
+                            (m21[k] - m12[k]) / s], axis=1)
+    if case_y.any():
+        k = case_y
+        s = 2.0 * np.sqrt(1.0 + m11[k] - m00[k] - m22[k])
+        quat[k] = np.stack([(m01[k] + m10[k]) / s, 0.25 * s, (m12[k] + m21[k]) / s,
+                            (m02[k] - m20[k]) / s], axis=1)
+    if case_z.any():
+        k = case_z
+        s = 2.0 * np.sqrt(1.0 + m22[k] - m00[k] - m11[k])
+        quat[k] = np.stack([(m02[k] + m20[k]) / s, (m12[k] + m21[k]) / s, 0.25 * s,
+                            (m10[k] - m01[k]) / s], axis=1)
+
+    # Keep w >= 0 so equal rotations give equal quaternions
+    quat[quat[:, 3] < 0.0] *= -1.0
+    return quat
+
+
+def fk_pose_batch(joint_positions, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return (N, 7) poses [x, y, z, qx, qy, qz, qw] for an (N, 7) joint array."""
+    q = np.asarray(joint_positions, dtype=np.float64)
+    out = np.empty((len(q), 7))
+    for start in range(0, len(q), chunk_size):
+        T = fk_matrix_batch(q[start:start + chunk_size], chunk_size)
+        out[start:start + chunk_size, 0:3] = T[:, 0:3, 3]
+        out[start:start + chunk_size, 3:7] = matrix_to_quaternion_batch(T[:, 0:3, 0:3])
+    return out
+
+
+# Geometric Jacobian, built from the frames of fk_all() / fk_all_batch()
+
+def jacobian_from_frames(frames, frame_index=FLANGE_INDEX):
+    """Return the 6x7 geometric Jacobian [linear; angular] of frame_index in panda_link0.
+
+    frames are the transforms from fk_all(), shape (len(FRAME_NAMES), 4, 4), or
+    a stack of them from fk_all_batch(), shape (N, len(FRAME_NAMES), 4, 4).
+    With modified DH, joint i rotates about the z axis of frame i and its
+    origin lies on that axis.
+    """
+    frames = np.asarray(frames)
+    z = frames[..., 0:NUM_JOINTS, 0:3, 2]
+    o = frames[..., 0:NUM_JOINTS, 0:3, 3]
+    p = frames[..., frame_index, None, 0:3, 3]
+    J = np.empty(frames.shape[:-3] + (6, NUM_JOINTS))
+    J[..., 0:3, :] = np.swapaxes(np.cross(z, p - o), -1, -2)
+    J[..., 3:6, :] = np.swapaxes(z, -1, -2)
+    return J
+
+
+def jacobian(joint_positions, frame_index=FLANGE_INDEX):
+    """Return the 6x7 geometric Jacobian for the first seven joint positions."""
+    return jacobian_from_frames(fk_all(joint_positions), frame_index)
+
+
+def jacobian_batch(joint_positions, frame_index=FLANGE_INDEX, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return (N, 6, 7) geometric Jacobians for an (N, 7) joint array."""
+    q = np.asarray(joint_positions, dtype=np.float64)
+    out = np.empty((len(q), 6, NUM_JOINTS))
+    for start in range(0, len(q), chunk_size):
+        frames = fk_all_batch(q[start:start + chunk_size], chunk_size)
+        out[start:start + chunk_size] = jacobian_from_frames(frames, frame_index)
+    return out
+
+
+def manipulability(J):
+    """Return the Yoshikawa manipulability index sqrt(det(J J^T)) of one or more Jacobians."""
+    return np.prod(np.linalg.svd(J, compute_uv=False), axis=-1)
+
+
+def condition_number(J):
+    """Return the condition number (largest / smallest singular value) of one or more Jacobians."""
+    sv = np.linalg.svd(J, compute_uv=False)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return sv[..., 0] / sv[..., -1]
+
+
+# Parent-relative transforms, the TF tree of the URDF: joint i moves
+# LINK_NAMES[i + 1] relative to LINK_NAMES[i], the links after panda_link7
+# are fixed.
+LINK_NAMES = [BASE_FRAME] + FRAME_NAMES[:NUM_JOINTS]
+FIXED_TRANSFORMS = [('panda_link7', 'panda_link8', T_7_FLANGE),
+                    ('panda_link8', 'panda_hand', T_FLANGE_HAND),
+                    ('panda_hand', 'panda_hand_tcp', T_HAND_TCP)]
+
+# RotX(alpha) TransX(a) RotZ(q) TransZ(d) - the translation does not depend on q
+JOINT_TRANSLATIONS = np.column_stack([DH_A, -SIN_ALPHA * DH_D, COS_ALPHA * DH_D])
+SIN_HALF_ALPHA = np.sin(DH_ALPHA / 2)
+COS_HALF_ALPHA = np.cos(DH_ALPHA / 2)
+
+
+def joint_quaternions(joint_positions):
+    """Return (..., 7, 4) joint rotations (x, y, z, w) for (..., 7) joint positions.
+
+    The rotation is RotX(alpha) RotZ(q), its quaternion product only needs
+    sin/cos of q/2 - no matrices are built.
+    """
+    half = 0.5 * np.asarray(joint_positions, dtype=np.float64)[..., :NUM_JOINTS]
+    s = np.sin(half)
+    c = np.cos(half)
+    out = np.empty(half.shape + (4,))
+    out[..., 0] = SIN_HALF_ALPHA * c
+    out[..., 1] = -SIN_HALF_ALPHA * s
+    out[..., 2] = COS_HALF_ALPHA * s
+    out[..., 3] = COS_HALF_ALPHA * c
+    return out
+
+
+# Symbolic reference implementation (slow, kept for comparison and testing)
+
+def dh_params(joint_variable):
+    joint_var = joint_variable
+
+    # Create DH parameters (data given by maker franka-emika)
+    dh = [[0, 0, 0.333, joint_var[0]],
+          [-M_PI / 2, 0, 0, joint_var[1]],
+          [M_PI / 2, 0, 0.316, joint_var[2]],
+          [M_PI / 2, 0.0825, 0, joint_var[3]],
+          [-M_PI / 2, -0.0825, 0.384, joint_var[4]],
+          [M_PI / 2, 0, 0, joint_var[5]],
+          [M_PI / 2, 0.088, 0.107, joint_var[6]]]
+
+    return dh
+
+
+def TF_matrix(i, dh):
+    from sympy import Matrix, sin, cos
+
+    # Define Transformation matrix based on DH params
+    alpha = dh[i][0]
+    a = dh[i][1]
+    d = dh[i][2]
+    q = dh[i][3]
+
+    TF = Matrix([[cos(q), -sin(q), 0, a],
+                 [sin(q) * cos(alpha), cos(q) * cos(alpha), -sin(alpha), -sin(alpha) * d],
+                 [sin(q) * sin(alpha), cos(q) * sin(alpha), cos(alpha), cos(alpha) * d],
+                 [0, 0, 0, 1]])
+    return TF
+
+
+def fk_sympy(joint_positions):
+    """Same as fk(), computed through the symbolic sympy matrices."""
+    from sympy import Quaternion
+
+    dh_parameters = dh_params(joint_positions)
+
+    T_07 = TF_matrix(0, dh_parameters)
+    for i in range(1, NUM_JOINTS):
+        T_07 = T_07 * TF_matrix(i, dh_parameters)
+
+    submat = T_07[0:3, 3:4]
+    quaternion = Quaternion.from_rotation_matrix(T_07[0:3, 0:3])
+
+    # sympy quaternion is a + bi + cj + dk, a is the scalar part (w)
+    position = [float(submat[0]), float(submat[1]), float(submat[2])]
+    orientation = [float(quaternion.b), float(quaternion.c), float(quaternion.d),
+                   float(quaternion.a)]
+    return position, orientation
@@ -1,97 +1,127 @@
+from dummy_control_msgs.msg import DummyControlDebug
+from geometry_msgs.msg import Pose
+from node_utils.instrumentation import Instrumentation
+from node_utils.latest_wins import CoalescingSubscription
+from panda_fk.fk_generated import fk_all, fk_matrix
+from panda_fk.kinematics import (condition_number, fk_sympy, FLANGE_INDEX, jacobian_from_frames,
+                                 manipulability, matrix_to_quaternion)
 import rclpy
+from rclpy.logging import LoggingSeverity
 from rclpy.node import Node
-from std_msgs.msg import String
 from sensor_msgs.msg import JointState
-import tf2_ros
-from sympy import Matrix, Quaternion, sin, cos
-from sympy.vector import matrix_to_vector, CoordSys3D
-import math
-from geometry_msgs.msg import Pose
-#from tf2_ros import quaternion_from_matrix, translation_from_matrix
+from std_msgs.msg import Float64
+# from tf2_ros import quaternion_from_matrix, translation_from_matrix
+
 
 class PandaJointSubscriber(Node):
 
     def __init__(self):
         super().__init__('panda_joint_subscriber')
-        self.subscription = self.create_subscription(
+
+        # Use the symbolic sympy chain instead of the numeric one (reference only, slow)
+        self.declare_parameter('use_sympy', False)
+        self.use_sympy = self.get_parameter('use_sympy').get_parameter_value().bool_value
+
+        # Only the newest joint state is processed, at most max_rate times per second
+        # (0 = no limit)
+        self.declare_parameter('max_rate', 0.0)
+        max_rate = self.get_parameter('max_rate').get_parameter_value().double_value
+
+        # Callback latency statistics on /diagnostics (parameter instrumentation:=true)
+        self.instrumentation = Instrumentation(self)
+        self.instrumentation.instrument(self, 'listener_callback', 'publish_jacobian_info')
+
+        self.subscription = CoalescingSubscription(
+            self,
             JointState,
             'joint_states',
             self.listener_callback,
-            10)
-        
+            max_rate)
+
         self.publisher = self.create_publisher(Pose, 'pose_topic', 10)
 
+        # Jacobian, manipulability and condition number at the joint state rate (opt-in)
+        self.declare_parameter('publish_jacobian', False)
+        self.publish_jacobian = self.get_parameter(
+            'publish_jacobian').get_parameter_value().bool_value
+        # Warn about near-singular configurations below this manipulability (0 disables)
+        self.declare_parameter('manipulability_threshold', 0.01)
+        self.manipulability_threshold = self.get_parameter(
+            'manipulability_threshold').get_parameter_value().double_value
+
+        if self.publish_jacobian:
+            self.jacobian_publisher = self.create_publisher(
+                DummyControlDebug, 'jacobian_topic', 10)
+            self.manipulability_publisher = self.create_publisher(Float64, 'manipulability', 10)
+            self.condition_publisher = self.create_publisher(Float64, 'condition_number', 10)
+        self.frame_no = 0
+        # Formatting the whole JointState is expensive, only done when it is logged
+        self.log_values = self.get_logger().is_enabled_for(LoggingSeverity.DEBUG)
+
     def listener_callback(self, msg):
-        self.get_logger().info('I heard: "%s"' % msg)
+        if self.log_values:
+            self.get_logger().debug('I heard: "%s"' % msg)
         self.joint_var = []
-        for i in range(0,7):
+        for i in range(0, 7):
             self.joint_var.append((msg.position[i]))
-        
-        dh_parameters = self.dh_params(self.joint_var)
-
-        T_01 = self.TF_matrix(0,dh_parameters)
-        T_12 = self.TF_matrix(1,dh_parameters)
-        T_23 = self.TF_matrix(2,dh_parameters)
-        T_34 = self.TF_matrix(3,dh_parameters)
-        T_45 = self.TF_matrix(4,dh_parameters)
-        T_56 = self.TF_matrix(5,dh_parameters)
-        T_67 = self.TF_matrix(6,dh_parameters)
 
-        T_07 = T_01*T_12*T_23*T_34*T_45*T_56*T_67 
-        T_07_rot = T_07[0:3, 0:3]
-       
-        C = CoordSys3D('C')
-        submat = T_07[0:3,3:4]
-        translation = matrix_to_vector(T_07[0:3,3:4], C)
-        quaternion = Quaternion.from_rotation_matrix(T_07_rot)
-
-        print("QUAT:", quaternion)
-        print("TRANS:", translation)
-        print("SUBMAT:", submat)
+        frames = None
+        if self.use_sympy:
+            position, quaternion = fk_sympy(self.joint_var)
+        elif self.publish_jacobian:
+            # The Jacobian needs every link frame, the flange is one of them
+            frames = fk_all(self.joint_var)
+            T = frames[FLANGE_INDEX]
+            position = T[0:3, 3]
+            quaternion = matrix_to_quaternion(T[0:3, 0:3])
+        else:
+            T = fk_matrix(self.joint_var)
+            position = T[0:3, 3]
+            quaternion = matrix_to_quaternion(T[0:3, 0:3])
 
         # Writing data to the Pose message for publishing
         panda_pose = Pose()
-        panda_pose.position.x = float(submat[0])
-        panda_pose.position.y = float(submat[1])
-        panda_pose.position.z = float(submat[2])
-        panda_pose.orientation.x = float(quaternion.a)
-        panda_pose.orientation.y = float(quaternion.b)
-        panda_pose.orientation.z = float(quaternion.c)
-        panda_pose.orientation.w = float(quaternion.d)
-
-        print("panda pose position:", panda_pose.position)
-        print("panda pose orientation", panda_pose.orientation)
-        
+        panda_pose.position.x = float(position[0])
+        panda_pose.position.y = float(position[1])
+        panda_pose.position.z = float(position[2])
+        panda_pose.orientation.x = float(quaternion[0])
+        panda_pose.orientation.y = float(quaternion[1])
+        panda_pose.orientation.z = float(quaternion[2])
+        panda_pose.orientation.w = float(quaternion[3])
+
         self.publisher.publish(panda_pose)
-    
-    def dh_params(self,joint_variable):
 
-        joint_var = joint_variable
-        M_PI = math.pi
+        if self.publish_jacobian:
+            if frames is None:
+                frames = fk_all(self.joint_var)
+            self.publish_jacobian_info(msg, jacobian_from_frames(frames))
 
-        # Create DH parameters (data given by maker franka-emika)
-        self.dh = [[ 0,      0,        0.333,   joint_var[0]],
-            [-M_PI/2,   0,        0,       joint_var[1]],
-            [ M_PI/2,   0,        0.316,   joint_var[2]],
-            [ M_PI/2,   0.0825,   0,       joint_var[3]],
-            [-M_PI/2,  -0.0825,   0.384,   joint_var[4]],
-            [ M_PI/2,   0,        0,       joint_var[5]],
-            [ M_PI/2,   0.088,    0.107,   joint_var[6]]]
-        
-        return self.dh
-      
-    def TF_matrix(self,i,dh):
-        # Define Transformation matrix based on DH params
-        alpha = dh[i][0]
-        a = dh[i][1]
-        d = dh[i][2]
-        q = dh[i][3]
-        
-        TF = Matrix([[cos(q),-sin(q), 0, a],
-                    [sin(q)*cos(alpha), cos(q)*cos(alpha), -sin(alpha), -sin(alpha)*d],
-                    [sin(q)*sin(alpha), cos(q)*sin(alpha),  cos(alpha),  cos(alpha)*d],
-                    [   0,  0,  0,  1]])
-        return TF
+    def publish_jacobian_info(self, msg, J):
+        w = float(manipulability(J))
+        cond = float(condition_number(J))
+
+        debug_msg = DummyControlDebug()
+        debug_msg.frame_no = self.frame_no
+        debug_msg.timestamp = msg.header.stamp.sec * 1000000000 + msg.header.stamp.nanosec
+        debug_msg.position = [float(p) for p in self.joint_var]
+        debug_msg.velocity = [float(v) for v in msg.velocity[0:7]]
+        debug_msg.effort = [float(e) for e in msg.effort[0:7]]
+        debug_msg.jacobian = J.ravel().tolist()  # 6x7, row-major
+        self.jacobian_publisher.publish(debug_msg)
+        self.frame_no += 1
+
+        self.manipulability_publisher.publish(Float64(data=w))
+        self.condition_publisher.publish(Float64(data=cond))
+
+        if w < self.manipulability_threshold:
+            self.get_logger().warn(
+                f'Near-singular configuration: manipulability={w:.5f} condition={cond:.1f}',
+                throttle_duration_sec=1.0)
+
+    def destroy_node(self):
+        self.subscription.destroy()
+        self.instrumentation.destroy()
+        super().destroy_node()
 
 
 def main(args=None):
@@ -107,6 +137,7 @@ def main(args=None):
     panda_subscriber.destroy_node()
     rclpy.shutdown()
 
+
 if __name__ == '__main__':
     main()
 
@@ -162,7 +193,7 @@ class Direct_Kinematics():
     def jointStateCallback(self,message):
         rate = rospy.Rate(100)  # Set rate for the node execution
         self.joint_var = []
-        for i in range(0,7):
+        for i in range(0, 7):
             self.joint_var.append((message.position[i]))
 
         dh_parameters = self.dh_params(self.joint_var)
@@ -198,5 +229,3 @@ if __name__ == '__main__':
     Direct_Kinematics()
     rospy.spin()
 """
-
-
@@ -0,0 +1,316 @@
+"""Array-backed kinematic tree compiled from a URDF.
+
+The URDF is parsed once into flat arrays, one entry per link in topological
+order (every parent comes before its children, the root link is index 0):
+
+    parent       index of the parent link, -1 for the root
+    origins      (n_links, 4, 4) joint origin in the parent link frame
+    axes         (n_links, 3) unit joint axes
+    joint_types  FIXED, REVOLUTE (also continuous) or PRISMATIC
+
+and lower/upper position limits per variable of the joint vector (-inf/inf
+for continuous joints).
+
+Forward kinematics over that representation works for any robot in
+panda2_description/urdf or urdf_tutorial_r2d2 - the Panda chain in
+panda_fk.kinematics is checked against it in test/test_urdf_tree.py.
+
+Example:
+
+    tree = KinematicTree.from_file("panda2_description/urdf/panda2_inertias.urdf")
+    q = tree.joint_vector(msg.name, msg.position)
+    poses = tree.fk(q)                        # (n_links, 4, 4) in tree.root
+    poses = tree.fk_batch(Q)                  # (N, n_links, 4, 4)
+"""
+import math
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from panda_fk.kinematics import DEFAULT_CHUNK_SIZE
+
+FIXED = 0
+REVOLUTE = 1
+PRISMATIC = 2
+
+JOINT_TYPES = {
+    'fixed': FIXED,
+    'revolute': REVOLUTE,
+    'continuous': REVOLUTE,
+    'prismatic': PRISMATIC,
+}
+
+
+def parse_vector(text, default):
+    if text is None:
+        return list(default)
+    return [float(v) for v in text.split()]
+
+
+def rpy_to_matrix(roll, pitch, yaw):
+    """Return the 3x3 rotation of URDF rpy angles.
+
+    Fixed axes x, y, z: Rz(yaw) Ry(pitch) Rx(roll).
+    """
+    sr, cr = math.sin(roll), math.cos(roll)
+    sp, cp = math.sin(pitch), math.cos(pitch)
+    sy, cy = math.sin(yaw), math.cos(yaw)
+    return np.array([
+        [cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr],
+        [sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr],
+        [-sp, cp * sr, cp * cr]])
+
+
+def rpy_to_quaternion(roll, pitch, yaw):
+    """Return the quaternion (x, y, z, w) of URDF rpy angles."""
+    sr, cr = math.sin(roll / 2), math.cos(roll / 2)
+    sp, cp = math.sin(pitch / 2), math.cos(pitch / 2)
+    sy, cy = math.sin(yaw / 2), math.cos(yaw / 2)
+    return np.array([
+        sr * cp * cy - cr * sp * sy,
+        cr * sp * cy + sr * cp * sy,
+        cr * cp * sy - sr * sp * cy,
+        cr * cp * cy + sr * sp * sy])
+
+
+def origin_matrix(xyz, rpy):
+    T = np.eye(4)
+    T[0:3, 0:3] = rpy_to_matrix(*rpy)
+    T[0:3, 3] = xyz
+    return T
+
+
+class KinematicTree(object):
+    """Links, joints and origins of a URDF as arrays, see the module docstring.
+
+    Only the movable, non-mimic joints are variables of the joint vector, in
+    the order of variable_names. Mimic joints follow their master joint.
+    Floating and planar joints are not supported.
+    """
+
+    def __init__(self, robot):
+        links = [link.get('name') for link in robot.findall('link')]
+        joints = {}
+        children = {}
+        for joint in robot.findall('joint'):
+            child = joint.find('child').get('link')
+            parent = joint.find('parent').get('link')
+            joint_type = joint.get('type')
+            if joint_type not in JOINT_TYPES:
+                raise ValueError(f"Joint {joint.get('name')}: type {joint_type} is not supported")
+            origin = joint.find('origin')
+            axis = joint.find('axis')
+            mimic = joint.find('mimic')
+            limit = joint.find('limit')
+            bounded = joint_type != 'continuous' and limit is not None
+            joints[child] = {
+                'name': joint.get('name'),
+                'parent': parent,
+                'type': JOINT_TYPES[joint_type],
+                'xyz': parse_vector(origin.get('xyz') if origin is not None else None, (0, 0, 0)),
+                'rpy': parse_vector(origin.get('rpy') if origin is not None else None, (0, 0, 0)),
+                'axis': parse_vector(axis.get('xyz') if axis is not None else None, (1, 0, 0)),
+                'mimic': None if mimic is None else (mimic.get('joint'),
+                                                     float(mimic.get('multiplier', 1.0)),
+                                                     float(mimic.get('offset', 0.0))),
+                'lower': float(limit.get('lower', 0.0)) if bounded else -math.inf,
+                'upper': float(limit.get('upper', 0.0)) if bounded else math.inf}
+            children.setdefault(parent, []).append(child)
+
+        roots = [name for name in links if name not in joints]
+        if len(roots) != 1:
+            raise ValueError(f"URDF must have exactly one root link, found: {', '.join(roots)}")
+        self.root = roots[0]
+
+        # Breadth first from the root, so parents always come first
+        self.link_names = [self.root]
+        for name in self.link_names:
+            self.link_names.extend(children.get(name, []))
+        self.link_index = {name: i for i, name in enumerate(self.link_names)}
+        n = len(self.link_names)
+
+        self.parent = np.full(n, -1, dtype=np.intp)
+        self.origins = np.tile(np.eye(4), (n, 1, 1))
+        self.axes = np.zeros((n, 3))
+        self.joint_types = np.zeros(n, dtype=np.intp)
+        self.joint_names = [''] * n
+        for i, name in enumerate(self.link_names[1:], start=1):
+            joint = joints[name]
+            self.parent[i] = self.link_index[joint['parent']]
+            self.origins[i] = origin_matrix(joint['xyz'], joint['rpy'])
+            axis = np.array(joint['axis'], dtype=np.float64)
+            self.axes[i] = axis / np.linalg.norm(axis)
+            self.joint_types[i] = joint['type']
+            self.joint_names[i] = joint['name']
+
+        # Joint vector: movable joints without mimic, in topological order
+        movable = [i for i in range(n) if self.joint_types[i] != FIXED]
+        variables = [joints[self.link_names[i]] for i in movable]
+        variables = [joint for joint in variables if joint['mimic'] is None]
+        self.variable_names = [joint['name'] for joint in variables]
+        self.variable_index = {name: k for k, name in enumerate(self.variable_names)}
+        variable_index = self.variable_index
+        self.lower = np.array([joint['lower'] for joint in variables])
+        self.upper = np.array([joint['upper'] for joint in variables])
+
+        # value of joint i = q[source[i]] * scale[i] + offset[i], fixed joints get scale 0
+        self.source = np.zeros(n, dtype=np.intp)
+        self.scale = np.zeros(n)
+        self.offset = np.zeros(n)
+        for i in movable:
+            mimic = joints[self.link_names[i]]['mimic']
+            if mimic is None:
+                self.source[i] = variable_index[self.joint_names[i]]
+                self.scale[i] = 1.0
+            else:
+                if mimic[0] not in variable_index:
+                    raise ValueError(
+                        f'Joint {self.joint_names[i]} mimics unknown joint {mimic[0]}')
+                self.source[i] = variable_index[mimic[0]]
+                self.scale[i] = mimic[1]
+                self.offset[i] = mimic[2]
+
+        # Cross product matrices of the axes for Rodrigues' formula
+        x, y, z = self.axes[:, 0], self.axes[:, 1], self.axes[:, 2]
+        zero = np.zeros(n)
+        self.K = np.stack([np.stack([zero, -z, y], -1),
+                           np.stack([z, zero, -x], -1),
+                           np.stack([-y, x, zero], -1)], -2)
+        self.K2 = self.K @ self.K
+
+        # Fixed joints are folded into constant offsets: every link is
+        # poses[anchor] @ offset (@ motion for movable links), the anchor being
+        # the nearest movable ancestor or the root. FK then only steps through
+        # the movable joints, the fixed links follow in one matmul.
+        self.anchor = np.zeros(n, dtype=np.intp)
+        self.offsets = self.origins.copy()
+        for i in range(1, n):
+            anchor = self.parent[i]
+            while anchor != 0 and self.joint_types[anchor] == FIXED:
+                self.offsets[i] = self.origins[anchor] @ self.offsets[i]
+                anchor = self.parent[anchor]
+            self.anchor[i] = anchor
+        # Link indices of the movable and of the fixed joints (root excluded)
+        self.movable = np.array(movable, dtype=np.intp)
+        self.fixed = np.array([i for i in range(1, n) if self.joint_types[i] == FIXED],
+                              dtype=np.intp)
+
+        # offset @ motion of a revolute joint is offset + sin(q) offset K + (1 - cos(q)) offset K^2
+        K = np.zeros((n, 4, 4))
+        K[:, 0:3, 0:3] = self.K
+        K2 = np.zeros((n, 4, 4))
+        K2[:, 0:3, 0:3] = self.K2
+        self.offsets_K = self.offsets @ K
+        self.offsets_K2 = self.offsets @ K2
+
+    @classmethod
+    def from_string(cls, xml):
+        return cls(ET.fromstring(xml))
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(ET.parse(path).getroot())
+
+    @property
+    def num_variables(self):
+        return len(self.variable_names)
+
+    def joint_limits(self, names):
+        """Return (lower, upper) position limits of the named variables."""
+        index = [self.variable_index[name] for name in names]
+        return self.lower[index], self.upper[index]
+
+    def joint_vector(self, names, positions, out=None):
+        """Order named positions (e.g. a JointState) as the joint vector, missing joints stay 0."""
+        if out is None:
+            out = np.zeros(self.num_variables)
+        for name, position in zip(names, positions):
+            k = self.variable_index.get(name)
+            if k is not None:
+                out[k] = position
+        return out
+
+    def joint_values(self, q):
+        """Return (..., n_links) joint values - mimic joints resolved, 0 for fixed joints."""
+        q = np.asarray(q, dtype=np.float64)
+        if self.num_variables == 0:
+            return np.zeros(q.shape[:-1] + (len(self.link_names),))
+        return q[..., self.source] * self.scale + self.offset
+
+    def motion(self, i, values):
+        """Return (M, 4, 4) joint motions of link i for (M,) joint values."""
+        motion = np.zeros(values.shape + (4, 4))
+        if self.joint_types[i] == REVOLUTE:
+            # Rodrigues' formula
+            s = np.sin(values)[:, None, None]
+            c = np.cos(values)[:, None, None]
+            motion[:, 0:3, 0:3] = np.eye(3) + s * self.K[i] + (1.0 - c) * self.K2[i]
+        else:
+            motion[:, 0:3, 0:3] = np.eye(3)
+            motion[:, 0:3, 3] = values[:, None] * self.axes[i]
+        motion[:, 3, 3] = 1.0
+        return motion
+
+    def local_transforms(self, q, links=None):
+        """Return (..., n_links, 4, 4) transforms of every link relative to its parent.
+
+        links selects the link indices to compute, e.g. tree.movable when the
+        fixed joints are published once elsewhere: (..., len(links), 4, 4).
+        """
+        values = self.joint_values(q)
+        batch_shape = values.shape[:-1]
+        values = values.reshape(-1, len(self.link_names))
+        if links is None:
+            links = range(len(self.link_names))
+        else:
+            links = np.asarray(links, dtype=np.intp).tolist()
+        local = np.empty((len(links), len(values), 4, 4))
+        for k, i in enumerate(links):
+            if self.joint_types[i] == FIXED:
+                local[k] = self.origins[i]
+            else:
+                local[k] = self.origins[i] @ self.motion(i, values[:, i])
+        return np.moveaxis(local, 0, -3).reshape(batch_shape + local.shape[0:1] + (4, 4))
+
+    def fk_batch(self, q, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Return (..., n_links, 4, 4) poses of every link in the root frame.
+
+        q: (..., n_variables) joint vectors.
+        """
+        values = self.joint_values(q)
+        batch_shape = values.shape[:-1]
+        values = values.reshape(-1, len(self.link_names))
+        n = len(self.link_names)
+        out = np.empty((len(values), n, 4, 4))
+        # Link-major within a chunk keeps every matmul on contiguous (M, 4, 4) blocks
+        poses = np.empty((n, min(chunk_size, len(values)), 4, 4))
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            m = len(chunk)
+            poses[0, :m] = self.origins[0]
+            for i in self.movable.tolist():
+                np.matmul(poses[self.anchor[i], :m] @ self.offsets[i], self.motion(i, chunk[:, i]),
+                          out=poses[i, :m])
+            if len(self.fixed) > 0:
+                fixed = self.fixed
+                poses[fixed, :m] = poses[self.anchor[fixed], :m] @ self.offsets[fixed, None]
+            out[start:start + m] = np.moveaxis(poses[:, :m], 0, 1)
+        return out.reshape(batch_shape + (n, 4, 4))
+
+    def fk(self, q):
+        """Return (n_links, 4, 4) poses of every link in the root frame for one joint vector."""
+        values = self.joint_values(q).tolist()
+        poses = np.empty((len(self.link_names), 4, 4))
+        poses[0] = self.origins[0]
+        anchor = self.anchor.tolist()
+        for i in self.movable.tolist():
+            if self.joint_types[i] == REVOLUTE:
+                local = (self.offsets[i] + math.sin(values[i]) * self.offsets_K[i]
+                         + (1.0 - math.cos(values[i])) * self.offsets_K2[i])
+            else:
+                local = self.offsets[i].copy()
+                local[0:3, 3] += values[i] * (self.offsets[i, 0:3, 0:3] @ self.axes[i])
+            np.matmul(poses[anchor[i]], local, out=poses[i])
+        if len(self.fixed) > 0:
+            poses[self.fixed] = poses[self.anchor[self.fixed]] @ self.offsets[self.fixed]
+        return poses
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+# Per-message latency of the panda_fk forward kinematics.
+# Compares the generated closed form (default in panda_fk_node), the numeric
+# NumPy chain and the symbolic sympy reference (use_sympy:=true).
+#
+# Example usage:
+#
+#    python3 scripts/benchmark_fk.py [number_of_samples]
+#
+
+from os import path
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from panda_fk import fk_generated  # noqa: E402
+from panda_fk.kinematics import fk, fk_sympy, matrix_to_quaternion  # noqa: E402
+
+
+def fk_closed_form(q):
+    T = fk_generated.fk_matrix(q)
+    return T[0:3, 3], matrix_to_quaternion(T[0:3, 0:3])
+
+
+def time_per_call(func, samples):
+    start = time.perf_counter()
+    for q in samples:
+        func(q)
+    return (time.perf_counter() - start) / len(samples)
+
+
+def main():
+    n = 200
+    if len(sys.argv) > 1:
+        n = int(sys.argv[1])
+
+    rng = np.random.default_rng(0)
+    samples = [list(q) for q in rng.uniform(-2.8, 2.8, size=(n, 7))]
+
+    # Both implementations must agree before timing them
+    for q in samples[:10]:
+        assert np.allclose(fk_closed_form(q)[0], fk(q)[0], atol=1e-12)
+        p_num, q_num = fk(q)
+        p_sym, q_sym = fk_sympy(q)
+        assert np.allclose(p_num, p_sym, atol=1e-9)
+        assert (np.allclose(q_num, q_sym, atol=1e-9)
+                or np.allclose(q_num, -np.array(q_sym), atol=1e-9))
+
+    t_generated = time_per_call(fk_closed_form, samples)
+    t_numeric = time_per_call(fk, samples)
+    t_sympy = time_per_call(fk_sympy, samples[:max(1, n // 10)])
+
+    print(f'samples:  {n}')
+    print(f'closed:   {t_generated * 1e6:10.1f} us/message  ({1.0 / t_generated:10.0f} Hz)')
+    print(f'numpy:    {t_numeric * 1e6:10.1f} us/message  ({1.0 / t_numeric:10.0f} Hz)')
+    print(f'sympy:    {t_sympy * 1e6:10.1f} us/message  ({1.0 / t_sympy:10.0f} Hz)')
+    print(f'speedup:  {t_sympy / t_generated:10.1f}x (closed form vs sympy)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+# Throughput of the batched forward kinematics over whole trajectories.
+# Compares fk_pose_batch() on 10^6 joint samples with the per-row fk() loop
+# and times annotate_trace on a CSV of the same size.
+#
+# Example usage:
+#
+#    python3 scripts/benchmark_fk_batch.py [number_of_rows] [chunk_size]
+#
+
+import io
+from os import path
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from panda_fk.annotate_trace import annotate, JOINT_NAMES  # noqa: E402
+from panda_fk.kinematics import DEFAULT_CHUNK_SIZE, fk, fk_pose_batch  # noqa: E402
+
+
+def main():
+    n = 1000000
+    chunk_size = DEFAULT_CHUNK_SIZE
+    if len(sys.argv) > 1:
+        n = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        chunk_size = int(sys.argv[2])
+
+    rng = np.random.default_rng(0)
+    q = rng.uniform(-2.8, 2.8, size=(n, 7))
+
+    start = time.perf_counter()
+    poses = fk_pose_batch(q, chunk_size)
+    t_batch = time.perf_counter() - start
+
+    # The row loop is far too slow for 10^6 rows, time a subset and extrapolate
+    n_loop = min(n, 10000)
+    start = time.perf_counter()
+    for row in q[:n_loop]:
+        fk(row)
+    t_loop = (time.perf_counter() - start) * n / n_loop
+
+    check = np.array([np.concatenate(fk(row)) for row in q[:100]])
+    assert np.allclose(poses[:100], check, atol=1e-12)
+
+    print(f'rows:        {n}  (chunk size {chunk_size})')
+    print(f'batched:     {t_batch:8.3f} s  ({n / t_batch:12.0f} rows/s)')
+    print(f'row loop:    {t_loop:8.3f} s  ({n / t_loop:12.0f} rows/s, '
+          f'extrapolated from {n_loop} rows)')
+    print(f'speedup:     {t_loop / t_batch:8.1f}x')
+
+    # End-to-end CSV annotation
+    header = ','.join(['time_ns'] + JOINT_NAMES)
+    times = np.arange(n, dtype=np.int64) * 1000000 + 1680000000000000000
+    lines = [header] + [f'{t},' + ','.join(repr(v) for v in row)
+                        for t, row in zip(times.tolist(), q.tolist())]
+    infile = io.StringIO('\n'.join(lines) + '\n')
+    outfile = io.StringIO()
+    start = time.perf_counter()
+    annotate(infile, outfile, chunk_size)
+    t_csv = time.perf_counter() - start
+    print(f'annotate:    {t_csv:8.3f} s  ({n / t_csv:12.0f} rows/s, CSV parse + FK + format)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+# Solves per second and convergence rate of the panda_fk IK solver on random
+# reachable poses (FK of random configurations within the joint limits).
+#
+# Example usage:
+#
+#    python3 scripts/benchmark_ik.py [number_of_targets]
+#
+
+from os import path
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from panda_fk.ik import IKSolver, urdf_joint_limits  # noqa: E402
+from panda_fk.kinematics import fk_all_batch, FLANGE_INDEX  # noqa: E402
+
+
+def report(name, n, success, elapsed):
+    print(f'{name:28s} {n / elapsed:10.0f} solves/s  {elapsed / n * 1e3:8.3f} ms/solve  '
+          f'converged {100.0 * np.mean(success):5.1f} %')
+
+
+def main():
+    n = 200
+    if len(sys.argv) > 1:
+        n = int(sys.argv[1])
+
+    lower, upper = urdf_joint_limits()
+    rng = np.random.default_rng(0)
+    q_random = rng.uniform(lower, upper, size=(n, 7))
+    targets = fk_all_batch(q_random)[:, FLANGE_INDEX]
+
+    # Cold: no cache, no previous solution
+    solver = IKSolver(seed=0)
+    success = []
+    start = time.perf_counter()
+    for T in targets:
+        solver.last_solution = solver.last_position = None
+        success.append(solver.solve(T)[1])
+    report('single, cold start', n, success, time.perf_counter() - start)
+
+    # Warm: a smooth trajectory, every target close to the previous solution
+    t = np.linspace(0.0, 1.0, n)[:, None]
+    q_path = q_random[0] + 0.5 * np.sin(2 * np.pi * t) * (upper - lower) / 8.0
+    q_path = np.clip(q_path, lower, upper)
+    path_targets = fk_all_batch(q_path)[:, FLANGE_INDEX]
+    solver = IKSolver(seed=0)
+    solver.solve(path_targets[0], q0=q_path[0])
+    success = []
+    start = time.perf_counter()
+    for T in path_targets:
+        success.append(solver.solve(T)[1])
+    report('single, warm start (path)', n, success, time.perf_counter() - start)
+
+    # Batch: all targets iterated together
+    solver = IKSolver(seed=0)
+    start = time.perf_counter()
+    _, success = solver.solve_batch(targets)
+    report('batch, cold start', n, success, time.perf_counter() - start)
+
+    # Cache: recorded configurations (here random ones) as seeds of far targets
+    cached = rng.uniform(lower, upper, size=(1000, 7))
+    solver = IKSolver(seed=0)
+    solver.add_to_cache(cached)
+    success = []
+    start = time.perf_counter()
+    for T in targets:
+        solver.last_solution = solver.last_position = None
+        success.append(solver.solve(T)[1])
+    report('single, nearest cached', n, success, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    _, success = solver.solve_batch(targets)
+    report('batch, nearest cached', n, success, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+# Generates panda_fk/fk_generated.py - closed form forward kinematics as
+# straight-line arithmetic. The DH table and the fixed flange/TCP transforms
+# are taken from panda_fk.kinematics, the symbolic products are built with
+# sympy and shared terms are pulled out with common-subexpression elimination.
+# sympy is only needed here, the generated module imports math and numpy.
+#
+# Example usage (rerun after changing the DH table, commit the result):
+#
+#    python3 scripts/generate_fk.py
+#
+
+from os import path
+import sys
+
+import sympy
+
+PACKAGE_DIR = path.dirname(path.dirname(path.realpath(__file__)))
+OUTPUT_PATH = path.join(PACKAGE_DIR, 'panda_fk', 'fk_generated.py')
+
+sys.path.insert(0, PACKAGE_DIR)
+from panda_fk import kinematics  # noqa: E402, I100
+
+
+# The generated expressions are long single lines, flake8 skips the file
+HEADER = '''# flake8: noqa
+"""Closed-form forward kinematics of the Franka Emika Panda.
+
+GENERATED by scripts/generate_fk.py from the DH table in panda_fk.kinematics,
+do not edit by hand. Same results as kinematics.fk_matrix() / fk_all().
+"""
+from math import cos, sin
+
+import numpy as np
+'''
+
+
+def exact_angle(value):
+    # alpha is a multiple of pi/2 - keep it exact so cos(pi/2) becomes a true zero
+    return sympy.nsimplify(value / float(sympy.pi), tolerance=1e-12) * sympy.pi
+
+
+def exact_number(value):
+    if abs(value) < 1e-12:
+        return sympy.S.Zero
+    if abs(value - round(value)) < 1e-12:
+        return sympy.Integer(round(value))
+    return sympy.Float(value)
+
+
+def dh_matrix(alpha, a, d, s, c):
+    alpha = exact_angle(alpha)
+    return sympy.Matrix([
+        [c, -s, 0, sympy.Float(a)],
+        [s * sympy.cos(alpha), c * sympy.cos(alpha), -sympy.sin(alpha),
+         -sympy.sin(alpha) * sympy.Float(d)],
+        [s * sympy.sin(alpha), c * sympy.sin(alpha), sympy.cos(alpha),
+         sympy.cos(alpha) * sympy.Float(d)],
+        [0, 0, 0, 1]])
+
+
+def fixed_matrix(T):
+    return sympy.Matrix(4, 4, lambda i, j: exact_number(T[i, j]))
+
+
+def symbolic_frames():
+    # sin/cos of every joint are plain symbols, computed once at the top of the generated function
+    s = sympy.symbols('s1:%d' % (kinematics.NUM_JOINTS + 1))
+    c = sympy.symbols('c1:%d' % (kinematics.NUM_JOINTS + 1))
+
+    frames = []
+    T = sympy.eye(4)
+    for i in range(kinematics.NUM_JOINTS):
+        alpha, a, d = kinematics.DH_TABLE[i]
+        T = T * dh_matrix(alpha, a, d, s[i], c[i])
+        frames.append(T)
+    flange = T * fixed_matrix(kinematics.T_7_FLANGE)
+    frames.append(flange)
+    frames.append(flange * fixed_matrix(kinematics.T_FLANGE_TCP))
+    return frames
+
+
+def emit_function(name, doc, matrices):
+    # Only the upper 3x4 block is unknown, the last row is always [0, 0, 0, 1]
+    entries = [m[i, j].evalf() for m in matrices for i in range(3) for j in range(4)]
+    replacements, reduced = sympy.cse(entries, symbols=sympy.numbered_symbols('x'))
+
+    lines = [f'def {name}(q):', f'    """{doc}"""']
+    for i in range(kinematics.NUM_JOINTS):
+        lines.append(f'    s{i + 1} = sin(q[{i}])')
+        lines.append(f'    c{i + 1} = cos(q[{i}])')
+    for symbol, expr in replacements:
+        lines.append(f'    {symbol} = {sympy.pycode(expr)}')
+
+    rendered = []
+    for k in range(len(matrices)):
+        rows = []
+        for i in range(3):
+            entries = (sympy.pycode(reduced[k * 12 + i * 4 + j]) for j in range(4))
+            rows.append('[' + ', '.join(entries) + ']')
+        rows.append('[0.0, 0.0, 0.0, 1.0]')
+        rendered.append('[' + ',\n         '.join(rows) + ']')
+    if len(matrices) == 1:
+        lines.append('    return np.array(' + rendered[0] + ')')
+    else:
+        lines.append('    return np.array([\n        ' + ',\n        '.join(rendered) + '])')
+    return '\n'.join(lines), len(replacements)
+
+
+def main():
+    frames = symbolic_frames()
+
+    flange_src, n_flange = emit_function(
+        'fk_matrix', 'Return the 4x4 flange transform (panda_link8).',
+        [frames[kinematics.FLANGE_INDEX]])
+    all_src, n_all = emit_function(
+        'fk_all', 'Return (len(FRAME_NAMES), 4, 4) transforms of every frame in panda_link0.',
+        frames)
+
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as outfile:
+        outfile.write(HEADER + '\n\n' + flange_src + '\n\n\n' + all_src + '\n')
+
+    print(f'Written {OUTPUT_PATH}')
+    print(f'  fk_matrix: {n_flange} shared subexpressions')
+    print(f'  fk_all:    {n_all} shared subexpressions')
+
+
+if __name__ == '__main__':
+    main()
@@ -20,7 +20,8 @@ setup(
     tests_require=['pytest'],
     entry_points={
         'console_scripts': [
-            'panda_fk_node = panda_fk.panda_fk_node:main'
+            'panda_fk_node = panda_fk.panda_fk_node:main',
+            'annotate_trace = panda_fk.annotate_trace:main'
         ],
     },
 )
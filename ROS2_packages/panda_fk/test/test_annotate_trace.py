@@ -0,0 +1,47 @@
+# annotate_trace streams a trace in blocks through the batched kinematics, the
+# result must match the scalar functions row by row.
+
+import io
+
+import numpy as np
+from panda_fk import annotate_trace, kinematics
+import pytest
+
+
+def trace(q):
+    lines = ['time_ns,' + ','.join(kinematics.JOINT_NAMES) + ',gripper']
+    for i, row in enumerate(q):
+        values = ','.join(repr(v) for v in row.tolist())
+        lines.append(f'{1680000000000000000 + i},{values},0.04')
+        if i == 3:
+            lines.append('')
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 100])
+def test_annotate_matches_scalar_fk(chunk_size):
+    q = np.random.default_rng(2).uniform(-2.5, 2.5, size=(7, 7))
+    out = io.StringIO()
+    n = annotate_trace.annotate(io.StringIO(trace(q)), out, chunk_size, with_jacobian=True)
+    assert n == len(q)
+
+    header, *rows = out.getvalue().splitlines()
+    assert header.split(',') == (['time_ns'] + kinematics.JOINT_NAMES + ['gripper']
+                                 + annotate_trace.POSE_COLUMNS + annotate_trace.JACOBIAN_COLUMNS)
+    assert len(rows) == len(q)
+    for i, (row, joints) in enumerate(zip(rows, q)):
+        values = row.split(',')
+        # The input columns are copied unchanged
+        assert values[0] == str(1680000000000000000 + i)
+        assert values[8] == '0.04'
+        position, quaternion = kinematics.fk(joints)
+        J = kinematics.jacobian(joints)
+        expected = list(position) + list(quaternion) + [kinematics.manipulability(J),
+                                                        kinematics.condition_number(J)]
+        np.testing.assert_allclose([float(v) for v in values[9:]], expected, rtol=1e-9,
+                                   atol=1e-12)
+
+
+def test_missing_joint_columns():
+    with pytest.raises(ValueError):
+        annotate_trace.annotate(io.StringIO('time_ns,panda_joint1\n0,0.0\n'), io.StringIO())
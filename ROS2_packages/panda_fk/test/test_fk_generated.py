@@ -0,0 +1,43 @@
+# Regression test for the generated closed-form kinematics
+# (panda_fk/fk_generated.py, written by scripts/generate_fk.py).
+
+import numpy as np
+from panda_fk import fk_generated, kinematics
+import pytest
+
+sympy = pytest.importorskip('sympy')
+
+
+def sympy_frames(q):
+    # Symbolic chain built from the reference dh_params/TF_matrix
+    dh = kinematics.dh_params(q)
+    dh[6][2] = 0  # the flange offset is a separate fixed transform
+    frames = []
+    T = sympy.eye(4)
+    for i in range(kinematics.NUM_JOINTS):
+        T = T * kinematics.TF_matrix(i, dh)
+        frames.append(np.array(T.evalf(), dtype=np.float64))
+    flange = frames[-1] @ kinematics.T_7_FLANGE
+    frames.append(flange)
+    frames.append(flange @ kinematics.T_FLANGE_TCP)
+    return np.array(frames)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_fk_generated_matches_symbolic_chain(seed):
+    rng = np.random.default_rng(seed)
+    for q in rng.uniform(-np.pi, np.pi, size=(10, 7)):
+        expected = sympy_frames(list(q))
+        np.testing.assert_allclose(fk_generated.fk_all(q), expected, atol=1e-12)
+        np.testing.assert_allclose(
+            fk_generated.fk_matrix(q), expected[kinematics.FLANGE_INDEX], atol=1e-12)
+
+
+def test_fk_generated_matches_sympy_pose():
+    q = [0.1, -0.7, 0.2, -2.3, 0.05, 1.6, 0.8]
+    position, orientation = kinematics.fk_sympy(q)
+    T = fk_generated.fk_matrix(q)
+    np.testing.assert_allclose(T[0:3, 3], position, atol=1e-12)
+    quaternion = kinematics.matrix_to_quaternion(T[0:3, 0:3])
+    assert (np.allclose(quaternion, orientation, atol=1e-12)
+            or np.allclose(quaternion, -np.array(orientation), atol=1e-12))
@@ -0,0 +1,132 @@
+# Inverse kinematics (panda_fk.ik): round trips through the forward
+# kinematics, joint limits, the warm-start cache and the rotation error near pi.
+
+import math
+
+import numpy as np
+from panda_fk import ik, kinematics
+import pytest
+
+
+def axis_angle_matrix(axis, angle):
+    axis = np.asarray(axis, dtype=np.float64) / np.linalg.norm(axis)
+    K = np.array([[0.0, -axis[2], axis[1]], [axis[2], 0.0, -axis[0]], [-axis[1], axis[0], 0.0]])
+    T = np.eye(4)
+    T[0:3, 0:3] = np.eye(3) + math.sin(angle) * K + (1.0 - math.cos(angle)) * K @ K
+    return T
+
+
+def test_limits_come_from_the_urdf():
+    lower, upper = ik.urdf_joint_limits()
+    assert lower.shape == upper.shape == (kinematics.NUM_JOINTS,)
+    np.testing.assert_allclose(lower[[1, 3, 5]], [-1.7628, -3.0718, -0.0175])
+    np.testing.assert_allclose(upper[[1, 3, 5]], [1.7628, -0.0698, 3.7525])
+
+    # Parsed once, callers get their own copies
+    lower[1] = 0.0
+    assert ik.urdf_joint_limits()[0][1] == pytest.approx(-1.7628)
+    assert ik.read_urdf_joint_limits.cache_info().misses == 1
+
+
+def test_unlimited_joints_are_not_clamped(tmp_path):
+    limits = tmp_path / 'joint_limits.yaml'
+    limits.write_text('joint_limits:\n'
+                      '  panda_joint1: {has_position_limits: false}\n'
+                      '  panda_joint2: {has_position_limits: true, max_position: 1.0}\n')
+    lower, upper = ik.load_joint_limits(str(limits))
+    assert lower[0] == -np.inf and upper[0] == np.inf
+    urdf_lower, urdf_upper = ik.urdf_joint_limits()
+    assert upper[1] == 1.0 and lower[1] == urdf_lower[1]
+
+    solver = ik.IKSolver(lower, upper, seed=0)
+    q = (urdf_lower + urdf_upper) / 2.0
+    q[0] = 5.0
+    T = kinematics.fk_all(q)[kinematics.FLANGE_INDEX]
+    solution, success = solver.solve(T, q0=q)
+    assert success
+    assert solution[0] == pytest.approx(5.0)
+    assert np.all(np.isfinite(solver.random_configurations(10)))
+
+
+def test_round_trip_random_reachable_poses():
+    rng = np.random.default_rng(0)
+    q = rng.uniform(*ik.urdf_joint_limits(), size=(20, 7))
+    targets = kinematics.fk_all_batch(q)[:, kinematics.FLANGE_INDEX]
+
+    solver = ik.IKSolver(seed=0)
+    solutions, success = solver.solve_batch(targets)
+    assert success.mean() >= 0.9
+    for target, solution in zip(targets[success], solutions[success]):
+        T = kinematics.fk_matrix(solution)
+        np.testing.assert_allclose(T[0:3, 3], target[0:3, 3], atol=2e-4)
+        np.testing.assert_allclose(T[0:3, 0:3], target[0:3, 0:3], atol=2e-3)
+
+    for target in targets[:5]:
+        solution, ok = solver.solve(target)
+        if ok:
+            np.testing.assert_allclose(kinematics.fk_matrix(solution)[0:3, 3], target[0:3, 3],
+                                       atol=2e-4)
+
+
+def test_solutions_stay_within_limits():
+    # Joint 4 limited to a narrow range: the solver has to stop at the limit
+    lower, upper = ik.urdf_joint_limits()
+    lower[3], upper[3] = -2.0, -1.5
+    solver = ik.IKSolver(lower, upper, seed=0, restarts=1)
+    q = np.array([0.0, 0.3, 0.0, -2.8, 0.0, 2.5, 0.8])
+    solutions, _ = solver.solve_batch(kinematics.fk_all_batch(q[None])[:, kinematics.FLANGE_INDEX],
+                                      q0=q)
+    assert np.all(solutions >= lower - 1e-12) and np.all(solutions <= upper + 1e-12)
+    assert solutions[0, 3] == pytest.approx(-2.0)
+
+
+def test_cache_seeds_far_targets(tmp_path):
+    rng = np.random.default_rng(1)
+    q = rng.uniform(*ik.urdf_joint_limits(), size=(5, 7))
+    waypoints = tmp_path / 'waypoints.csv'
+    header = ['stamp'] + list(kinematics.JOINT_NAMES) + ['panda_finger_joint1']
+    rows = [','.join(header)] + [','.join(str(v) for v in [i, *q_i, 0.04])
+                                 for i, q_i in enumerate(q)]
+    waypoints.write_text('\n'.join(rows) + '\n')
+
+    solver = ik.IKSolver(seed=0, cache_size=4, restarts=0)
+    solver.add_waypoints_csv(str(waypoints))
+    # The oldest waypoint is dropped
+    np.testing.assert_array_equal(solver.cache_q, q[1:])
+    targets = kinematics.fk_all_batch(q)[:, kinematics.FLANGE_INDEX]
+    np.testing.assert_array_equal(solver.nearest_cached(targets[1:]), q[1:])
+
+    # A far last solution is tried after the cached waypoint, which converges at once
+    solver.last_solution = q[1]
+    solver.last_position = targets[1, 0:3, 3]
+    solution, success = solver.solve(targets[4])
+    assert success
+    np.testing.assert_allclose(solution, q[4], atol=1e-9)
+    np.testing.assert_array_equal(solver.last_solution, solution)
+
+    solutions, success = solver.solve_batch(targets[1:])
+    assert np.all(success)
+    np.testing.assert_allclose(solutions, q[1:], atol=1e-9)
+
+
+@pytest.mark.parametrize('axis', [[0, 1, -1], [0, 1, 1], [1, 0, 0], [1, -2, 3], [0, 0, -1]])
+@pytest.mark.parametrize('angle', [math.pi, math.pi - 1e-7, 2.0])
+def test_pose_error_rotation(axis, angle):
+    T = np.eye(4)[None]
+    T_target = axis_angle_matrix(axis, angle)[None]
+    err = ik.pose_error(T, T_target)[0]
+    expected = np.asarray(axis, dtype=np.float64) / np.linalg.norm(axis) * angle
+    np.testing.assert_allclose(err[0:3], 0.0)
+    if angle == math.pi:
+        # At exactly pi both directions are the same rotation
+        if np.dot(err[3:6], expected) < 0:
+            expected = -expected
+    np.testing.assert_allclose(err[3:6], expected, atol=1e-6)
+
+
+def test_pose_error_near_pi_example():
+    # Rotation of pi about (0, 1, -1)/sqrt(2), the x component of the axis is zero
+    err = ik.pose_error(np.eye(4)[None], axis_angle_matrix([0, 1, -1], math.pi)[None])[0]
+    assert abs(err[3]) < 1e-9
+    assert err[4] == pytest.approx(-err[5])
+    assert abs(err[4]) == pytest.approx(math.pi / math.sqrt(2))
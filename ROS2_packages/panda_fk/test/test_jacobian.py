@@ -0,0 +1,67 @@
+# The geometric Jacobian of panda_fk.kinematics against finite differences of
+# the forward kinematics, and manipulability / condition number near a
+# singular configuration.
+
+import math
+
+import numpy as np
+from panda_fk import kinematics
+import pytest
+
+READY = [0.0, -math.pi / 4, 0.0, -3 * math.pi / 4, 0.0, math.pi / 2, math.pi / 4]
+
+
+def rotation_vector(R):
+    """Axis * angle of a small rotation matrix."""
+    angle = math.acos(max(-1.0, min(1.0, (np.trace(R) - 1.0) / 2.0)))
+    w = np.array([R[2, 1] - R[1, 2], R[0, 2] - R[2, 0], R[1, 0] - R[0, 1]])
+    if angle < 1e-12:
+        return 0.5 * w
+    return w * angle / (2.0 * math.sin(angle))
+
+
+def numeric_jacobian(q, frame_index, h=1e-6):
+    J = np.empty((6, kinematics.NUM_JOINTS))
+    for i in range(kinematics.NUM_JOINTS):
+        dq = np.zeros(kinematics.NUM_JOINTS)
+        dq[i] = h
+        plus = kinematics.fk_all(q + dq)[frame_index]
+        minus = kinematics.fk_all(q - dq)[frame_index]
+        J[0:3, i] = (plus[0:3, 3] - minus[0:3, 3]) / (2 * h)
+        J[3:6, i] = rotation_vector(plus[0:3, 0:3] @ minus[0:3, 0:3].T) / (2 * h)
+    return J
+
+
+@pytest.mark.parametrize('frame_index', [kinematics.FLANGE_INDEX, kinematics.TCP_INDEX])
+def test_jacobian_matches_finite_differences(frame_index):
+    rng = np.random.default_rng(3)
+    for q in np.vstack([READY, rng.uniform(-2.5, 2.5, size=(10, 7))]):
+        np.testing.assert_allclose(kinematics.jacobian(q, frame_index),
+                                   numeric_jacobian(q, frame_index), atol=1e-7)
+
+
+def test_jacobian_batch_matches_scalar():
+    q = np.random.default_rng(4).uniform(-2.5, 2.5, size=(6, 7))
+    expected = np.array([kinematics.jacobian(row) for row in q])
+    np.testing.assert_allclose(kinematics.jacobian_batch(q, chunk_size=4), expected, atol=1e-12)
+    np.testing.assert_allclose(kinematics.manipulability(expected),
+                               [kinematics.manipulability(J) for J in expected])
+
+
+def test_manipulability_drops_near_singularity():
+    # With all joints at zero the arm is stretched upright and the axes of
+    # joints 1, 3, 5 and 7 are all vertical - the Jacobian loses rank
+    assert kinematics.manipulability(kinematics.jacobian(np.zeros(7))) < 1e-12
+    assert kinematics.condition_number(kinematics.jacobian(np.zeros(7))) > 1e12
+
+    ready = kinematics.manipulability(kinematics.jacobian(READY))
+    assert ready > 0.05
+    assert kinematics.condition_number(kinematics.jacobian(READY)) < 20
+
+    values = []
+    for e in [0.5, 0.1, 0.01]:
+        q = np.zeros(7)
+        q[1] = q[5] = e
+        values.append(kinematics.manipulability(kinematics.jacobian(q)))
+    assert values[0] > values[1] > values[2]
+    assert values[2] < 1e-3 * ready
@@ -0,0 +1,82 @@
+# Numeric forward kinematics (panda_fk.kinematics) against known Panda poses
+# and the symbolic reference chain.
+
+import math
+
+import numpy as np
+from panda_fk import kinematics
+import pytest
+
+# Joint positions of the Franka "ready" pose, the flange and TCP poses are the
+# ones libfranka reports (O_T_EE with the default hand, 0.1034 m TCP offset)
+READY = [0.0, -math.pi / 4, 0.0, -3 * math.pi / 4, 0.0, math.pi / 2, math.pi / 4]
+
+
+def quaternion_matrix(q):
+    x, y, z, w = q
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]])
+
+
+def test_zero_pose():
+    T = kinematics.fk_matrix([0.0] * 7)
+    np.testing.assert_allclose(T[0:3, 3], [0.088, 0.0, 0.926], atol=1e-12)
+    np.testing.assert_allclose(T[0:3, 0:3], np.diag([1.0, -1.0, -1.0]), atol=1e-12)
+
+
+def test_ready_pose():
+    frames = kinematics.fk_all(READY)
+    flange = frames[kinematics.FLANGE_INDEX]
+    tcp = frames[kinematics.TCP_INDEX]
+    np.testing.assert_allclose(flange[0:3, 3], [0.30689, 0.0, 0.59028], atol=1e-5)
+    np.testing.assert_allclose(tcp[0:3, 3], [0.30689, 0.0, 0.48688], atol=1e-5)
+    np.testing.assert_allclose(kinematics.matrix_to_quaternion(tcp[0:3, 0:3]),
+                               [1.0, 0.0, 0.0, 0.0], atol=1e-12)
+    np.testing.assert_allclose(
+        kinematics.matrix_to_quaternion(flange[0:3, 0:3]),
+        [math.cos(math.pi / 8), -math.sin(math.pi / 8), 0.0, 0.0], atol=1e-12)
+
+
+def test_fk_all_matches_fk_matrix():
+    rng = np.random.default_rng(1)
+    for q in rng.uniform(-np.pi, np.pi, size=(20, 7)):
+        frames = kinematics.fk_all(q)
+        np.testing.assert_allclose(frames[kinematics.FLANGE_INDEX], kinematics.fk_matrix(q),
+                                   atol=1e-12)
+        np.testing.assert_allclose(frames[kinematics.TCP_INDEX],
+                                   kinematics.fk_matrix(q) @ kinematics.T_FLANGE_TCP, atol=1e-12)
+        # Every prefix is the chain of the joint transforms up to it
+        T = np.eye(4)
+        for i in range(kinematics.NUM_JOINTS):
+            T = T @ kinematics.dh_transform(i, q[i])
+            np.testing.assert_allclose(frames[i], T, atol=1e-12)
+
+
+def test_fk_matches_sympy():
+    pytest.importorskip('sympy')
+    q = [0.3, -0.2, 0.5, -1.9, 0.4, 1.2, -0.6]
+    position, quaternion = kinematics.fk(q)
+    sympy_position, sympy_quaternion = kinematics.fk_sympy(q)
+    np.testing.assert_allclose(position, sympy_position, atol=1e-12)
+    assert abs(abs(np.dot(quaternion, sympy_quaternion)) - 1.0) < 1e-12
+
+
+@pytest.mark.parametrize('axis, angle', [
+    ([1, 0, 0], 0.3), ([0, 1, 0], 2.0), ([0, 0, 1], -1.0),
+    ([1, 1, 0], math.pi), ([0, 1, -1], math.pi), ([1, -2, 3], 3.0), ([1, 1, 1], 0.0)])
+def test_matrix_to_quaternion(axis, angle):
+    # Covers all four branches (trace > 0 and each largest diagonal term)
+    axis = np.array(axis, dtype=float) / np.linalg.norm(axis)
+    expected = np.append(axis * math.sin(angle / 2), math.cos(angle / 2))
+    if expected[3] < 0:
+        expected = -expected
+    R = quaternion_matrix(expected)
+    quaternion = kinematics.matrix_to_quaternion(R)
+    assert quaternion[3] >= 0.0
+    np.testing.assert_allclose(quaternion_matrix(quaternion), R, atol=1e-12)
+    if expected[3] > 1e-9:
+        np.testing.assert_allclose(quaternion, expected, atol=1e-12)
+    np.testing.assert_allclose(kinematics.matrix_to_quaternion_batch(R[None])[0], quaternion,
+                               atol=1e-12)
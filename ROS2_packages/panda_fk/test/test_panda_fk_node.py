@@ -0,0 +1,42 @@
+# The joint state callback of panda_fk_node publishes the flange pose of
+# panda_fk.kinematics (needs a ROS 2 environment).
+
+import numpy as np
+from panda_fk import kinematics
+import pytest
+
+rclpy = pytest.importorskip('rclpy')
+from sensor_msgs.msg import JointState  # noqa: E402
+
+from panda_fk.panda_fk_node import PandaJointSubscriber  # noqa: E402, I100
+
+READY = [0.0, -np.pi / 4, 0.0, -3 * np.pi / 4, 0.0, np.pi / 2, np.pi / 4]
+
+
+@pytest.fixture
+def node():
+    rclpy.init()
+    node = PandaJointSubscriber()
+    yield node
+    node.destroy_node()
+    rclpy.shutdown()
+
+
+def test_listener_callback_publishes_flange_pose(node):
+    published = []
+    node.publisher.publish = published.append
+    node.publish_jacobian = False
+
+    msg = JointState()
+    msg.name = kinematics.JOINT_NAMES
+    msg.position = READY
+    node.listener_callback(msg)
+
+    (pose,) = published
+    position, quaternion = kinematics.fk(READY)
+    np.testing.assert_allclose([pose.position.x, pose.position.y, pose.position.z], position,
+                               atol=1e-12)
+    np.testing.assert_allclose(
+        [pose.orientation.x, pose.orientation.y, pose.orientation.z, pose.orientation.w],
+        quaternion, atol=1e-12)
+    np.testing.assert_allclose(position, [0.30689, 0.0, 0.59028], atol=1e-5)
@@ -0,0 +1,39 @@
+# The parent-relative transforms published by panda_tf_broadcaster must
+# compose to the same frames as the chain in panda_fk.kinematics.
+
+import numpy as np
+
+from panda_fk import kinematics
+
+
+def quaternion_matrix(q):
+    x, y, z, w = q
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]])
+
+
+def test_joint_transforms_compose_to_fk_all():
+    rng = np.random.default_rng(0)
+    for q in rng.uniform(-np.pi, np.pi, size=(20, 7)):
+        rotations = kinematics.joint_quaternions(q)
+        frames = {kinematics.BASE_FRAME: np.eye(4)}
+        for i in range(kinematics.NUM_JOINTS):
+            T = np.eye(4)
+            T[0:3, 0:3] = quaternion_matrix(rotations[i])
+            T[0:3, 3] = kinematics.JOINT_TRANSLATIONS[i]
+            frames[kinematics.LINK_NAMES[i + 1]] = frames[kinematics.LINK_NAMES[i]] @ T
+        for parent, child, T in kinematics.FIXED_TRANSFORMS:
+            frames[child] = frames[parent] @ T
+
+        expected = kinematics.fk_all(q)
+        for i, name in enumerate(kinematics.FRAME_NAMES):
+            np.testing.assert_allclose(frames[name], expected[i], atol=1e-12)
+
+
+def test_joint_quaternions_batch_shape():
+    q = np.zeros((3, 2, 7))
+    rotations = kinematics.joint_quaternions(q)
+    assert rotations.shape == (3, 2, 7, 4)
+    np.testing.assert_allclose(np.linalg.norm(rotations, axis=-1), 1.0)
@@ -0,0 +1,71 @@
+# The compiled URDF tree against the DH chain in panda_fk.kinematics, so the
+# hardcoded DH table cannot silently drift from the Panda description.
+
+from os import path
+
+import numpy as np
+
+from panda_fk import kinematics
+from panda_fk.urdf_tree import KinematicTree, rpy_to_matrix, rpy_to_quaternion
+
+PACKAGES_DIR = path.dirname(path.dirname(path.dirname(path.realpath(__file__))))
+PANDA_URDF = path.join(PACKAGES_DIR, 'panda2_description', 'urdf', 'panda2_inertias.urdf')
+R2D2_URDF = path.join(PACKAGES_DIR, 'urdf_tutorial_r2d2', 'urdf', 'r2d2.urdf.xml')
+
+
+def test_panda_urdf_matches_dh_chain():
+    tree = KinematicTree.from_file(PANDA_URDF)
+    assert tree.variable_names == kinematics.JOINT_NAMES
+    base = tree.link_index[kinematics.BASE_FRAME]
+    rng = np.random.default_rng(0)
+    for q in rng.uniform(-np.pi, np.pi, size=(20, 7)):
+        poses = tree.fk(q)
+        base_inv = np.linalg.inv(poses[base])
+        for i, name in enumerate(kinematics.FRAME_NAMES):
+            np.testing.assert_allclose(base_inv @ poses[tree.link_index[name]],
+                                       kinematics.fk_all(q)[i], atol=1e-12)
+
+
+def test_topological_order():
+    for urdf in (PANDA_URDF, R2D2_URDF):
+        tree = KinematicTree.from_file(urdf)
+        assert tree.parent[0] == -1
+        assert all(tree.parent[i] < i for i in range(1, len(tree.link_names)))
+
+
+def test_batch_matches_single():
+    tree = KinematicTree.from_file(R2D2_URDF)
+    assert tree.variable_names == ['tilt', 'swivel', 'periscope']
+    rng = np.random.default_rng(1)
+    Q = rng.uniform(-0.5, 0.5, size=(4, 5, tree.num_variables))
+    poses = tree.fk_batch(Q, chunk_size=3)
+    assert poses.shape == (4, 5, len(tree.link_names), 4, 4)
+    for index in np.ndindex(4, 5):
+        np.testing.assert_allclose(poses[index], tree.fk(Q[index]), atol=1e-12)
+        local = tree.local_transforms(Q[index])
+        for i in range(1, len(tree.link_names)):
+            np.testing.assert_allclose(poses[index][tree.parent[i]] @ local[i], poses[index][i],
+                                       atol=1e-12)
+        np.testing.assert_allclose(tree.local_transforms(Q[index], tree.movable),
+                                   local[tree.movable], atol=1e-15)
+    np.testing.assert_allclose(tree.local_transforms(Q, tree.movable),
+                               tree.local_transforms(Q)[:, :, tree.movable], atol=1e-15)
+
+
+def test_prismatic_joint_moves_along_axis():
+    tree = KinematicTree.from_file(R2D2_URDF)
+    rod = tree.link_index['rod']
+    head = tree.link_index['head']
+    q = tree.joint_vector(['periscope'], [-0.25])
+    poses = tree.fk(q)
+    np.testing.assert_allclose(np.linalg.inv(poses[head]) @ poses[rod][:, 3],
+                               [0.12, 0, 0.15 - 0.25, 1], atol=1e-12)
+
+
+def test_rpy_quaternion_matches_matrix():
+    rng = np.random.default_rng(2)
+    for rpy in rng.uniform(-np.pi, np.pi, size=(20, 3)):
+        q = rpy_to_quaternion(*rpy)
+        R = rpy_to_matrix(*rpy)
+        expected = kinematics.matrix_to_quaternion(R)
+        assert np.allclose(q, expected) or np.allclose(q, -expected)
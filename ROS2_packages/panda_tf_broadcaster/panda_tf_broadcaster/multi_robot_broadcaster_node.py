@@ -0,0 +1,171 @@
+from node_utils.instrumentation import Instrumentation
+import numpy as np
+from panda_fk.kinematics import joint_quaternions, JOINT_TRANSLATIONS, LINK_NAMES, NUM_JOINTS
+from panda_tf_broadcaster.panda_tf_broadcaster_node import make_transform, static_transforms
+from panda_tf_broadcaster.publish_policy import check_joints_batch, TfPublishPolicy
+import rclpy
+from rclpy.node import Node
+from rclpy.qos import QoSProfile
+from sensor_msgs.msg import JointState
+from tf2_msgs.msg import TFMessage
+from tf2_ros import StaticTransformBroadcaster
+
+
+class MultiPandaTfBroadcaster(Node):
+    """TF of several Pandas from one process.
+
+    Every robot in the `robots` parameter is a namespace: its joint states are
+    read from <robot>/joint_states and its frames are published as
+    <robot>/panda_link0 ... <robot>/panda_hand_tcp. Connecting <robot>/panda_link0
+    to the world is left to the cell description. An empty namespace is the
+    robot without prefix (/joint_states, panda_link0, ...).
+
+    Subscriptions only keep the newest sample of each robot. A timer at
+    tick_rate stacks the robots with new samples, computes all their joint
+    rotations with one vectorized call and publishes one TFMessage.
+
+    Example:
+
+        ros2 run panda_tf_broadcaster multi_panda_tf_broadcaster_node --ros-args \\
+            -p robots:="['left', 'right']" -p tick_rate:=200.0
+    """
+
+    def __init__(self):
+        super().__init__('multi_panda_tf_broadcaster_node')
+
+        self.declare_parameter('robots', ['panda'])
+        self.robots = [ns.strip('/') for ns in
+                       self.get_parameter('robots').get_parameter_value().string_array_value]
+        if len(set(self.robots)) != len(self.robots):
+            raise ValueError(f'Duplicate robot namespaces in {self.robots}')
+        prefixes = [f'{robot}/' if robot else '' for robot in self.robots]
+        self.declare_parameter('tick_rate', 100.0)
+        tick_rate = self.get_parameter('tick_rate').get_parameter_value().double_value
+
+        # Publish policy per robot on its link frames, see panda_tf_broadcaster_node
+        self.declare_parameter('translation_deadband', 0.0)
+        self.declare_parameter('rotation_deadband', 0.0)
+        self.declare_parameter('keep_alive', 1.0)
+        self.policies = [TfPublishPolicy(
+            self.get_parameter('translation_deadband').get_parameter_value().double_value,
+            self.get_parameter('rotation_deadband').get_parameter_value().double_value,
+            self.get_parameter('keep_alive').get_parameter_value().double_value)
+            for _ in self.robots]
+
+        # Callback latency statistics on /diagnostics (parameter instrumentation:=true)
+        self.instrumentation = Instrumentation(self)
+        self.instrumentation.instrument(self, 'joint_state_callback', 'tick')
+        self.instrumentation.add_status('publish_policy', self.stats)
+
+        self.publisher = self.create_publisher(TFMessage, '/tf', QoSProfile(depth=100))
+
+        # The fixed links of every robot in one latched message
+        self.static_broadcaster = StaticTransformBroadcaster(self)
+        stamp = self.get_clock().now().to_msg()
+        self.static_broadcaster.sendTransform(
+            [t for prefix in prefixes for t in static_transforms(stamp, prefix)])
+
+        # Reused transforms, NUM_JOINTS per robot
+        self.transforms = [
+            [make_transform(prefix + LINK_NAMES[i], prefix + LINK_NAMES[i + 1],
+                            JOINT_TRANSLATIONS[i])
+             for i in range(NUM_JOINTS)]
+            for prefix in prefixes]
+
+        self.latest = [None] * len(self.robots)
+        self.overwritten = 0
+        self.subscriptions_ = []
+        for index, prefix in enumerate(prefixes):
+            self.subscriptions_.append(self.create_subscription(
+                JointState,
+                f'/{prefix}joint_states',
+                lambda msg, index=index: self.joint_state_callback(msg, index),
+                10))
+
+        self.timer = self.create_timer(1.0 / tick_rate, self.tick)
+
+        self.get_logger().info(
+            f"{self.get_name()} started for {len(self.robots)} robots: {', '.join(self.robots)}")
+
+    def joint_state_callback(self, msg, index):
+        if self.latest[index] is not None:
+            # More samples than ticks, only the newest one is published
+            self.overwritten += 1
+        self.latest[index] = msg
+
+    def tick(self):
+        indices = [i for i, msg in enumerate(self.latest) if msg is not None]
+        if not indices:
+            return
+        samples = []
+        for i in indices:
+            msg = self.latest[i]
+            self.latest[i] = None
+            if len(msg.position) < NUM_JOINTS:
+                # Would break the (robots, 7) array of the whole tick
+                self.get_logger().warn(
+                    f'{self.robots[i]}: joint state with {len(msg.position)} positions skipped, '
+                    f'{NUM_JOINTS} needed', throttle_duration_sec=1.0)
+                continue
+            samples.append((i, msg))
+        if not samples:
+            return
+        indices, samples = zip(*samples)
+
+        # One call for every chain: (robots, 7) -> (robots, 7, 4), and one for the link frames
+        # of the robots whose deadbands need them
+        q = np.array([msg.position[0:NUM_JOINTS] for msg in samples])
+        rotations = joint_quaternions(q)
+        publish = check_joints_batch([self.policies[index] for index in indices], q)
+
+        transforms = []
+        for index, msg, robot_rotations, published in zip(indices, samples, rotations, publish):
+            if not published:
+                continue
+            stamp = msg.header.stamp
+            if stamp.sec == 0 and stamp.nanosec == 0:
+                stamp = self.get_clock().now().to_msg()
+            for t, (x, y, z, w) in zip(self.transforms[index], robot_rotations.tolist()):
+                t.header.stamp = stamp
+                rotation = t.transform.rotation
+                rotation.x = x
+                rotation.y = y
+                rotation.z = z
+                rotation.w = w
+            transforms.extend(self.transforms[index])
+
+        if transforms:
+            self.publisher.publish(TFMessage(transforms=transforms))
+
+    def stats(self):
+        """Summed publish policy counters of all robots, overwritten samples are rate limited."""
+        stats = {'published': 0, 'suppressed': 0}
+        for policy in self.policies:
+            for key, value in policy.stats().items():
+                stats[key] += value
+        stats['rate_limited'] = self.overwritten
+        return stats
+
+    def destroy_node(self):
+        self.instrumentation.destroy()
+        stats = self.stats()
+        self.get_logger().info(
+            f"/tf samples published {stats['published']}, "
+            f"suppressed by deadband {stats['suppressed']}, rate limited {stats['rate_limited']}")
+        super().destroy_node()
+
+
+def main():
+    rclpy.init()
+    node = MultiPandaTfBroadcaster()
+    try:
+        rclpy.spin(node)
+    except KeyboardInterrupt:
+        pass
+
+    node.destroy_node()
+    rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,41 @@
-import math
+from node_utils.instrumentation import Instrumentation
+from node_utils.latest_wins import CoalescingSubscription
+from panda_fk.kinematics import (FIXED_TRANSFORMS, joint_quaternions, JOINT_TRANSLATIONS,
+                                 LINK_NAMES, matrix_to_quaternion, NUM_JOINTS)
+from panda_tf_broadcaster.publish_policy import TfPublishPolicy
 import rclpy
 from rclpy.node import Node
 from rclpy.qos import QoSProfile
-from geometry_msgs.msg import Quaternion
 from sensor_msgs.msg import JointState
-from tf2_ros import TransformBroadcaster, TransformStamped
-from sympy import Matrix, Quaternion, sin, cos
-from sympy.vector import matrix_to_vector, CoordSys3D
+from tf2_msgs.msg import TFMessage
+from tf2_ros import StaticTransformBroadcaster, TransformStamped
+
+
+def make_transform(parent, child, translation):
+    t = TransformStamped()
+    t.header.frame_id = parent
+    t.child_frame_id = child
+    t.transform.translation.x = float(translation[0])
+    t.transform.translation.y = float(translation[1])
+    t.transform.translation.z = float(translation[2])
+    t.transform.rotation.w = 1.0
+    return t
+
+
+def static_transforms(stamp, prefix=''):
+    """Return the fixed links after panda_link7, frame names prefixed with prefix."""
+    transforms = []
+    for parent, child, T in FIXED_TRANSFORMS:
+        t = make_transform(prefix + parent, prefix + child, T[0:3, 3])
+        t.header.stamp = stamp
+        quaternion = matrix_to_quaternion(T[0:3, 0:3])
+        t.transform.rotation.x = float(quaternion[0])
+        t.transform.rotation.y = float(quaternion[1])
+        t.transform.rotation.z = float(quaternion[2])
+        t.transform.rotation.w = float(quaternion[3])
+        transforms.append(t)
+    return transforms
+
 
 class PandaTfBroadcaster(Node):
 
@@ -15,98 +44,102 @@ class PandaTfBroadcaster(Node):
 
         # FREQUENCY OF NODE
         frequency = 10
-        
-        # /joint_states SUBSCRIBER 
-        self.subscriber = self.create_subscription(
+
+        # MAXIMUM PROCESSING RATE (0 = no limit), only the newest joint state is processed
+        self.declare_parameter('max_rate', 0.0)
+        max_rate = self.get_parameter('max_rate').get_parameter_value().double_value
+
+        # PUBLISH POLICY - nothing is sent while no link frame moved more than the deadbands
+        # (meters / radians, in panda_link0), but at least every keep_alive seconds
+        # (0 = never forced)
+        self.declare_parameter('translation_deadband', 0.0)
+        self.declare_parameter('rotation_deadband', 0.0)
+        self.declare_parameter('keep_alive', 1.0)
+        self.policy = TfPublishPolicy(
+            self.get_parameter('translation_deadband').get_parameter_value().double_value,
+            self.get_parameter('rotation_deadband').get_parameter_value().double_value,
+            self.get_parameter('keep_alive').get_parameter_value().double_value)
+
+        # CALLBACK LATENCY STATISTICS on /diagnostics (parameter instrumentation:=true)
+        self.instrumentation = Instrumentation(self)
+        self.instrumentation.instrument(self, 'joint_state_callback')
+
+        # /tf PUBLISHER (same QoS as tf2_ros.TransformBroadcaster)
+        self.publisher = self.create_publisher(TFMessage, '/tf', QoSProfile(depth=100))
+
+        # /tf_static BROADCASTER, latched - the fixed links are sent once
+        self.static_broadcaster = StaticTransformBroadcaster(self)
+        self.static_broadcaster.sendTransform(static_transforms(self.get_clock().now().to_msg()))
+
+        # One TFMessage with a transform per joint, reused for every sample.
+        # The translations are constant, only stamps and rotations change.
+        self.tf_message = TFMessage(transforms=[
+            make_transform(LINK_NAMES[i], LINK_NAMES[i + 1], JOINT_TRANSLATIONS[i])
+            for i in range(NUM_JOINTS)])
+
+        # /joint_states SUBSCRIBER
+        self.subscriber = CoalescingSubscription(
+            self,
             JointState,
             '/joint_states',
             self.joint_state_callback,
+            max_rate,
             frequency)
-        
-        # tf2_msgs/TFMessage BROADCASTER
-        self.broadcaster = TransformBroadcaster(
-            self)
-        
+        self.instrumentation.add_status('publish_policy', self.stats)
+
         # Node started
         self.nodeName = self.get_name()
-        self.get_logger().info("{0} started!".format(self.nodeName))
+        self.get_logger().info('{0} started!'.format(self.nodeName))
 
     def joint_state_callback(self, msg):
-        t = TransformStamped()
-        t.header.frame_id = 'panda_link0'
-        t.child_frame_id = 'panda_link7'
-        
-        self.joint_var = []
-        for i in range(0,7):
-            self.joint_var.append((msg.position[i]))
-        
-        dh_parameters = self.dh_params(self.joint_var)
-        
-        T_01 = self.TF_matrix(0,dh_parameters)
-        T_12 = self.TF_matrix(1,dh_parameters)
-        T_23 = self.TF_matrix(2,dh_parameters)
-        T_34 = self.TF_matrix(3,dh_parameters)
-        T_45 = self.TF_matrix(4,dh_parameters)
-        T_56 = self.TF_matrix(5,dh_parameters)
-        T_67 = self.TF_matrix(6,dh_parameters)
-
-        T_07 = T_01*T_12*T_23*T_34*T_45*T_56*T_67 
-        
-       
-        T_07_rot = T_07[0:3, 0:3]
-        quaternion = Quaternion.from_rotation_matrix(T_07_rot)
-        submat = T_07[0:3,3:4]
-
-
-        # Writing data for publishing
-        t.transform.translation.x = float(submat[0])
-        t.transform.translation.y = float(submat[1])
-        t.transform.translation.z = float(submat[2])
-        t.transform.rotation.x = float(quaternion.a)
-        t.transform.rotation.y = float(quaternion.b)
-        t.transform.rotation.z = float(quaternion.c)
-        t.transform.rotation.w = float(quaternion.d)
-        
-        self.broadcaster.sendTransform(t)
-    
-    def dh_params(self,joint_variable):
-
-        joint_var = joint_variable
-        M_PI = math.pi
-
-        # Create DH parameters (data given by maker franka-emika)
-        self.dh = [[ 0,      0,        0.333,   joint_var[0]],
-            [-M_PI/2,   0,        0,       joint_var[1]],
-            [ M_PI/2,   0,        0.316,   joint_var[2]],
-            [ M_PI/2,   0.0825,   0,       joint_var[3]],
-            [-M_PI/2,  -0.0825,   0.384,   joint_var[4]],
-            [ M_PI/2,   0,        0,       joint_var[5]],
-            [ M_PI/2,   0.088,    0.107,   joint_var[6]]]
-        
-        return self.dh
-      
-    def TF_matrix(self,i,dh):
-        # Define Transformation matrix based on DH params
-        alpha = dh[i][0]
-        a = dh[i][1]
-        d = dh[i][2]
-        q = dh[i][3]
-        
-        TF = Matrix([[cos(q),-sin(q), 0, a],
-                    [sin(q)*cos(alpha), cos(q)*cos(alpha), -sin(alpha), -sin(alpha)*d],
-                    [sin(q)*sin(alpha), cos(q)*sin(alpha),  cos(alpha),  cos(alpha)*d],
-                    [   0,  0,  0,  1]])
-        return TF
+        # Stamp with the sample time so lookups line up with the joint data
+        stamp = msg.header.stamp
+        if stamp.sec == 0 and stamp.nanosec == 0:
+            stamp = self.get_clock().now().to_msg()
+
+        positions = msg.position[0:NUM_JOINTS]
+        if not self.policy.check_joints(positions):
+            return
+
+        rotations = joint_quaternions(positions)
+
+        for t, (x, y, z, w) in zip(self.tf_message.transforms, rotations.tolist()):
+            t.header.stamp = stamp
+            rotation = t.transform.rotation
+            rotation.x = x
+            rotation.y = y
+            rotation.z = z
+            rotation.w = w
+
+        self.publisher.publish(self.tf_message)
+
+    def stats(self):
+        """Samples published, suppressed by the deadband, skipped by max_rate / slow processing."""
+        stats = self.policy.stats()
+        stats['rate_limited'] = self.subscriber.dropped
+        return stats
+
+    def destroy_node(self):
+        self.subscriber.destroy()
+        self.instrumentation.destroy()
+        stats = self.stats()
+        self.get_logger().info(
+            f"/tf samples published {stats['published']}, "
+            f"suppressed by deadband {stats['suppressed']}, rate limited {stats['rate_limited']}")
+        super().destroy_node()
+
 
 def main():
     rclpy.init()
     node = PandaTfBroadcaster()
-    try: 
+    try:
         rclpy.spin(node)
     except KeyboardInterrupt:
         pass
 
+    node.destroy_node()
     rclpy.shutdown()
 
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,144 @@
+"""Deadband and keep-alive policy for TF publishing.
+
+A set of transforms is only published when one of them moved by more than
+the translation or rotation deadband since the last published set, or when
+keep_alive seconds passed without a publication - TF buffers drop frames
+that are not refreshed, so a stationary robot is still republished now and
+then.
+
+The Panda nodes compare the poses of every link frame in panda_link0
+(link_poses()), so the deadbands bound how far any link - the end effector
+included - moved, not how far a single joint turned. check_joints() only
+computes those poses when the joints changed and a deadband is set.
+"""
+import math
+import time
+
+import numpy as np
+from panda_fk.fk_generated import fk_all
+from panda_fk.kinematics import fk_all_batch, matrix_to_quaternion_batch
+
+
+def link_poses(joint_positions):
+    """Return translations (n, 3) and rotations (n, 4) of kinematics.FRAME_NAMES in panda_link0."""
+    frames = fk_all(joint_positions)
+    return frames[:, 0:3, 3], matrix_to_quaternion_batch(frames[:, 0:3, 0:3])
+
+
+def link_poses_batch(joint_positions):
+    """Return translations (N, n, 3) and rotations (N, n, 4) of link_poses() for (N, 7) joints."""
+    frames = fk_all_batch(joint_positions)
+    rotations = matrix_to_quaternion_batch(frames[:, :, 0:3, 0:3].reshape(-1, 3, 3))
+    return frames[:, :, 0:3, 3], rotations.reshape(frames.shape[0:2] + (4,))
+
+
+def check_joints_batch(policies, joint_positions, now=None):
+    """Return policies[k].check_joints(joint_positions[k]) for (N, 7) joints.
+
+    The link poses of the samples that need them are computed in one
+    link_poses_batch() call.
+    """
+    q = np.asarray(joint_positions, dtype=np.float64)
+    poses = [None] * len(policies)
+    needed = [k for k, policy in enumerate(policies) if policy.needs_poses(q[k])]
+    if needed:
+        translations, rotations = link_poses_batch(q[needed])
+        for k, t, r in zip(needed, translations, rotations):
+            poses[k] = (t, r)
+    return [policy.check_joints(q[k], now, poses[k]) for k, policy in enumerate(policies)]
+
+
+class TfPublishPolicy(object):
+    """Decide per sample whether (translations, rotations) is worth publishing.
+
+    translations: (..., 3) in meters, rotations: (..., 4) quaternions (x, y, z, w).
+    A deadband of 0 only suppresses samples that are exactly equal,
+    keep_alive <= 0 never forces a publication.
+    """
+
+    def __init__(self, translation_deadband=0.0, rotation_deadband=0.0, keep_alive=1.0):
+        self.translation_deadband_sq = translation_deadband ** 2
+        # |<q1, q2>| = cos(angle / 2), comparing dot products avoids an arccos per transform
+        self.min_rotation_dot = math.cos(min(rotation_deadband, math.pi) / 2)
+        self.keep_alive = keep_alive
+        self.last_translations = None
+        self.last_rotations = None
+        # Joints of the last check_joints() sample, within the deadbands of the last published
+        self.last_joints = None
+        self.last_joint_poses = None
+        self.last_time = None
+        self.published = 0
+        self.suppressed = 0
+
+    @property
+    def passthrough(self):
+        """True without deadbands: every change of the joints is published."""
+        return self.translation_deadband_sq == 0.0 and self.min_rotation_dot >= 1.0
+
+    def expired(self, now):
+        return self.last_time is None or (
+            self.keep_alive > 0.0 and now - self.last_time >= self.keep_alive)
+
+    def accept(self, publish, now):
+        if not publish:
+            self.suppressed += 1
+            return False
+        self.last_time = now
+        self.published += 1
+        return True
+
+    def moved(self, translations, rotations):
+        if self.last_translations is None or self.last_translations.shape != translations.shape:
+            return True
+        delta = translations - self.last_translations
+        if np.any(np.einsum('...i,...i->...', delta, delta) > self.translation_deadband_sq):
+            return True
+        if self.min_rotation_dot >= 1.0:
+            return not np.array_equal(rotations, self.last_rotations)
+        dot = np.abs(np.einsum('...i,...i->...', rotations, self.last_rotations))
+        return bool(np.any(dot < self.min_rotation_dot))
+
+    def check(self, translations, rotations, now=None):
+        """Return True (and remember the sample) if it should be published."""
+        if now is None:
+            now = time.monotonic()
+        translations = np.asarray(translations, dtype=np.float64)
+        rotations = np.asarray(rotations, dtype=np.float64)
+        self.last_joints = None
+        if not self.accept(self.expired(now) or self.moved(translations, rotations), now):
+            return False
+        self.last_translations = translations.copy()
+        self.last_rotations = rotations.copy()
+        return True
+
+    def needs_poses(self, joint_positions):
+        """Return True if check_joints() has to compare link poses for these joints."""
+        return not self.passthrough and not (
+            self.last_joints is not None and np.array_equal(joint_positions, self.last_joints))
+
+    def check_joints(self, joint_positions, now=None, poses=None):
+        """check() for joint positions, the link poses are only computed when needed.
+
+        Joints equal to the last sample have the same poses, without deadbands
+        any other joints are published. poses: link_poses() of the joints,
+        computed when None and needed.
+        """
+        if now is None:
+            now = time.monotonic()
+        q = np.array(joint_positions, dtype=np.float64)
+        if self.needs_poses(q):
+            translations, rotations = link_poses(q) if poses is None else poses
+            published = self.check(translations, rotations, now=now)
+            self.last_joints = q
+            self.last_joint_poses = (translations, rotations)
+            return published
+        unchanged = self.last_joints is not None and np.array_equal(q, self.last_joints)
+        published = self.accept(self.expired(now) or not unchanged, now)
+        if published and unchanged and not self.passthrough:
+            # Kept alive: the deadbands continue from the poses published now
+            self.last_translations, self.last_rotations = self.last_joint_poses
+        self.last_joints = q
+        return published
+
+    def stats(self):
+        return {'published': self.published, 'suppressed': self.suppressed}
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+# CPU per robot of the TF broadcasters for 1 to 32 robots.
+# Publishes random-walk joint states for N robots (/robot<i>/joint_states) at
+# --rate Hz from this process and measures the CPU time of
+#   separate:   N panda_tf_broadcaster_node processes, one per robot
+#   vectorized: one multi_panda_tf_broadcaster_node for all robots
+# over --duration seconds, read from /proc/<pid>/stat. Needs a sourced
+# ROS 2 workspace with panda_fk, node_utils and panda_tf_broadcaster built.
+#
+# Example usage:
+#
+#    python3 scripts/benchmark_multi_robot.py --robots 1 2 4 8 16 32 --rate 100
+#
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import rclpy
+from rclpy.node import Node
+from sensor_msgs.msg import JointState
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+
+class JointStateSource(Node):
+    """Random-walk joint states for n robots, every sample moves every joint."""
+
+    def __init__(self, n, rate):
+        super().__init__('benchmark_joint_state_source')
+        self.rng = np.random.default_rng(0)
+        self.q = self.rng.uniform(-1.0, 1.0, size=(n, 7))
+        self.publishers_ = [self.create_publisher(JointState, f'/robot{i}/joint_states', 10)
+                            for i in range(n)]
+        self.names = ['panda_joint%d' % (j + 1) for j in range(7)]
+        self.timer = self.create_timer(1.0 / rate, self.publish)
+
+    def publish(self):
+        self.q += self.rng.normal(0.0, 0.01, size=self.q.shape)
+        stamp = self.get_clock().now().to_msg()
+        for publisher, q in zip(self.publishers_, self.q.tolist()):
+            msg = JointState()
+            msg.header.stamp = stamp
+            msg.name = self.names
+            msg.position = q
+            publisher.publish(msg)
+
+
+def cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat', 'r') as infile:
+        fields = infile.read().rsplit(')', 1)[1].split()
+    # utime and stime, fields 14 and 15 of proc(5)
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def separate_commands(n, rate):
+    return [[sys.executable, '-m', 'panda_tf_broadcaster.panda_tf_broadcaster_node',
+             '--ros-args',
+             '-r', f'__node:=panda_tf_broadcaster_{i}',
+             '-r', f'/joint_states:=/robot{i}/joint_states'] for i in range(n)]
+
+
+def vectorized_commands(n, rate):
+    robots = ','.join(f'robot{i}' for i in range(n))
+    return [[sys.executable, '-m', 'panda_tf_broadcaster.multi_robot_broadcaster_node',
+             '--ros-args',
+             '-p', f'robots:=[{robots}]', '-p', f'tick_rate:={rate}']]
+
+
+def measure(source, commands, warmup, duration):
+    processes = [subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                 for command in commands]
+    try:
+        end = time.monotonic() + warmup
+        while time.monotonic() < end:
+            rclpy.spin_once(source, timeout_sec=0.01)
+        start = sum(cpu_seconds(p.pid) for p in processes)
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            rclpy.spin_once(source, timeout_sec=0.01)
+        return sum(cpu_seconds(p.pid) for p in processes) - start
+    finally:
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            p.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='CPU per robot of separate vs vectorized TF broadcasters.')
+    parser.add_argument('--robots', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--rate', type=float, default=100.0,
+                        help='joint state rate per robot (Hz)')
+    parser.add_argument('--duration', type=float, default=10.0, help='measured seconds per run')
+    parser.add_argument('--warmup', type=float, default=3.0, help='seconds before measuring')
+    args = parser.parse_args()
+
+    rclpy.init()
+    print(f"{'robots':>6} {'separate CPU %':>15} {'per robot':>10} "
+          f"{'vectorized CPU %':>17} {'per robot':>10}")
+    for n in args.robots:
+        source = JointStateSource(n, args.rate)
+        separate = measure(source, separate_commands(n, args.rate), args.warmup, args.duration)
+        vectorized = measure(source, vectorized_commands(n, args.rate), args.warmup, args.duration)
+        source.destroy_node()
+
+        separate_pct = 100.0 * separate / args.duration
+        vectorized_pct = 100.0 * vectorized / args.duration
+        print(f'{n:6d} {separate_pct:15.1f} {separate_pct / n:10.2f} '
+              f'{vectorized_pct:17.1f} {vectorized_pct / n:10.2f}')
+    rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
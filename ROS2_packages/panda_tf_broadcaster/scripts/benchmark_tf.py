@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+# Published transforms per second of panda_tf_broadcaster.
+# Feeds recorded-like joint states straight into the callbacks (no executor,
+# no coalescing) and compares the previous callback - fk_all() and a new
+# TransformStamped per frame, every frame relative to panda_link0 - with the
+# current one, which updates the rotations of a single reused TFMessage.
+# Needs a sourced ROS 2 workspace.
+#
+# Example usage:
+#
+#    python3 scripts/benchmark_tf.py [number_of_samples]
+#
+
+import sys
+import time
+
+import numpy as np
+from panda_fk.fk_generated import fk_all
+from panda_fk.kinematics import BASE_FRAME, FRAME_NAMES, matrix_to_quaternion
+from panda_tf_broadcaster.panda_tf_broadcaster_node import PandaTfBroadcaster
+import rclpy
+from sensor_msgs.msg import JointState
+from tf2_ros import TransformBroadcaster, TransformStamped
+
+
+class PreviousCallback(object):
+    """joint_state_callback as it was before the batched TFMessage."""
+
+    def __init__(self, node):
+        self.broadcaster = TransformBroadcaster(node)
+
+    def __call__(self, msg):
+        frames = fk_all(msg.position[0:7])
+        transforms = []
+        for name, T in zip(FRAME_NAMES, frames):
+            t = TransformStamped()
+            t.header.stamp = msg.header.stamp
+            t.header.frame_id = BASE_FRAME
+            t.child_frame_id = name
+            quaternion = matrix_to_quaternion(T[0:3, 0:3])
+            t.transform.translation.x = float(T[0, 3])
+            t.transform.translation.y = float(T[1, 3])
+            t.transform.translation.z = float(T[2, 3])
+            t.transform.rotation.x = float(quaternion[0])
+            t.transform.rotation.y = float(quaternion[1])
+            t.transform.rotation.z = float(quaternion[2])
+            t.transform.rotation.w = float(quaternion[3])
+            transforms.append(t)
+        self.broadcaster.sendTransform(transforms)
+        return len(transforms)
+
+
+def joint_states(n):
+    rng = np.random.default_rng(0)
+    messages = []
+    for i, q in enumerate(rng.uniform(-2.0, 2.0, size=(n, 7))):
+        msg = JointState()
+        msg.header.stamp.sec = 1000 + i // 1000
+        msg.header.stamp.nanosec = (i % 1000) * 1000000
+        msg.name = ['panda_joint%d' % (j + 1) for j in range(7)]
+        msg.position = q.tolist()
+        messages.append(msg)
+    return messages
+
+
+def run(callback, messages, transforms_per_message):
+    start = time.perf_counter()
+    for msg in messages:
+        callback(msg)
+    elapsed = time.perf_counter() - start
+    return len(messages) / elapsed, len(messages) * transforms_per_message / elapsed
+
+
+def main():
+    n = 20000
+    if len(sys.argv) > 1:
+        n = int(sys.argv[1])
+
+    rclpy.init()
+    node = PandaTfBroadcaster()
+    messages = joint_states(n)
+
+    previous = PreviousCallback(node)
+    current = node.joint_state_callback
+    results = [
+        ('previous (fk_all, %d TransformStamped)' % len(FRAME_NAMES),
+         run(previous, messages, len(FRAME_NAMES))),
+        ('current (one TFMessage, %d dynamic)' % len(node.tf_message.transforms),
+         run(current, messages, len(node.tf_message.transforms))),
+    ]
+
+    print(f'{n} joint states')
+    for name, (messages_per_s, transforms_per_s) in results:
+        print(f'  {name:40s} {messages_per_s:10.0f} msg/s {transforms_per_s:12.0f} transforms/s')
+
+    node.destroy_node()
+    rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -25,7 +25,8 @@ setup(
     license='Apache 2.0',
     tests_require=['pytest'],
     entry_points={
-        'console_scripts': [ 'panda_tf_broadcaster_node = panda_tf_broadcaster.panda_tf_broadcaster_node:main'
+        'console_scripts': [ 'panda_tf_broadcaster_node = panda_tf_broadcaster.panda_tf_broadcaster_node:main',
+            'multi_panda_tf_broadcaster_node = panda_tf_broadcaster.multi_robot_broadcaster_node:main'
         ],
     },
 )
@@ -0,0 +1,142 @@
+import math
+
+import numpy as np
+
+from panda_tf_broadcaster import publish_policy
+from panda_tf_broadcaster.publish_policy import (check_joints_batch, link_poses, link_poses_batch,
+                                                 TfPublishPolicy)
+
+
+def rotation_z(angle):
+    return np.array([[0.0, 0.0, math.sin(angle / 2), math.cos(angle / 2)]])
+
+
+def test_identical_samples_are_suppressed_until_keep_alive():
+    policy = TfPublishPolicy(keep_alive=1.0)
+    translations = np.zeros((1, 3))
+    published = [policy.check(translations, rotation_z(0.0), now=i * 0.01) for i in range(201)]
+    # t = 0, 1 and 2 s
+    assert sum(published) == 3
+    assert policy.stats() == {'published': 3, 'suppressed': 198}
+
+
+def test_rotation_deadband():
+    policy = TfPublishPolicy(rotation_deadband=0.01, keep_alive=0.0)
+    translations = np.zeros((1, 3))
+    assert policy.check(translations, rotation_z(0.0), now=0.0)
+    assert not policy.check(translations, rotation_z(0.009), now=1.0)
+    # Compared with the last published sample, so slow drift is still caught
+    assert policy.check(translations, rotation_z(0.011), now=2.0)
+    assert not policy.check(translations, -rotation_z(0.011), now=3.0)
+
+
+def test_translation_deadband():
+    policy = TfPublishPolicy(translation_deadband=0.001, keep_alive=0.0)
+    rotations = rotation_z(0.0)
+    assert policy.check(np.zeros((1, 3)), rotations, now=0.0)
+    assert not policy.check(np.array([[0.0005, 0.0, 0.0]]), rotations, now=1.0)
+    assert policy.check(np.array([[0.0, 0.0011, 0.0]]), rotations, now=2.0)
+
+
+def test_link_poses_deadband():
+    # The deadbands apply to the link frames in panda_link0: a small turn of
+    # joint 2 barely rotates the links but moves the wrist by ~0.5 m * angle
+    policy = TfPublishPolicy(translation_deadband=0.0015, rotation_deadband=0.01, keep_alive=0.0)
+    q = np.array([0.0, -math.pi / 4, 0.0, -3 * math.pi / 4, 0.0, math.pi / 2, math.pi / 4])
+    assert policy.check(*link_poses(q), now=0.0)
+    q[1] += 0.002
+    assert not policy.check(*link_poses(q), now=1.0)
+    q[1] += 0.002
+    # Rotation of every link still below 0.01 rad, the translation gates
+    translations, rotations = link_poses(q)
+    assert np.all(np.abs(np.einsum('ij,ij->i', rotations, policy.last_rotations))
+                  > policy.min_rotation_dot)
+    assert policy.check(translations, rotations, now=2.0)
+
+
+def test_pure_translation_of_a_link_is_gated():
+    policy = TfPublishPolicy(translation_deadband=0.001, rotation_deadband=0.01, keep_alive=0.0)
+    translations, rotations = link_poses(np.zeros(7))
+    assert policy.check(translations, rotations, now=0.0)
+    moved = translations.copy()
+    moved[-1, 2] += 0.0005
+    assert not policy.check(moved, rotations, now=1.0)
+    moved[-1, 2] += 0.001
+    assert policy.check(moved, rotations, now=2.0)
+
+
+def counting(monkeypatch, name):
+    calls = []
+    poses = getattr(publish_policy, name)
+
+    def counted(q):
+        calls.append(len(q))
+        return poses(q)
+    monkeypatch.setattr(publish_policy, name, counted)
+    return calls
+
+
+def test_check_joints_computes_link_poses_only_for_new_joints(monkeypatch):
+    calls = counting(monkeypatch, 'link_poses')
+    policy = TfPublishPolicy(translation_deadband=0.0015, rotation_deadband=0.01, keep_alive=1.0)
+    q = np.array([0.0, -math.pi / 4, 0.0, -3 * math.pi / 4, 0.0, math.pi / 2, math.pi / 4])
+    assert policy.check_joints(q, now=0.0)
+    assert not policy.check_joints(q, now=0.5)
+    assert len(calls) == 1
+    # Inside the deadband, repeated and then kept alive without forward kinematics
+    q[1] += 0.002
+    assert not policy.check_joints(q, now=0.6)
+    assert not policy.check_joints(q, now=0.7)
+    assert policy.check_joints(q, now=1.0)
+    assert len(calls) == 2
+    # Compared with the sample kept alive at 1 s, not with the one of 0 s
+    q[1] += 0.002
+    assert not policy.check_joints(q, now=1.1)
+    q[1] += 0.004
+    assert policy.check_joints(q, now=1.2)
+    assert len(calls) == 4
+    assert policy.stats() == {'published': 3, 'suppressed': 4}
+
+
+def test_passthrough_policy_needs_no_link_poses(monkeypatch):
+    calls = counting(monkeypatch, 'link_poses')
+    policy = TfPublishPolicy(keep_alive=0.0)
+    assert policy.passthrough
+    assert not TfPublishPolicy(rotation_deadband=0.01).passthrough
+    q = np.zeros(7)
+    assert policy.check_joints(q, now=0.0)
+    assert not policy.check_joints(q, now=5.0)
+    q[6] = 1e-9
+    assert policy.check_joints(q, now=5.1)
+    assert calls == []
+
+
+def test_link_poses_batch_matches_link_poses():
+    q = np.random.default_rng(0).uniform(-1.5, 1.5, size=(3, 7))
+    translations, rotations = link_poses_batch(q)
+    for k in range(len(q)):
+        expected_translations, expected_rotations = link_poses(q[k])
+        np.testing.assert_allclose(translations[k], expected_translations, atol=1e-12)
+        np.testing.assert_allclose(rotations[k], expected_rotations, atol=1e-12)
+
+
+def test_check_joints_batch(monkeypatch):
+    calls = counting(monkeypatch, 'link_poses_batch')
+    policies = [TfPublishPolicy(translation_deadband=0.001, rotation_deadband=0.01, keep_alive=0.0)
+                for _ in range(3)]
+    policies.append(TfPublishPolicy(keep_alive=0.0))
+    q = np.random.default_rng(0).uniform(-1.5, 1.5, size=(4, 7))
+    assert check_joints_batch(policies, q, now=0.0) == [True] * 4
+    # Pass-through robot 3 needs no link poses
+    assert calls == [3]
+
+    # Robot 0 unchanged, robot 1 inside and robot 2 outside its deadband, robot 3 moved
+    q[1, 6] += 1e-4
+    q[2:4, 0] += 0.1
+    assert check_joints_batch(policies, q, now=1.0) == [False, False, True, True]
+    assert calls == [3, 2]
+    for policy, q_robot in zip(policies, q):
+        np.testing.assert_array_equal(policy.last_joints, q_robot)
+
+    assert check_joints_batch(policies, q, now=2.0) == [False] * 4
+    assert calls == [3, 2]
@@ -0,0 +1,224 @@
+"""
+Path expressions such as `transform.translation` or
+`transforms[*].transform.translation`, parsed once and compiled into
+accessor functions. Shared by r2d2_publisher and scripts/pipefilter.py.
+
+Syntax:
+
+    a.b.c               attributes of ROS messages, keys of dicts
+    a[0], a[-1]         index
+    a[1:3], a[::2]      slice - the rest of the path is applied to every item
+    a[*]                all items - the rest of the path is applied to every item
+    a.{x, b.c}          projection of several paths, returned as a dict keyed
+                        by the sub-paths; only allowed at the end of a path
+
+A compiled accessor reads straight from the object - no conversion to dicts
+or JSON per message. Consecutive names are merged into one
+operator.attrgetter for ROS messages, so `transform.translation.x` is a
+single C-level lookup; a path running from a message into a dict falls
+back to one lookup per name.
+
+    get_translation = compile_path('transform.translation')
+    get_translation(transform_stamped)  # -> geometry_msgs.msg.Vector3
+    compile_path('transforms[*].child_frame_id')(tf_message)  # -> ['leg1', ...]
+"""
+import functools
+import operator
+import re
+
+NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+INTEGER = re.compile(r'-?\d+')
+SLICE = re.compile(r'(-?\d*):(-?\d*)(?::(-?\d*))?$')
+
+
+class PathParser(object):
+    """
+    Recursive descent parser producing a list of steps:
+    ('attr', name), ('index', i), ('slice', slice), ('all', None) and
+    ('project', [(text, steps), ...]).
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.position = 0
+
+    def error(self, message):
+        return ValueError(f'Invalid path {self.text!r} at position {self.position}: {message}')
+
+    def skip_spaces(self):
+        while self.position < len(self.text) and self.text[self.position] == ' ':
+            self.position += 1
+
+    def parse(self):
+        steps = self.parse_steps()
+        if self.position != len(self.text):
+            raise self.error(f'unexpected {self.text[self.position:]!r}')
+        return steps
+
+    def parse_steps(self):
+        steps = []
+        while self.position < len(self.text):
+            c = self.text[self.position]
+            if c in ',}':
+                break
+            if c == '.':
+                self.position += 1
+                if self.position < len(self.text) and self.text[self.position] == '{':
+                    continue
+                if not NAME.match(self.text, self.position):
+                    raise self.error("expected a name after '.'")
+            elif c == '[':
+                steps.append(self.parse_brackets())
+            elif c == '{':
+                steps.append(self.parse_projection())
+                self.skip_spaces()
+                if self.position < len(self.text) and self.text[self.position] not in ',}':
+                    raise self.error('a projection must end the path')
+            else:
+                match = NAME.match(self.text, self.position)
+                if match is None:
+                    raise self.error(f'unexpected {c!r}')
+                steps.append(('attr', match.group()))
+                self.position = match.end()
+        return steps
+
+    def parse_brackets(self):
+        end = self.text.find(']', self.position)
+        if end < 0:
+            raise self.error("missing ']'")
+        inner = self.text[self.position + 1:end].strip()
+        self.position = end + 1
+        if inner == '*':
+            return ('all', None)
+        if INTEGER.fullmatch(inner):
+            return ('index', int(inner))
+        match = SLICE.match(inner)
+        if match is None:
+            raise self.error(f'invalid index [{inner}]')
+        return ('slice', slice(*(int(v) if v else None for v in match.groups())))
+
+    def parse_projection(self):
+        self.position += 1
+        projections = []
+        while True:
+            self.skip_spaces()
+            start = self.position
+            steps = self.parse_steps()
+            text = self.text[start:self.position].strip()
+            if not text:
+                raise self.error('empty path in projection')
+            projections.append((text, steps))
+            if self.position >= len(self.text):
+                raise self.error("missing '}'")
+            c = self.text[self.position]
+            self.position += 1
+            if c == '}':
+                return ('project', projections)
+
+
+def parse_path(path):
+    """
+    Returns the steps of a path, see PathParser. Raises ValueError on invalid syntax.
+    """
+    return PathParser(path.strip()).parse()
+
+
+def names_getter(names):
+    attr = operator.attrgetter('.'.join(names))
+
+    def get(obj):
+        if not isinstance(obj, dict):
+            try:
+                return attr(obj)
+            except AttributeError:
+                # A dict somewhere below the message, resolved name by name
+                pass
+        for name in names:
+            obj = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+        return obj
+    return get
+
+
+def compile_steps(steps):
+    getters = []
+    names = []
+    for position, (kind, value) in enumerate(steps):
+        if kind == 'attr':
+            names.append(value)
+            continue
+        if names:
+            getters.append(names_getter(names))
+            names = []
+        if kind == 'index':
+            getters.append(operator.itemgetter(value))
+        elif kind in ('all', 'slice'):
+            # Projection: the rest of the path runs on every selected item
+            rest = compile_steps(steps[position + 1:])
+            select = operator.itemgetter(value) if kind == 'slice' else iter
+            getters.append(
+                lambda obj, select=select, rest=rest: [rest(item) for item in select(obj)])
+            break
+        elif kind == 'project':
+            parts = [(text, compile_steps(sub_steps)) for text, sub_steps in value]
+            getters.append(lambda obj, parts=parts: {text: get(obj) for text, get in parts})
+    if names:
+        getters.append(names_getter(names))
+    return chain(getters)
+
+
+def chain(getters):
+    if len(getters) == 0:
+        return lambda obj: obj
+    if len(getters) == 1:
+        return getters[0]
+
+    def access(obj):
+        for getter in getters:
+            obj = getter(obj)
+        return obj
+    return access
+
+
+@functools.lru_cache(maxsize=None)
+def compile_path(path):
+    """
+    Returns a function reading the value at path from a ROS message or a dict,
+    the empty path returns the object itself. Compiled accessors are cached,
+    compiling the same path twice is free.
+    """
+    return compile_steps(parse_path(path))
+
+
+def split_paths(text):
+    """
+    Splits a comma separated list of paths, commas inside {...} and [...] belong to the path.
+    """
+    paths = []
+    depth = 0
+    start = 0
+    for position, c in enumerate(text):
+        if c in '{[':
+            depth += 1
+        elif c in '}]':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            paths.append(text[start:position].strip())
+            start = position + 1
+    paths.append(text[start:].strip())
+    return [path for path in paths if path]
+
+
+def compile_filter(rule):
+    """
+    Returns a predicate for a `path=value` rule, comparing the field as text.
+    The empty rule accepts everything.
+    """
+    rule = rule.strip()
+    if rule == '':
+        return lambda obj: True
+    if '=' not in rule:
+        raise ValueError(f'Invalid filter {rule!r}, expected path=value')
+    path, expected = rule.split('=', 1)
+    get = compile_path(path.strip())
+    expected = expected.strip()
+    return lambda obj: str(get(obj)) == expected
@@ -10,6 +10,7 @@ def generate_launch_description():
     use_sim_time = LaunchConfiguration('use_sim_time', default='false')
     fields = LaunchConfiguration('fields', default='')
     filterby = LaunchConfiguration('filterby', default='')
+    rules_path = LaunchConfiguration('rules_path', default='')
 
     urdf_file_name = 'r2d2.urdf.xml'
     urdf = os.path.join(
@@ -25,6 +26,7 @@ def generate_launch_description():
             description='Use simulation (Gazebo) clock if true'),
         DeclareLaunchArgument('fields', default_value=None),
         DeclareLaunchArgument('filterby', default_value=None),
+        DeclareLaunchArgument('rules_path', default_value=''),
         Node(
             package='robot_state_publisher',
             executable='robot_state_publisher',
@@ -37,6 +39,6 @@ def generate_launch_description():
             executable='r2d2_publisher_node',
             name='r2d2_publisher_node',
             output='screen',
-            parameters=[{'fields': fields, 'filterby': filterby}]
+            parameters=[{'fields': fields, 'filterby': filterby, 'rules_path': rules_path}]
         )
     ])
\ No newline at end of file
@@ -1,32 +1,55 @@
-from math import sin, cos, pi
-import json
+from geometry_msgs.msg import Vector3
+from kommons import load_yaml
+from kommons.fieldpath import split_paths
+from node_utils.instrumentation import Instrumentation
+from r2d2_publisher.routing import append_floats, Rule, RuleTable
 import rclpy
+from rclpy.logging import LoggingSeverity
 from rclpy.node import Node
-from rclpy.qos import QoSProfile
-from geometry_msgs.msg import Quaternion, Vector3
 from sensor_msgs.msg import JointState
-from tf2_ros import TransformBroadcaster, TransformStamped
+from std_msgs.msg import Float64MultiArray
 from tf2_msgs.msg import TFMessage
-from launch.actions import DeclareLaunchArgument
-from rosidl_runtime_py import message_to_ordereddict
-
 
 
 class R2d2PublisherNode(Node):
 
     def __init__(self):
         rclpy.init()
-        super().__init__(f'r2d2_publisher_node')
-        #Parameters
-        self.declare_parameter("fields", "")
-        self.declare_parameter("filterby", "")
-
-        self.fields = self.get_parameter("fields").value.split(",")
-        self.filterby = tuple(self.get_parameter("filterby").value.split("="))
-
-        self.get_logger().info(f'Fields: {self.fields}  Filterby: {self.filterby}')
-        
-        self.publisher_ = self.create_publisher(Vector3, 'tf_computed', 10)
+        super().__init__('r2d2_publisher_node')
+        # Parameters
+        self.declare_parameter('fields', '')
+        self.declare_parameter('filterby', '')
+        # YAML rule table mapping frame ids to output topics and fields (see config/rules.yaml)
+        self.declare_parameter('rules_path', '')
+
+        self.fields = split_paths(self.get_parameter('fields').value)
+        self.filterby = self.get_parameter('filterby').value
+        rules_path = self.get_parameter('rules_path').value
+
+        # Compiled once - accessors read straight from the TransformStamped objects
+        self.rules = RuleTable()
+        if rules_path:
+            self.rules = RuleTable.from_config(load_yaml(rules_path))
+        if self.fields:
+            # The single fields/filterby rule publishes on tf_computed as before
+            self.rules.add(Rule.from_filterby('tf_computed', self.fields, self.filterby))
+        # Formatting every extracted value is expensive, only done when it is logged
+        self.log_values = self.get_logger().is_enabled_for(LoggingSeverity.DEBUG)
+
+        self.get_logger().info(
+            f'Fields: {self.fields}  Filterby: {self.filterby}  Rules: {len(self.rules.rules)}')
+
+        # One publisher per output topic (the rule table checks the types agree), kept on the rule
+        self.publishers_ = {}
+        for rule in self.rules.rules:
+            if rule.topic not in self.publishers_:
+                msg_type = Vector3 if rule.type == 'vector3' else Float64MultiArray
+                self.publishers_[rule.topic] = self.create_publisher(msg_type, rule.topic, 10)
+            rule.publisher = self.publishers_[rule.topic]
+
+        # Callback latency statistics on /diagnostics (parameter instrumentation:=true)
+        self.instrumentation = Instrumentation(self)
+        self.instrumentation.instrument(self, 'tf_callback', 'joint_state_callback')
 
         self.tf_sub = self.create_subscription(
             TFMessage,
@@ -45,59 +68,39 @@ class R2d2PublisherNode(Node):
         self.broadcaster = TransformBroadcaster(self, qos=qos_profile)
         """
         self.nodeName = self.get_name()
-        self.get_logger().info(f"{self.nodeName} started!")
+        self.get_logger().info(f'{self.nodeName} started!')
 
     def tf_callback(self, msg):
-        # Process the TFMessage data here
+        # Process the TFMessage data here - each transform is routed by hash lookup of its
+        # frame ids
+        route = self.rules.route
         for tf_msg in msg.transforms:
-            val = json.loads(json.dumps(message_to_ordereddict(tf_msg)))
-            if self.filterby is not None:
-                if self.get_field(val, self.filterby[0]) == self.filterby[1]:
-                    # field accepted!
-                    values = [self.get_field(val, f) for f in self.fields]
-                    self.get_logger().info(f'TF message extracted: {values}')
+            for rule in route(tf_msg):
+                # field accepted!
+                values = rule.extract(tf_msg)
+                if self.log_values:
+                    self.get_logger().debug(f'TF message extracted for {rule.topic}: {values}')
 
+                if rule.type == 'vector3':
                     msg_to_send = Vector3()
-                    msg_to_send.x = values[0]["x"]
-                    msg_to_send.y = values[0]["y"]
-                    msg_to_send.z = values[0]["z"]
+                    msg_to_send.x = float(values[0].x)
+                    msg_to_send.y = float(values[0].y)
+                    msg_to_send.z = float(values[0].z)
+                else:
+                    msg_to_send = Float64MultiArray(data=append_floats(values, []))
 
-                    self.publisher_.publish(msg_to_send)
+                rule.publisher.publish(msg_to_send)
 
-                    
     def joint_state_callback(self, msg):
-        # Process the JointState data here
-        self.get_logger().info(f'Joint state message: {msg}')
-
-
-    @staticmethod
-    def get_field(data, key):
-        if key is not None and key != "":
-            if key[0] == ".":
-                key = key[1:]
-            if key[0].isalpha() or key[0]=="_": 
-                prefix = ""
-                rest = key
-                while len(rest ) > 0:
-                    c = rest[0]
-                    if not c.isalpha() and c != "_":
-                        break
-                    else:
-                        prefix += c
-                        rest = rest[1:]
-                return R2d2PublisherNode.get_field(data[prefix], rest)
-            elif key[0] == "[":
-                prefix, rest = key[1:].split("]")
-                index = int(prefix)
-                return R2d2PublisherNode.get_field(data[index], rest)
-            else:
-                print("# Error: unrecognized prefix")
-        return data
+        # Process the JointState data here, formatting the whole message only when it is logged
+        if self.log_values:
+            self.get_logger().debug(f'Joint state message: {msg}')
 
 
 def main():
     my_subscriber = R2d2PublisherNode()
     rclpy.spin(my_subscriber)
 
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,138 @@
+"""Rule table routing transforms of /tf to output topics.
+
+A rule matches on child_frame_id and/or header.frame_id (plus an optional
+generic `filterby` rule) and names an output topic and the fields to
+extract. Rules are indexed by the frame ids they match, so routing a
+transform is a dict lookup no matter how many rules there are; only rules
+without a frame id are checked one by one.
+
+Example rule table (YAML, see config/rules.yaml):
+
+    rules:
+      - match: {child_frame_id: head}
+        topic: head/translation
+        fields: [transform.translation]
+      - match: {header.frame_id: axis}
+        topic: axis/children
+        type: array
+        fields: [transform.translation, transform.rotation]
+"""
+from kommons.fieldpath import compile_filter, compile_path
+
+INDEXED_KEYS = ('child_frame_id', 'header.frame_id')
+OUTPUT_TYPES = ('vector3', 'array')
+
+
+def accept_all(transform):
+    return True
+
+
+class Rule(object):
+    """One output topic: which transforms go there and which fields are extracted."""
+
+    def __init__(self, topic, fields, match=None, filterby='', output_type='vector3'):
+        if output_type not in OUTPUT_TYPES:
+            raise ValueError(f"Rule for {topic}: type must be one of {', '.join(OUTPUT_TYPES)}, "
+                             f'got {output_type}')
+        if len(fields) == 0:
+            raise ValueError(f'Rule for {topic}: no fields')
+        self.topic = topic
+        self.fields = list(fields)
+        self.type = output_type
+        self.match = {key: str(value) for key, value in (match or {}).items()}
+        self.filterby = filterby
+        self.getters = [compile_path(f) for f in self.fields]
+
+        # Frame ids used for the index, everything else is checked per transform
+        self.index_key = next((key for key in INDEXED_KEYS if key in self.match), None)
+        conditions = [compile_filter(f'{key}={value}') for key, value in self.match.items()
+                      if key != self.index_key]
+        if filterby:
+            conditions.append(compile_filter(filterby))
+        if len(conditions) == 0:
+            self.accept = accept_all
+        elif len(conditions) == 1:
+            self.accept = conditions[0]
+        else:
+            self.accept = lambda transform: all(condition(transform) for condition in conditions)
+
+    @classmethod
+    def from_dict(cls, config):
+        return cls(config['topic'], config['fields'], config.get('match'),
+                   config.get('filterby', ''), config.get('type', 'vector3'))
+
+    @classmethod
+    def from_filterby(cls, topic, fields, filterby):
+        """Rule of the single fields/filterby parameters, indexed when it filters on a frame id."""
+        path, _, value = filterby.partition('=')
+        if path.strip().lstrip('.') in INDEXED_KEYS:
+            return cls(topic, fields, match={path.strip().lstrip('.'): value.strip()})
+        return cls(topic, fields, filterby=filterby)
+
+    def extract(self, transform):
+        return [get(transform) for get in self.getters]
+
+
+class RuleTable(object):
+    """Rules indexed by child_frame_id and header.frame_id.
+
+    Rules may share an output topic as long as they agree on its type.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = []
+        self.types = {}
+        self.by_child = {}
+        self.by_parent = {}
+        self.unindexed = []
+        for rule in rules:
+            self.add(rule)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(Rule.from_dict(rule) for rule in config.get('rules', []))
+
+    def add(self, rule):
+        output_type = self.types.setdefault(rule.topic, rule.type)
+        if output_type != rule.type:
+            raise ValueError(f'Rule for {rule.topic}: type {rule.type}, but the topic is already '
+                             f'published as {output_type}')
+        self.rules.append(rule)
+        if rule.index_key == 'child_frame_id':
+            self.by_child.setdefault(rule.match['child_frame_id'], []).append(rule)
+        elif rule.index_key == 'header.frame_id':
+            self.by_parent.setdefault(rule.match['header.frame_id'], []).append(rule)
+        else:
+            self.unindexed.append(rule)
+
+    def route(self, transform):
+        """Return the rules matching a TransformStamped."""
+        matched = [rule for rule in self.by_child.get(transform.child_frame_id, ())
+                   if rule.accept(transform)]
+        matched.extend(rule for rule in self.by_parent.get(transform.header.frame_id, ())
+                       if rule.accept(transform))
+        if self.unindexed:
+            matched.extend(rule for rule in self.unindexed if rule.accept(transform))
+        return matched
+
+    def topics(self):
+        return sorted({rule.topic for rule in self.rules})
+
+
+def append_floats(value, out):
+    """Append the numbers in value to out, text is skipped.
+
+    value is a number, a message, a dict or a sequence of them.
+    """
+    if isinstance(value, (int, float)):
+        out.append(float(value))
+    elif isinstance(value, dict):
+        for item in value.values():
+            append_floats(item, out)
+    elif hasattr(value, 'get_fields_and_field_types'):
+        for name in value.get_fields_and_field_types():
+            append_floats(getattr(value, name), out)
+    elif not isinstance(value, (str, bytes)) and hasattr(value, '__iter__'):
+        for item in value:
+            append_floats(item, out)
+    return out
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+# Path extraction on a long `ros2 topic echo /tf` stream as scripts/pipefilter.py sees it.
+# The stream is generated, split on `---` and parsed with YAML once; then the previous
+# character-scanning get_field of pipefilter and the paths compiled by kommons.fieldpath
+# extract the same fields from every document. Wildcard and projection paths, which the
+# previous get_field cannot express, are timed on their own. Needs only PyYAML.
+#
+# Example usage:
+#
+#    python3 scripts/benchmark_echo_paths.py --messages 20000 --frames 4
+#
+
+import argparse
+from os import path
+import sys
+import time
+
+import yaml
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from kommons.fieldpath import compile_path  # noqa: E402, I100
+
+
+def get_field(data, key):
+    # scripts/pipefilter.py before kommons.fieldpath
+    if key is not None and key != '':
+        if key[0] == '.':
+            key = key[1:]
+        if key[0].isalpha():
+            prefix = ''
+            rest = key
+            while len(rest) > 0:
+                c = rest[0]
+                if not c.isalpha():
+                    break
+                else:
+                    prefix += c
+                    rest = rest[1:]
+            return get_field(data[prefix], rest)
+        elif key[0] == '[':
+            prefix, rest = key[1:].split(']')
+            index = int(prefix)
+            return get_field(data[index], rest)
+    return data
+
+
+def echo_stream(messages, frames):
+    """Text of `ros2 topic echo /tf`, messages with frames transforms each."""
+    lines = []
+    for i in range(messages):
+        lines.append('transforms:')
+        for j in range(frames):
+            lines += [
+                '- header:',
+                '    stamp:',
+                f'      sec: {i // 100}',
+                f'      nanosec: {(i % 100) * 10000000}',
+                '    frame_id: base_link',
+                f'  child_frame_id: link{j}',
+                '  transform:',
+                '    translation:',
+                f'      x: {0.1 * j}',
+                '      y: 0.0',
+                f'      z: {0.01 * i}',
+                '    rotation:',
+                '      x: 0.0',
+                '      y: 0.0',
+                '      z: 0.0',
+                '      w: 1.0',
+            ]
+        lines.append('---')
+    return '\n'.join(lines) + '\n'
+
+
+def documents(text):
+    buffer = []
+    for line in text.splitlines():
+        if line == '---':
+            yield '\n'.join(buffer)
+            buffer = []
+        else:
+            buffer.append(line)
+
+
+def timed(name, func, count):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f'  {name:45s} {count / elapsed:12.0f} msg/s')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark path extraction on a topic echo stream.')
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--frames', type=int, default=4, help='transforms per message')
+    args = parser.parse_args()
+
+    text = echo_stream(args.messages, args.frames)
+    print(f'{args.messages} messages x {args.frames} transforms, {len(text) / 1e6:.1f} MB of YAML')
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    data = timed(f'YAML parsing ({loader.__name__})',
+                 lambda: [yaml.load(doc, Loader=loader) for doc in documents(text)], args.messages)
+
+    keys = ['transforms[0].transform.translation', 'transforms[0].header.stamp.sec',
+            f'transforms[{args.frames - 1}].transform.rotation.w']
+    getters = [compile_path(key) for key in keys]
+    previous = timed('previous get_field',
+                     lambda: [[get_field(d, key) for key in keys] for d in data], args.messages)
+    compiled = timed('compiled paths',
+                     lambda: [[get(d) for get in getters] for d in data], args.messages)
+    assert previous == compiled
+
+    wildcard = compile_path('transforms[*].{child_frame_id, transform.translation.z}')
+    timed('compiled transforms[*].{child_frame_id, ...}',
+          lambda: [wildcard(d) for d in data], args.messages)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+# Throughput of the r2d2_publisher /tf extraction on a synthetic stream.
+# Compares the previous per-transform JSON round-trip plus character-scanning
+# get_field with the accessors compiled by kommons.fieldpath. Both extract the
+# same fields from TFMessages with --frames transforms each; publishing is
+# left out. Needs a sourced ROS 2 workspace (geometry_msgs, tf2_msgs).
+#
+# Example usage:
+#
+#    python3 scripts/benchmark_fieldpath.py --frames 500 --messages 200
+#
+
+import argparse
+import json
+from os import path
+import sys
+import time
+
+from geometry_msgs.msg import TransformStamped
+from rosidl_runtime_py import message_to_ordereddict
+from tf2_msgs.msg import TFMessage
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from kommons.fieldpath import compile_filter, compile_path  # noqa: E402, I100
+
+
+def get_field(data, key):
+    # R2d2PublisherNode.get_field before the compiled accessors
+    if key is not None and key != '':
+        if key[0] == '.':
+            key = key[1:]
+        if key[0].isalpha() or key[0] == '_':
+            prefix = ''
+            rest = key
+            while len(rest) > 0:
+                c = rest[0]
+                if not c.isalpha() and c != '_':
+                    break
+                else:
+                    prefix += c
+                    rest = rest[1:]
+            return get_field(data[prefix], rest)
+        elif key[0] == '[':
+            prefix, rest = key[1:].split(']')
+            index = int(prefix)
+            return get_field(data[index], rest)
+    return data
+
+
+def previous(messages, fields, filterby):
+    extracted = 0
+    for msg in messages:
+        for tf_msg in msg.transforms:
+            val = json.loads(json.dumps(message_to_ordereddict(tf_msg)))
+            if get_field(val, filterby[0]) == filterby[1]:
+                values = [get_field(val, f) for f in fields]
+                (values[0]['x'], values[0]['y'], values[0]['z'])
+                extracted += 1
+    return extracted
+
+
+def compiled(messages, fields, filterby):
+    getters = [compile_path(f) for f in fields]
+    accept = compile_filter('='.join(filterby))
+    extracted = 0
+    for msg in messages:
+        for tf_msg in msg.transforms:
+            if accept(tf_msg):
+                values = [get(tf_msg) for get in getters]
+                (values[0].x, values[0].y, values[0].z)
+                extracted += 1
+    return extracted
+
+
+def tf_stream(messages, frames):
+    stream = []
+    for i in range(messages):
+        transforms = []
+        for j in range(frames):
+            t = TransformStamped()
+            t.header.stamp.sec = i
+            t.header.frame_id = 'base_link'
+            t.child_frame_id = f'link_{j}'
+            t.transform.translation.x = float(j)
+            t.transform.rotation.w = 1.0
+            transforms.append(t)
+        stream.append(TFMessage(transforms=transforms))
+    return stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /tf field extraction.')
+    parser.add_argument('--frames', type=int, default=500, help='transforms per TFMessage')
+    parser.add_argument('--messages', type=int, default=200)
+    args = parser.parse_args()
+
+    stream = tf_stream(args.messages, args.frames)
+    fields = ['transform.translation', 'header.stamp.sec', 'child_frame_id']
+    filterby = ('header.frame_id', 'base_link')
+    total = args.messages * args.frames
+
+    print(f'{args.messages} TFMessages x {args.frames} transforms')
+    for name, func in [('json round-trip + get_field', previous),
+                       ('compiled accessors', compiled)]:
+        start = time.perf_counter()
+        extracted = func(stream, fields, filterby)
+        elapsed = time.perf_counter() - start
+        print(f'  {name:30s} {total / elapsed:12.0f} transforms/s '
+              f'{args.messages / elapsed:10.1f} msg/s ({extracted} extracted)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+# Messages per second of scripts/pipefilter.py on generated `ros2 topic echo`
+# streams of /tf and /joint_states. In-process, the previous document handling
+# (pure-Python yaml.safe_load of the whole document, yaml.dump per key) is
+# compared with pipefilter.PipeFilter; end to end, the stream is piped through
+# pipefilter.py as `ros2 topic echo ... | pipefilter.py` would. The target is
+# keeping up with 1 kHz. Needs only PyYAML.
+#
+# Example usage:
+#
+#    python3 scripts/benchmark_pipefilter.py --messages 5000
+#
+
+import argparse
+import io
+from os import path
+import subprocess
+import sys
+import time
+
+from benchmark_echo_paths import documents, echo_stream
+import yaml
+
+REPOSITORY = path.join(path.dirname(path.realpath(__file__)), '..', '..', '..')
+PIPEFILTER = path.join(REPOSITORY, 'scripts', 'pipefilter.py')
+sys.path.insert(0, path.dirname(PIPEFILTER))
+import pipefilter  # noqa: E402, I100
+
+TARGET_RATE = 1000.0
+
+
+def joint_state_stream(messages, joints):
+    lines = []
+    for i in range(messages):
+        lines += ['header:', '  stamp:', f'    sec: {i // 1000}',
+                  f'    nanosec: {(i % 1000) * 1000000}', "  frame_id: ''", 'name:']
+        lines += [f'- panda_joint{j + 1}' for j in range(joints)]
+        for field in ('position', 'velocity', 'effort'):
+            lines.append(f'{field}:')
+            lines += [f'- {0.001 * i + j}' for j in range(joints)]
+        lines.append('---')
+    return '\n'.join(lines) + '\n'
+
+
+def previous(docs, keys):
+    # pipefilter.py write_buffer before the fast path
+    getters = [pipefilter.compile_path(key) for key in keys]
+    out = io.StringIO()
+    for doc in docs:
+        data = yaml.safe_load(doc)
+        for key, get in zip(keys, getters):
+            print(f'## {key}', file=out)
+            print(yaml.dump(get(data)), file=out)
+        print('---', file=out)
+    return out.getvalue()
+
+
+def fast(docs, keys):
+    return pipefilter.PipeFilter(keys).batch(docs)
+
+
+def rate(func, count):
+    start = time.perf_counter()
+    result = func()
+    return result, count / (time.perf_counter() - start)
+
+
+def end_to_end(text, keys):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, PIPEFILTER, ','.join(keys)], input=text.encode(),
+                   stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pipefilter.py on topic echo streams.')
+    parser.add_argument('--messages', type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f'libyaml: {pipefilter.Loader is not yaml.SafeLoader}, target {TARGET_RATE:.0f} msg/s')
+    cases = [
+        ('/tf 4 transforms', echo_stream(args.messages, 4),
+         ['transforms[0].transform.translation']),
+        ('/tf 4 transforms, all', echo_stream(args.messages, 4),
+         ['transforms[*].transform.translation']),
+        ('/joint_states 9 joints', joint_state_stream(args.messages, 9),
+         ['position']),
+        ('/joint_states 9 joints, 2 keys', joint_state_stream(args.messages, 9),
+         ['header.stamp', 'position']),
+    ]
+    for name, text, keys in cases:
+        docs = list(documents(text))
+        expected, previous_rate = rate(lambda: previous(docs, keys), len(docs))
+        output, fast_rate = rate(lambda: fast(docs, keys), len(docs))
+        assert output == expected
+        pipe_rate = len(docs) / end_to_end(text, keys)
+        status = 'ok' if pipe_rate >= TARGET_RATE else 'below target'
+        print(f'  {name:32s} previous {previous_rate:8.0f} msg/s   fast {fast_rate:8.0f} msg/s   '
+              f'piped {pipe_rate:8.0f} msg/s {status}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+# Speedup of `pipefilter.py --jobs N` on an echo dump of /tf. Pipes the dump
+# through pipefilter.py with 1, 2, 4, ... processes (up to the number of CPUs,
+# or --jobs) and checks that the output is identical to the single-process
+# run. Record a dump with
+#
+#    ros2 topic echo /tf > tf_dump.yaml
+#
+# or leave --dump out to use a generated stream with --frames transforms per
+# message. Needs only PyYAML.
+#
+# Example usage:
+#
+#    python3 scripts/benchmark_pipefilter_jobs.py --dump tf_dump.yaml \
+#        --key "transforms[*].transform.translation"
+#
+
+import argparse
+import hashlib
+import os
+from os import path
+import subprocess
+import sys
+import time
+
+from benchmark_echo_paths import echo_stream
+
+REPOSITORY = path.join(path.dirname(path.realpath(__file__)), '..', '..', '..')
+PIPEFILTER = path.join(REPOSITORY, 'scripts', 'pipefilter.py')
+
+
+def run(text, key, jobs):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, PIPEFILTER, key, '--jobs', str(jobs)], input=text,
+                            stdout=subprocess.PIPE, check=True)
+    return time.perf_counter() - start, hashlib.sha1(result.stdout).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pipefilter.py --jobs.')
+    parser.add_argument('--dump', help='output of `ros2 topic echo /tf`, generated when left out')
+    parser.add_argument('--key', default='transforms[*].transform.translation')
+    parser.add_argument('--messages', type=int, default=5000, help='generated messages')
+    parser.add_argument('--frames', type=int, default=10, help='generated transforms per message')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if args.dump:
+        with open(args.dump, 'rb') as f:
+            text = f.read()
+    else:
+        text = echo_stream(args.messages, args.frames).encode()
+    messages = text.count(b'\n---\n')
+    print(f'{messages} messages, {len(text) / 1e6:.1f} MB, {os.cpu_count()} CPUs, key {args.key}')
+
+    jobs = [1]
+    while jobs[-1] * 2 <= args.jobs:
+        jobs.append(jobs[-1] * 2)
+    if jobs[-1] != args.jobs and args.jobs > 1:
+        jobs.append(args.jobs)
+
+    baseline, expected = run(text, args.key, 1)
+    print(f'  --jobs  1 {messages / baseline:8.0f} msg/s')
+    for n in jobs[1:]:
+        elapsed, digest = run(text, args.key, n)
+        print(f'  --jobs {n:2d} {messages / elapsed:8.0f} msg/s  speedup {baseline / elapsed:4.2f}'
+              f"{'' if digest == expected else '  OUTPUT DIFFERS'}")
+
+
+if __name__ == '__main__':
+    main()
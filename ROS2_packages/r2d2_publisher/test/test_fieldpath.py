@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+from kommons.fieldpath import compile_filter, compile_path, parse_path, split_paths
+import pytest
+
+
+def transform(child, x):
+    return SimpleNamespace(
+        header=SimpleNamespace(frame_id='base_link', stamp=SimpleNamespace(sec=3, nanosec=0)),
+        child_frame_id=child,
+        transform=SimpleNamespace(translation=SimpleNamespace(x=x, y=0.0, z=0.0)))
+
+
+def test_parse_path():
+    assert parse_path('.transforms[0].transform.x_1') == [
+        ('attr', 'transforms'), ('index', 0), ('attr', 'transform'), ('attr', 'x_1')]
+    for invalid in ['transforms[a]', 'transforms[0', 'a..b', 'a.{b}.c', 'a.{}']:
+        with pytest.raises(ValueError):
+            parse_path(invalid)
+
+
+def test_compile_path_reads_attributes_and_indices():
+    msg = SimpleNamespace(transforms=[transform('leg1', 1.0), transform('leg2', 2.0)])
+    assert compile_path('transforms[1].transform.translation.x')(msg) == 2.0
+    assert compile_path('transforms[-1].child_frame_id')(msg) == 'leg2'
+    assert compile_path('')(msg) is msg
+    assert compile_path('transforms[0]') is compile_path('transforms[0]')
+
+
+def test_compile_filter_compares_as_text():
+    t = transform('leg1', 1.0)
+    assert compile_filter('child_frame_id=leg1')(t)
+    assert not compile_filter('child_frame_id=leg2')(t)
+    assert compile_filter('header.stamp.sec=3')(t)
+    assert compile_filter('')(t)
+
+
+def test_wildcards_slices_and_projections():
+    msg = SimpleNamespace(
+        transforms=[transform('leg1', 1.0), transform('leg2', 2.0), transform('head', 3.0)])
+    assert compile_path('transforms[*].child_frame_id')(msg) == ['leg1', 'leg2', 'head']
+    assert compile_path('transforms[1:].transform.translation.x')(msg) == [2.0, 3.0]
+    assert compile_path('transforms[::-2].child_frame_id')(msg) == ['head', 'leg1']
+    assert compile_path('transforms[0].{child_frame_id, transform.translation.x}')(msg) == {
+        'child_frame_id': 'leg1', 'transform.translation.x': 1.0}
+    assert compile_path('transforms[:2].{child_frame_id}')(msg) == [{'child_frame_id': 'leg1'},
+                                                                    {'child_frame_id': 'leg2'}]
+
+
+def test_paths_on_dicts():
+    data = {'transforms': [
+        {'child_frame_id': 'leg1', 'transform': {'translation': {'x': 1.0, 'y': 0.0}}}]}
+    assert compile_path('transforms[0].transform.translation.x')(data) == 1.0
+    assert compile_path('transforms[*].transform.translation.{x,y}')(data) == [
+        {'x': 1.0, 'y': 0.0}]
+    assert compile_filter('transforms[0].child_frame_id=leg1')(data)
+
+
+def test_paths_from_messages_into_dicts():
+    # A message field holding a dict, and a dict holding a message, within one run of names
+    msg = SimpleNamespace(header=SimpleNamespace(frame_id='base_link'),
+                          data={'pose': SimpleNamespace(position={'x': 1.5})})
+    assert compile_path('data.pose.position.x')(msg) == 1.5
+    assert compile_path('header.frame_id')(msg) == 'base_link'
+    assert compile_path('pose.position')(msg.data) == {'x': 1.5}
+    with pytest.raises(AttributeError):
+        compile_path('data.pose.orientation')(msg)
+    with pytest.raises(KeyError):
+        compile_path('data.twist')(msg)
+
+
+def test_split_paths_keeps_projections_together():
+    assert split_paths('a[0].{x, y},b.c, d[1:2] ,') == ['a[0].{x, y}', 'b.c', 'd[1:2]']
@@ -0,0 +1,77 @@
+from os import path
+from types import SimpleNamespace
+
+from kommons import load_yaml
+import pytest
+from r2d2_publisher.routing import append_floats, Rule, RuleTable
+
+RULES_PATH = path.join(path.dirname(path.dirname(path.realpath(__file__))), 'config', 'rules.yaml')
+
+
+def transform(parent, child, x=0.0):
+    return SimpleNamespace(
+        header=SimpleNamespace(frame_id=parent, stamp=SimpleNamespace(sec=0, nanosec=0)),
+        child_frame_id=child,
+        transform=SimpleNamespace(translation=SimpleNamespace(x=x, y=0.0, z=0.0)))
+
+
+def topics(table, t):
+    return [rule.topic for rule in table.route(t)]
+
+
+def test_rules_are_indexed_by_frame_id():
+    table = RuleTable([
+        Rule('head', ['transform.translation'], match={'child_frame_id': 'head'}),
+        Rule('from_axis', ['transform.translation'], match={'header.frame_id': 'axis'}),
+        Rule('body_in_axis', ['transform.translation'],
+             match={'child_frame_id': 'body', 'header.frame_id': 'axis'}),
+        Rule('far', ['transform.translation'], filterby='transform.translation.x=2.0'),
+    ])
+    assert table.unindexed == [table.rules[3]]
+    assert topics(table, transform('body', 'head')) == ['head']
+    assert topics(table, transform('axis', 'body')) == ['body_in_axis', 'from_axis']
+    assert topics(table, transform('odom', 'body')) == []
+    assert topics(table, transform('axis', 'leg1', x=2.0)) == ['from_axis', 'far']
+
+
+def test_filterby_parameter_rule():
+    rule = Rule.from_filterby('tf_computed', ['transform'], 'child_frame_id=head')
+    assert rule.index_key == 'child_frame_id'
+    rule = Rule.from_filterby('tf_computed', ['transform'], 'header.stamp.sec=0')
+    assert rule.index_key is None
+    assert rule.accept(transform('a', 'b'))
+
+
+def test_invalid_rule():
+    with pytest.raises(ValueError):
+        Rule('out', [], match={'child_frame_id': 'head'})
+    with pytest.raises(ValueError):
+        Rule('out', ['transform'], output_type='pose')
+
+
+def test_topic_types_must_agree():
+    table = RuleTable([
+        Rule('head', ['transform.translation'], match={'child_frame_id': 'head'}),
+        Rule('head', ['transform.translation'], match={'child_frame_id': 'head_link'}),
+        Rule('all', ['transform.translation'], output_type='array')])
+    with pytest.raises(ValueError, match='already published as vector3'):
+        table.add(Rule('head', ['transform.rotation'], output_type='array'))
+    with pytest.raises(ValueError, match='already published as array'):
+        table.add(Rule.from_filterby('all', ['transform'], 'child_frame_id=head'))
+    with pytest.raises(ValueError, match='already published as vector3'):
+        RuleTable.from_config({'rules': [
+            {'topic': 'out', 'fields': ['transform.translation']},
+            {'topic': 'out', 'fields': ['transform.rotation'], 'type': 'array'}]})
+    assert len(table.rules) == 3
+
+
+def test_example_rule_table():
+    table = RuleTable.from_config(load_yaml(RULES_PATH))
+    assert 'r2d2/head/translation' in table.topics()
+    assert topics(table, transform('axis', 'body')) == ['r2d2/body/pose']
+
+
+def test_append_floats():
+    msg = SimpleNamespace(get_fields_and_field_types=lambda: {'x': 'double', 'name': 'string'},
+                          x=1, name='a')
+    assert append_floats([msg, [2.5, True]], []) == [1.0, 2.5, 1.0]
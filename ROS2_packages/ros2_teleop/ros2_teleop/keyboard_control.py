@@ -5,6 +5,7 @@ from keyboard_msgs.msg import KeyboardState
 from pynput import keyboard
 from pynput.keyboard import Key
 from sshkeyboard import listen_keyboard
+from node_utils.instrumentation import Instrumentation
 
 
 class KeyboardControlNode(Node):
@@ -38,6 +39,11 @@ class KeyboardControlNode(Node):
             "c": False,
         }
 
+        # Callback latency statistics on /diagnostics (parameter instrumentation:=true)
+        self.instrumentation = Instrumentation(self)
+        self.instrumentation.instrument(
+            self, "on_press", "on_release", "on_press_pyn", "on_release_pyn", "send_keyboard_state")
+
         # Create keyboard_msgs publisher
         self.publisher = self.create_publisher(KeyboardState, "keyboard_msgs", 10)
         self.timer = self.create_timer(0.05, self.send_keyboard_state)
@@ -7,6 +7,7 @@ from sensor_msgs.msg import Joy
 from pymoveit2 import MoveIt2Servo
 from pymoveit2.robots import panda
 from keyboard_msgs.msg import KeyboardState
+from node_utils.instrumentation import Instrumentation
 
 
 class TeleopNode(Node):
@@ -31,6 +32,11 @@ class TeleopNode(Node):
             frame_id=panda.base_link_name(),
             callback_group=callback_group,
         )
+        # Callback latency statistics on /diagnostics (parameter instrumentation:=true)
+        self.instrumentation = Instrumentation(self)
+        self.instrumentation.instrument(
+            self, "joy_listener_callback", "keyboard_listener_callback", "update_command")
+
         if self.start_joy:
             # Create /joy subsriber
             self.subscription = self.create_subscription(
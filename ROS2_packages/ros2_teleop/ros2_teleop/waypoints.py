@@ -12,6 +12,7 @@ from pymoveit2 import MoveIt2Servo
 from pymoveit2.robots import panda
 from keyboard_msgs.msg import KeyboardState
 from sensor_msgs.msg import JointState
+from node_utils.instrumentation import Instrumentation
 
 
 def is_zero_twist(Lx, Ly, Lz, Ax, Ay, Az):
@@ -60,6 +61,11 @@ class WaypointNode(Node):
             callback_group=callback_group,
         )
 
+        # Callback latency statistics on /diagnostics (parameter instrumentation:=true)
+        self.instrumentation = Instrumentation(self)
+        self.instrumentation.instrument(
+            self, "joint_listener_callback", "joy_listener_callback", "keyboard_listener_callback", "update_command")
+
         if self.start_joy:
             # Create /joy subsriber
             self.subscription = self.create_subscription(
@@ -0,0 +1,160 @@
+"""
+Columnar cache of the JointState messages of a rosbag2 bag.
+
+The first access decodes the topic once into NumPy arrays and stores them beside
+the bag, in <bag>.cache/<topic>/:
+
+    timestamps.npy  int64 (n,)    receive time of the bag, ns
+    stamps.npy      int64 (n,)    header.stamp, ns
+    names.npy       str   (j,)    all joint names, in order of appearance
+    position.npy    float64 (n, j)
+    velocity.npy    float64 (n, j)
+    effort.npy      float64 (n, j)  NaN where a message has no value for a joint
+    signature.json  size and mtime of the bag files the cache was made from
+
+Later replays and analyses load the arrays with np.load(mmap_mode="r") instead of
+deserializing the bag again. The cache is rebuilt when the size or the mtime of a
+bag file changes.
+
+    joint_states = load_joint_states("bagfiles/rosbag2_2023_03-2")
+    joint_states.position[:, joint_states.index("panda_joint1")]
+
+Run as a script to build the caches of the bags given as arguments:
+
+    python3 bag_cache.py bagfiles/rosbag2_2023_03-2 [--topic /joint_states]
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+from os import path
+
+import numpy as np
+
+CACHE_VERSION = 1
+COLUMNS = ("timestamps", "stamps", "names", "position", "velocity", "effort")
+BAG_FILE_PATTERNS = ("metadata.yaml", "*.db3", "*.mcap")
+
+
+class JointStateColumns(object):
+    """The columns of a JointState topic, see the module docstring."""
+
+    def __init__(self, timestamps, stamps, names, position, velocity, effort):
+        self.timestamps = timestamps
+        self.stamps = stamps
+        self.names = names
+        self.position = position
+        self.velocity = velocity
+        self.effort = effort
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def index(self, name):
+        """Column of a joint in position, velocity and effort."""
+        return self.names.tolist().index(name)
+
+    def arrays(self):
+        return {column: getattr(self, column) for column in COLUMNS}
+
+
+def cache_directory(bag, topic):
+    return path.join(path.normpath(bag) + ".cache", topic.strip("/").replace("/", "_"))
+
+
+def bag_signature(bag, topic):
+    """What the cache of topic depends on: name, size and mtime of the bag files."""
+    files = []
+    for pattern in BAG_FILE_PATTERNS:
+        for filename in sorted(glob.glob(path.join(bag, pattern))):
+            stat = os.stat(filename)
+            files.append([path.basename(filename), stat.st_size, stat.st_mtime_ns])
+    return {"version": CACHE_VERSION, "topic": topic, "files": files}
+
+
+def decode_joint_states(bag, topic="/joint_states"):
+    """Deserialize all messages of a JointState topic into columns."""
+    from rosbags.rosbag2 import Reader
+    from joint_state_cdr import deserialize
+
+    timestamps = []
+    stamps = []
+    names = {}
+    rows = []
+    with Reader(bag) as reader:
+        connections = [c for c in reader.connections if c.topic == topic]
+        if not connections:
+            raise ValueError(f"No topic {topic} in {bag}")
+        for connection, timestamp, rawdata in reader.messages(connections=connections):
+            msg = deserialize(rawdata, connection.msgtype)
+            timestamps.append(timestamp)
+            stamps.append(msg.header.stamp.sec * 1000000000 + msg.header.stamp.nanosec)
+            columns = [names.setdefault(name, len(names)) for name in msg.name]
+            rows.append((columns, msg.position, msg.velocity, msg.effort))
+
+    values = {field: np.full((len(rows), len(names)), np.nan) for field in ("position", "velocity", "effort")}
+    for i, (columns, position, velocity, effort) in enumerate(rows):
+        # Sequences may be empty (no velocity or effort) or shorter than the names
+        for field, data in (("position", position), ("velocity", velocity), ("effort", effort)):
+            n = min(len(columns), len(data))
+            values[field][i, columns[:n]] = data[:n]
+    return JointStateColumns(np.array(timestamps, dtype=np.int64), np.array(stamps, dtype=np.int64),
+                             np.array(list(names), dtype=str), **values)
+
+
+def read_cache(directory, signature):
+    """The cached columns memory-mapped, None when the cache is missing or out of date."""
+    try:
+        with open(path.join(directory, "signature.json")) as f:
+            if json.load(f) != signature:
+                return None
+        return JointStateColumns(**{column: np.load(path.join(directory, column + ".npy"), mmap_mode="r")
+                                    for column in COLUMNS})
+    except (OSError, ValueError):
+        return None
+
+
+def write_cache(directory, signature, columns):
+    # Written to a temporary directory and renamed, so readers never see half a cache
+    temporary = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    for column, array in columns.arrays().items():
+        np.save(path.join(temporary, column + ".npy"), array)
+    with open(path.join(temporary, "signature.json"), "w") as f:
+        json.dump(signature, f)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.rename(temporary, directory)
+
+
+def load_joint_states(bag, topic="/joint_states", cache=True):
+    """
+    The columns of a JointState topic of a bag, memory-mapped from the cache beside the bag. The cache is
+    built when it is missing or the bag changed. With cache=False the bag is decoded and nothing is written.
+    """
+    if not cache:
+        return decode_joint_states(bag, topic)
+    directory = cache_directory(bag, topic)
+    signature = bag_signature(bag, topic)
+    columns = read_cache(directory, signature)
+    if columns is None:
+        write_cache(directory, signature, decode_joint_states(bag, topic))
+        columns = read_cache(directory, signature)
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the JointState caches of rosbag2 bags.")
+    parser.add_argument("bags", nargs="+")
+    parser.add_argument("--topic", default="/joint_states")
+    args = parser.parse_args()
+    for bag in args.bags:
+        columns = load_joint_states(bag, args.topic)
+        duration = (columns.timestamps[-1] - columns.timestamps[0]) / 1e9 if len(columns) else 0.0
+        print(f"{bag}: {len(columns)} messages, {duration:.1f} s, joints {', '.join(columns.names)} "
+              f"-> {cache_directory(bag, args.topic)}")
+
+
+if __name__ == "__main__":
+    main()
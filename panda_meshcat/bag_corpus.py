@@ -0,0 +1,184 @@
+"""
+Index of a directory tree of rosbag2 bags, built with a process pool.
+
+Every directory with a metadata.yaml or a .db3 file is a bag. For each bag the
+index records the data files listed in the metadata and whether they exist,
+orphaned -shm/-wal files, the duration and, per topic, the message count, the
+real rate, the jitter of the intervals between messages and the gaps - intervals
+longer than --gap-factor times the median interval. Bags without data files are
+described by their metadata.
+
+Everything goes into one sqlite file with two tables, which can be queried
+without opening the bags again:
+
+    bags(path, storage, data_files, data_file_exists, orphan_files, size_bytes, messages,
+         metadata_messages, start_ns, duration_s, metadata_duration_s, error)
+    topics(bag, topic, type, count, metadata_count, rate_hz, mean_interval_ms, jitter_ms,
+           max_interval_ms, gaps, max_gap_s)
+
+Example usage:
+
+    python3 bag_corpus.py ../bagfiles -o ../bagfiles/index.sqlite --jobs 4
+    python3 bag_corpus.py -o ../bagfiles/index.sqlite --query "SELECT bag, rate_hz FROM topics WHERE gaps > 0"
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+from os import path
+
+import numpy as np
+import yaml
+
+from bag_index import scan
+
+GAP_FACTOR = 5.0
+
+SCHEMA = """
+CREATE TABLE bags(path TEXT PRIMARY KEY, storage TEXT, data_files TEXT, data_file_exists INTEGER,
+                  orphan_files TEXT, size_bytes INTEGER, messages INTEGER, metadata_messages INTEGER,
+                  start_ns INTEGER, duration_s REAL, metadata_duration_s REAL, error TEXT);
+CREATE TABLE topics(bag TEXT, topic TEXT, type TEXT, count INTEGER, metadata_count INTEGER, rate_hz REAL,
+                    mean_interval_ms REAL, jitter_ms REAL, max_interval_ms REAL, gaps INTEGER, max_gap_s REAL,
+                    PRIMARY KEY(bag, topic));
+"""
+
+REPORT = """
+SELECT b.path, b.data_file_exists, b.duration_s, b.metadata_duration_s, t.topic, t.count, t.metadata_count,
+       t.rate_hz, t.jitter_ms, t.gaps, t.max_gap_s, b.error
+FROM bags b LEFT JOIN topics t ON t.bag = b.path ORDER BY b.path, t.topic
+"""
+
+
+def find_bags(root):
+    """Directories below root holding a metadata.yaml or a .db3 file, caches of bag_cache.py are left out."""
+    bags = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = sorted(d for d in subdirectories if not d.endswith(".cache"))
+        if "metadata.yaml" in files or any(f.endswith(".db3") for f in files):
+            bags.append(directory)
+    return bags
+
+
+def interval_stats(timestamps, gap_factor=GAP_FACTOR):
+    """Rate, interval and gap statistics of sorted timestamps in ns."""
+    stats = dict(count=len(timestamps), rate_hz=None, mean_interval_ms=None, jitter_ms=None, max_interval_ms=None,
+                 gaps=0, max_gap_s=None)
+    if len(timestamps) < 2:
+        return stats
+    intervals = np.diff(np.asarray(timestamps, dtype=np.int64)) / 1e9
+    span = (timestamps[-1] - timestamps[0]) / 1e9
+    gaps = intervals[intervals > gap_factor * np.median(intervals)]
+    stats.update(
+        rate_hz=(len(timestamps) - 1) / span if span > 0 else None,
+        mean_interval_ms=float(intervals.mean() * 1e3),
+        jitter_ms=float(intervals.std() * 1e3),
+        max_interval_ms=float(intervals.max() * 1e3),
+        gaps=int(len(gaps)),
+        max_gap_s=float(gaps.max()) if len(gaps) else None)
+    return stats
+
+
+def index_bag(bag, gap_factor=GAP_FACTOR):
+    """(bag row, topic rows) of one bag, errors are recorded in the bag row."""
+    row = dict(path=bag, storage=None, data_files="[]", data_file_exists=0, orphan_files="[]", size_bytes=0,
+               messages=None, metadata_messages=None, start_ns=None, duration_s=None, metadata_duration_s=None,
+               error=None)
+    topics = {}
+    try:
+        info = {}
+        metadata = path.join(bag, "metadata.yaml")
+        if path.exists(metadata):
+            with open(metadata) as f:
+                info = (yaml.safe_load(f) or {}).get("rosbag2_bagfile_information", {})
+        listed = info.get("relative_file_paths") or [path.basename(f) for f in sorted(glob.glob(path.join(bag, "*.db3")))]
+        existing = [name for name in listed if path.exists(path.join(bag, name))]
+        orphans = [path.basename(f) for f in sorted(glob.glob(path.join(bag, "*-shm")) + glob.glob(path.join(bag, "*-wal")))
+                   if path.basename(f).rsplit("-", 1)[0] not in existing]
+        row.update(storage=info.get("storage_identifier"), data_files=json.dumps(listed),
+                   data_file_exists=int(bool(listed) and len(existing) == len(listed)), orphan_files=json.dumps(orphans),
+                   size_bytes=sum(os.path.getsize(path.join(bag, name)) for name in existing),
+                   metadata_messages=info.get("message_count"))
+        if "duration" in info:
+            row["metadata_duration_s"] = info["duration"]["nanoseconds"] / 1e9
+        for entry in info.get("topics_with_message_count", []):
+            topic = entry["topic_metadata"]
+            topics[topic["name"]] = dict(bag=bag, topic=topic["name"], type=topic["type"],
+                                         metadata_count=entry.get("message_count"), **interval_stats([]))
+            topics[topic["name"]]["count"] = None
+
+        if existing and (row["storage"] in (None, "sqlite3")):
+            index = scan([path.join(bag, name) for name in existing])
+            starts = [timestamps[0] for _, timestamps, _, _ in index.values() if len(timestamps)]
+            ends = [timestamps[-1] for _, timestamps, _, _ in index.values() if len(timestamps)]
+            row["messages"] = sum(len(timestamps) for _, timestamps, _, _ in index.values())
+            if starts:
+                row["start_ns"] = int(min(starts))
+                row["duration_s"] = (int(max(ends)) - int(min(starts))) / 1e9
+            for name, (msgtype, timestamps, _, _) in index.items():
+                topic = topics.setdefault(name, dict(bag=bag, topic=name, type=msgtype, metadata_count=None))
+                topic.update(interval_stats(timestamps, gap_factor))
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row, list(topics.values())
+
+
+def index_bag_star(args):
+    return index_bag(*args)
+
+
+def write_index(filename, results):
+    temporary = f"{filename}.tmp-{os.getpid()}"
+    if path.exists(temporary):
+        os.remove(temporary)
+    with sqlite3.connect(temporary) as connection:
+        connection.executescript(SCHEMA)
+        for row, topics in results:
+            connection.execute(f"INSERT INTO bags({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                               list(row.values()))
+            for topic in topics:
+                connection.execute(f"INSERT INTO topics({', '.join(topic)}) VALUES ({', '.join('?' * len(topic))})",
+                                   list(topic.values()))
+    connection.close()
+    os.replace(temporary, filename)
+
+
+def print_rows(cursor):
+    names = [d[0] for d in cursor.description]
+    rows = [["" if v is None else f"{v:.3f}" if isinstance(v, float) else str(v) for v in row] for row in cursor]
+    widths = [max([len(name)] + [len(row[i]) for row in rows]) for i, name in enumerate(names)]
+    print("  ".join(name.ljust(width) for name, width in zip(names, widths)))
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index a directory tree of rosbag2 bags into one sqlite file.")
+    parser.add_argument("root", nargs="?", default=None, help="directory to scan, left out with --query")
+    parser.add_argument("-o", "--output", default="bag_index.sqlite")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--gap-factor", type=float, default=GAP_FACTOR,
+                        help="intervals longer than this times the median interval are gaps")
+    parser.add_argument("--query", default=None, help="SQL to run on the index instead of scanning")
+    args = parser.parse_args()
+
+    if args.root is None and args.query is None:
+        parser.error("give a directory to scan or --query")
+    if args.root is not None:
+        bags = find_bags(args.root)
+        start = time.perf_counter()
+        with multiprocessing.Pool(max(1, args.jobs)) as pool:
+            results = sorted(pool.imap_unordered(index_bag_star, [(bag, args.gap_factor) for bag in bags]),
+                             key=lambda result: result[0]["path"])
+        write_index(args.output, results)
+        print(f"{len(bags)} bags indexed in {time.perf_counter() - start:.2f} s with {args.jobs} processes "
+              f"-> {args.output}")
+    with sqlite3.connect(f"file:{args.output}?mode=ro", uri=True) as connection:
+        print_rows(connection.execute(args.query or REPORT))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Timestamp index of a rosbag2 sqlite3 bag for seeking and random access.
+
+The (topic_id, timestamp) columns of the `messages` table of every .db3 file are
+read once into one sorted timestamp array per topic, together with the file and
+the row id of each message. Lookups are bisections (np.searchsorted) on these
+arrays; only the messages actually read are fetched from sqlite, by row id.
+
+The index is stored beside the bag in <bag>.cache/index.npz, so reopening a
+bag does not touch the message table; it is rebuilt when the size or the mtime
+of a bag file changes (see bag_cache.py).
+
+Times are bag timestamps in ns like the ones of rosbags, index.start is the
+first one:
+
+    index = BagIndex("bagfiles/rosbag2_2023_03-2")
+    i = index.seek("/joint_states", index.start + 10e9)    # first message at or after 10 s
+    i0, i1 = index.range("/joint_states", t0, t1)          # messages with t0 <= timestamp < t1
+    timestamp, rawdata = index.read("/joint_states", index.nearest("/joint_states", t))
+    for timestamp, rawdata in index.messages("/joint_states", t0, t1): ...
+
+Positions are the same as the rows of the bag_cache columns of a topic, both are
+ordered by timestamp.
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sqlite3
+from os import path
+
+import numpy as np
+
+from bag_cache import bag_signature
+
+READ_CHUNK = 500
+
+
+def data_files(bag):
+    """The .db3 files of a bag, in the order of metadata.yaml when it lists them."""
+    import yaml
+
+    metadata = path.join(bag, "metadata.yaml")
+    if path.exists(metadata):
+        with open(metadata) as f:
+            info = yaml.safe_load(f).get("rosbag2_bagfile_information", {})
+        files = [path.join(bag, name) for name in info.get("relative_file_paths", [])]
+        if files:
+            return [f for f in files if path.exists(f)]
+    return sorted(glob.glob(path.join(bag, "*.db3")))
+
+
+def connect(filename):
+    return sqlite3.connect(f"file:{filename}?mode=ro", uri=True)
+
+
+def scan(files):
+    """
+    {topic: (type, timestamps, file indices, row ids)} of the messages tables of files, sorted by timestamp.
+    """
+    types = {}
+    columns = {}
+    for file_index, filename in enumerate(files):
+        # The connection context manager only ends the transaction, closing() closes the file
+        with contextlib.closing(connect(filename)) as connection:
+            topics = {topic_id: (name, type) for topic_id, name, type
+                      in connection.execute("SELECT id, name, type FROM topics")}
+            rows = np.array(connection.execute("SELECT topic_id, timestamp, id FROM messages").fetchall(),
+                            dtype=np.int64).reshape(-1, 3)
+        for topic_id, (name, type) in topics.items():
+            selected = rows[rows[:, 0] == topic_id]
+            types[name] = type
+            columns.setdefault(name, []).append((selected[:, 1], np.full(len(selected), file_index), selected[:, 2]))
+
+    index = {}
+    for name, parts in columns.items():
+        timestamps, file_indices, ids = (np.concatenate(column) for column in zip(*parts))
+        order = np.lexsort((ids, file_indices, timestamps))
+        index[name] = (types[name], timestamps[order], file_indices[order].astype(np.int16), ids[order])
+    return index
+
+
+class BagIndex(object):
+    """Per-topic timestamp index of a bag, see the module docstring."""
+
+    def __init__(self, bag, cache=True):
+        self.bag = bag
+        self.files = data_files(bag)
+        if not self.files:
+            raise ValueError(f"No .db3 file in {bag}")
+        self.connections = {}
+        filename = path.join(path.normpath(bag) + ".cache", "index.npz")
+        signature = bag_signature(bag, "index")
+        self.index = self.load(filename, signature) if cache else None
+        if self.index is None:
+            self.index = scan(self.files)
+            if cache:
+                self.save(filename, signature)
+        starts = [timestamps[0] for _, timestamps, _, _ in self.index.values() if len(timestamps)]
+        ends = [timestamps[-1] for _, timestamps, _, _ in self.index.values() if len(timestamps)]
+        self.start = int(min(starts)) if starts else 0
+        self.end = int(max(ends)) if ends else 0
+
+    @staticmethod
+    def load(filename, signature):
+        try:
+            with np.load(filename) as stored:
+                if json.loads(str(stored["signature"])) != signature:
+                    return None
+                topics = json.loads(str(stored["topics"]))
+                return {name: (type, stored[f"{i}_timestamps"], stored[f"{i}_files"], stored[f"{i}_ids"])
+                        for i, (name, type) in enumerate(topics)}
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, filename, signature):
+        arrays = {"signature": np.array(json.dumps(signature)),
+                  "topics": np.array(json.dumps([[name, type] for name, (type, _, _, _) in self.index.items()]))}
+        for i, (type, timestamps, files, ids) in enumerate(self.index.values()):
+            arrays[f"{i}_timestamps"] = timestamps
+            arrays[f"{i}_files"] = files
+            arrays[f"{i}_ids"] = ids
+        os.makedirs(path.dirname(filename), exist_ok=True)
+        temporary = f"{filename}.tmp-{os.getpid()}.npz"
+        np.savez(temporary, **arrays)
+        os.replace(temporary, filename)
+
+    @property
+    def topics(self):
+        """{topic: message type}"""
+        return {name: type for name, (type, _, _, _) in self.index.items()}
+
+    def timestamps(self, topic):
+        return self.index[topic][1]
+
+    def __len__(self):
+        return sum(len(timestamps) for _, timestamps, _, _ in self.index.values())
+
+    def seek(self, topic, t):
+        """Position of the first message of topic at or after t."""
+        return int(np.searchsorted(self.timestamps(topic), t, side="left"))
+
+    def range(self, topic, t0, t1):
+        """Positions (start, stop) of the messages of topic with t0 <= timestamp < t1."""
+        timestamps = self.timestamps(topic)
+        return int(np.searchsorted(timestamps, t0, side="left")), int(np.searchsorted(timestamps, t1, side="left"))
+
+    def nearest(self, topic, t):
+        """Position of the message of topic closest to t, None when the topic has no messages."""
+        timestamps = self.timestamps(topic)
+        if len(timestamps) == 0:
+            return None
+        i = int(np.searchsorted(timestamps, t))
+        if i == len(timestamps) or (i > 0 and t - timestamps[i - 1] <= timestamps[i] - t):
+            return i - 1
+        return i
+
+    def connection(self, file_index):
+        if file_index not in self.connections:
+            self.connections[file_index] = connect(self.files[file_index])
+        return self.connections[file_index]
+
+    def read(self, topic, position):
+        """(timestamp, rawdata) of the message of topic at position."""
+        _, timestamps, files, ids = self.index[topic]
+        (data,) = self.connection(int(files[position])).execute(
+            "SELECT data FROM messages WHERE id = ?", (int(ids[position]),)).fetchone()
+        return int(timestamps[position]), data
+
+    def messages(self, topic, t0=None, t1=None):
+        """Iterate (timestamp, rawdata) of the messages of topic with t0 <= timestamp < t1, in order."""
+        _, timestamps, files, ids = self.index[topic]
+        start = 0 if t0 is None else self.seek(topic, t0)
+        stop = len(timestamps) if t1 is None else self.seek(topic, t1)
+        for first in range(start, stop, READ_CHUNK):
+            last = min(first + READ_CHUNK, stop)
+            chunk_files = files[first:last]
+            chunk_ids = ids[first:last]
+            # Primary key lookups, one query per file of the chunk
+            data = {}
+            for file_index in np.unique(chunk_files).tolist():
+                selected = chunk_ids[chunk_files == file_index].tolist()
+                query = f"SELECT id, data FROM messages WHERE id IN ({','.join('?' * len(selected))})"
+                for row_id, rawdata in self.connection(file_index).execute(query, selected):
+                    data[file_index, row_id] = rawdata
+            for i, file_index, row_id in zip(range(first, last), chunk_files.tolist(), chunk_ids.tolist()):
+                yield int(timestamps[i]), data[file_index, row_id]
+
+    def close(self):
+        for connection in self.connections.values():
+            connection.close()
+        self.connections = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index a rosbag2 sqlite3 bag and look up messages by time.")
+    parser.add_argument("bag")
+    parser.add_argument("--topic", default=None)
+    parser.add_argument("--at", type=float, default=None, help="seconds from the start, prints the nearest message")
+    args = parser.parse_args()
+
+    with BagIndex(args.bag) as index:
+        print(f"{args.bag}: {len(index)} messages, {(index.end - index.start) / 1e9:.1f} s")
+        for topic, type in index.topics.items():
+            print(f"  {topic} {type} {len(index.timestamps(topic))}")
+        if args.at is not None:
+            topic = args.topic or next(iter(index.topics))
+            position = index.nearest(topic, index.start + args.at * 1e9)
+            timestamp, rawdata = index.read(topic, position)
+            print(f"{topic} #{position} at {(timestamp - index.start) / 1e9:.3f} s, {len(rawdata)} bytes")
+
+
+if __name__ == "__main__":
+    main()
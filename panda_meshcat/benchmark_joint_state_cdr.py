@@ -0,0 +1,50 @@
+# Decoding time of the JointState messages of a bag: the rosbags deserialize_cdr
+# against the zero-copy decoder of joint_state_cdr.py. The messages are read into
+# memory first, so only decoding is measured; both results are compared.
+#
+# Example usage:
+#
+#    python3 benchmark_joint_state_cdr.py ../bagfiles/rosbag2_2023_03-2 --repeat 10
+#
+import argparse
+import time
+
+import numpy as np
+from rosbags.rosbag2 import Reader
+
+from joint_state_cdr import JOINT_STATE, deserialize_cdr, deserialize_joint_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JointState CDR decoding.")
+    parser.add_argument("bag", nargs="?", default="../bagfiles/rosbag2_2023_03-2")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with Reader(args.bag) as reader:
+        connections = [c for c in reader.connections if c.msgtype == JOINT_STATE]
+        raws = [rawdata for _, _, rawdata in reader.messages(connections=connections)]
+    print(f"{len(raws)} JointState messages of {args.bag}, {args.repeat} passes")
+
+    for raw in raws:
+        generic = deserialize_cdr(raw, JOINT_STATE)
+        fast = deserialize_joint_state(raw)
+        assert generic.header == fast.header and generic.name == fast.name
+        for field in ("position", "velocity", "effort"):
+            assert np.array_equal(getattr(generic, field), getattr(fast, field))
+
+    results = {}
+    for name, decode in [("deserialize_cdr", lambda raw: deserialize_cdr(raw, JOINT_STATE)),
+                         ("deserialize_joint_state", deserialize_joint_state)]:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for raw in raws:
+                decode(raw)
+        elapsed = (time.perf_counter() - start) / (args.repeat * len(raws))
+        results[name] = elapsed
+        print(f"  {name:25s} {elapsed * 1e6:6.1f} us/msg {1 / elapsed:10.0f} msg/s")
+    print(f"  speedup {results['deserialize_cdr'] / results['deserialize_joint_state']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,16 @@ from os.path import dirname, join, abspath
 
 # rosbag2 API:
 # https://ternaris.gitlab.io/rosbags/topics/rosbag2.html
-from rosbags.rosbag2 import Reader
-from rosbags.serde import deserialize_cdr
+# The JointState messages are decoded once into a columnar cache beside the bag (see bag_cache.py)
+from bag_cache import load_joint_states
+
+# Playback at the recorded timestamps, shared with meshcat_visualizer/trajectory_visualizer.py
+try:
+    from node_utils.playback import PlaybackScheduler
+except ImportError:
+    # Not in a sourced ROS 2 workspace: use the package in the repository
+    sys.path.insert(0, join(dirname(abspath(__file__)), "..", "ROS2_packages", "node_utils"))
+    from node_utils.playback import PlaybackScheduler
 
 # pinocchio API:
 # https://gepettoweb.laas.fr/doc/stack-of-tasks/pinocchio/master/doxygen-html/md_doc_b-examples_display_b-meshcat-viewer.html
@@ -85,26 +93,34 @@ for i in range(10000):
     viz.display(q1)
 """
 time.sleep(3)
-# create reader instance and open for reading
 
-# iterate over messages
-while True:
-    with Reader('/home/julius/devel/RoboDemos/bagfiles/panda_tests/x_axis_minus_2') as reader:
-        # topic and msgtype information is available on .connections list
-        print("Topics read:")
-        for connection in reader.connections:
-            print(connection.topic, connection.msgtype)
-        i = 0
-        for connection, timestamp, rawdata in reader.messages():
-            if connection.topic == '/joint_states':
-                msg = deserialize_cdr(rawdata, connection.msgtype)
-                print(i, msg.position)
-                q_ndx = 7
-                q1[q_ndx:q_ndx+7] = msg.position[:7]
-                time.sleep(0.02)
-                viz.display(q1)
-                i += 1
-    """
+# decode the bag once (or memory-map the cache of an earlier run)
+bag = '/home/julius/devel/RoboDemos/bagfiles/panda_tests/x_axis_minus_2'
+joint_states = load_joint_states(bag)
+print(f"{len(joint_states)} joint states, joints: {', '.join(joint_states.names)}")
+
+# optional start time in seconds from the first joint state, found by bisection in the cached
+# timestamps, and playback rate
+start_s = float(sys.argv[1]) if len(sys.argv) > 1 else 0.0
+rate = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+first = int(np.searchsorted(joint_states.timestamps, joint_states.timestamps[0] + start_s * 1e9))
+if first >= len(joint_states):
+    duration = (joint_states.timestamps[-1] - joint_states.timestamps[0]) * 1e-9
+    sys.exit(f"Start time {start_s} s is past the end of the bag ({duration:.3f} s)")
+print(f"Starting at message {first} ({start_s} s)")
+
+# iterate over messages at their recorded times, frames that are late when rendering is slow are skipped
+scheduler = PlaybackScheduler(joint_states.timestamps, rate=rate, loop=True, start=first)
+for i in scheduler:
+    position = joint_states.position[i]
+    q_ndx = 7
+    q1[q_ndx:q_ndx+7] = position[:7]
+    viz.display(q1)
+    # printing every frame costs more than rendering it, only every 100th is shown
+    if scheduler.frames % 100 == 0:
+        print(i, position)
+        print(scheduler.summary())
+"""
     # messages() accepts connection filters
     connections = [x for x in reader.connections if x.topic == '/imu_raw/Imu']
     for connection, timestamp, rawdata in reader.messages(connections=connections):
@@ -0,0 +1,128 @@
+"""
+Zero-copy CDR decoder for sensor_msgs/msg/JointState.
+
+The deserialize_cdr of a rosbags typestore builds a message field by field in Python. A
+JointState has a fixed layout, so here the header and the joint names are read
+with struct and position, velocity and effort are np.frombuffer views into the
+serialized data - nothing is copied, the arrays are read-only and keep the data
+alive.
+
+    msg = deserialize_joint_state(rawdata)
+    msg.position  # float64 view into rawdata
+
+The result is the same message type deserialize_cdr returns. Data that does not
+have the expected layout (big endian, truncated, extra bytes) is decoded by
+deserialize_cdr. deserialize(rawdata, msgtype) picks the decoder by message type.
+
+Layout after the 4 byte encapsulation header, aligned relative to its end:
+
+    int32 sec, uint32 nanosec, string frame_id
+    uint32 count, count * string           name
+    uint32 count, (align 8) count * float64  position, velocity, effort
+
+with string = uint32 length including the terminating NUL, the bytes, NUL.
+"""
+import struct
+
+import numpy as np
+from rosbags.typesys import Stores, get_typestore
+
+# Message classes and the generic decoder of the ROS 2 Foxy types, the rosbags.serde and
+# rosbags.typesys.types modules are deprecated
+TYPESTORE = get_typestore(Stores.ROS2_FOXY)
+deserialize_cdr = TYPESTORE.deserialize_cdr
+Time = TYPESTORE.types["builtin_interfaces/msg/Time"]
+JointState = TYPESTORE.types["sensor_msgs/msg/JointState"]
+Header = TYPESTORE.types["std_msgs/msg/Header"]
+
+JOINT_STATE = "sensor_msgs/msg/JointState"
+CDR_LE = b"\x00\x01"
+UINT32 = struct.Struct("<I")
+HEADER = struct.Struct("<iII")
+
+
+class LayoutError(ValueError):
+    pass
+
+
+class NameCache(object):
+    """The serialized names of the last message and their decoded list; names rarely change in a recording."""
+    raw = None
+    names = None
+
+
+def read_names(data, offset):
+    """Sequence of strings at offset (aligned to 4), returns the list and the offset after it."""
+    offset += -(offset - 4) % 4
+    cached = NameCache.raw
+    if cached is not None and data.startswith(cached, offset):
+        return list(NameCache.names), offset + len(cached)
+    start = offset
+    (count,) = UINT32.unpack_from(data, offset)
+    offset += 4
+    names = []
+    for _ in range(count):
+        offset += -(offset - 4) % 4
+        (length,) = UINT32.unpack_from(data, offset)
+        end = offset + 4 + length
+        if length == 0 or end > len(data) or data[end - 1] != 0:
+            raise LayoutError("invalid string")
+        names.append(data[offset + 4:end - 1].decode())
+        offset = end
+    NameCache.raw = data[start:offset]
+    NameCache.names = names
+    return list(names), offset
+
+
+def decode_joint_state(data):
+    """
+    (sec, nanosec, frame_id, names, position, velocity, effort) of CDR data, raises LayoutError (or
+    struct.error on truncated data) when the data does not have the JointState layout. Data other than bytes
+    (memoryview, bytearray) is copied to bytes first.
+    """
+    if not isinstance(data, bytes):
+        data = bytes(data)
+    if data[:2] != CDR_LE:
+        raise LayoutError("not little endian CDR")
+    sec, nanosec, length = HEADER.unpack_from(data, 4)
+    offset = 16 + length
+    if length == 0 or offset > len(data) or data[offset - 1] != 0:
+        raise LayoutError("invalid frame_id")
+    frame_id = data[16:offset - 1].decode()
+    names, offset = read_names(data, offset)
+
+    # position, velocity, effort: uint32 count and the float64s aligned to 8, all viewing one array of the data
+    values = np.frombuffer(data, dtype="<f8", count=(len(data) - 4) // 8, offset=4)
+    arrays = []
+    for _ in range(3):
+        offset += -(offset - 4) % 4
+        (count,) = UINT32.unpack_from(data, offset)
+        offset += 4
+        if count:
+            offset += -(offset - 4) % 8
+        end = offset + 8 * count
+        if end > len(data):
+            raise LayoutError("sequence exceeds the data")
+        arrays.append(values[(offset - 4) // 8:(end - 4) // 8])
+        offset = end
+    # Serializers pad the message to a multiple of 4 bytes
+    if len(data) - offset >= 4:
+        raise LayoutError("unexpected data after the message")
+    return sec, nanosec, frame_id, names, arrays[0], arrays[1], arrays[2]
+
+
+def deserialize_joint_state(rawdata, msgtype=JOINT_STATE):
+    """A JointState of CDR data, with position, velocity and effort viewing rawdata."""
+    try:
+        sec, nanosec, frame_id, names, position, velocity, effort = decode_joint_state(rawdata)
+    except (LayoutError, struct.error, UnicodeDecodeError):
+        return deserialize_cdr(rawdata, msgtype)
+    return JointState(header=Header(stamp=Time(sec=sec, nanosec=nanosec), frame_id=frame_id), name=names,
+                      position=position, velocity=velocity, effort=effort)
+
+
+def deserialize(rawdata, msgtype):
+    """deserialize_cdr, with the zero-copy decoder for JointState."""
+    if msgtype == JOINT_STATE:
+        return deserialize_joint_state(rawdata, msgtype)
+    return deserialize_cdr(rawdata, msgtype)
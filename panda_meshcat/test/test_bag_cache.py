@@ -0,0 +1,41 @@
+import os
+import shutil
+import sys
+from os import path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("rosbags")
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from bag_cache import cache_directory, decode_joint_states, load_joint_states  # noqa: E402
+
+BAG = path.join(path.dirname(path.abspath(__file__)), "..", "..", "bagfiles", "rosbag2_2023_03-2")
+
+
+@pytest.fixture
+def bag(tmp_path):
+    return shutil.copytree(BAG, tmp_path / "bag")
+
+
+def test_cache_matches_decoded_bag(bag):
+    decoded = decode_joint_states(bag)
+    cached = load_joint_states(bag)
+    assert len(cached) == 1016
+    assert isinstance(cached.position, np.memmap)
+    assert cached.names.tolist()[:2] == ["panda_joint1", "panda_joint2"]
+    for column, array in decoded.arrays().items():
+        assert np.array_equal(getattr(cached, column), array)
+
+
+def test_cache_is_rebuilt_when_the_bag_changes(bag):
+    load_joint_states(bag)
+    signature = path.join(cache_directory(bag, "/joint_states"), "signature.json")
+    built = os.stat(signature).st_mtime_ns
+    load_joint_states(bag)
+    assert os.stat(signature).st_mtime_ns == built
+
+    db3 = [f for f in os.listdir(bag) if f.endswith(".db3")][0]
+    os.utime(path.join(bag, db3), ns=(0, 0))
+    load_joint_states(bag)
+    assert os.stat(signature).st_mtime_ns != built
@@ -0,0 +1,61 @@
+import json
+import shutil
+import sqlite3
+import sys
+from os import path
+
+import pytest
+
+pytest.importorskip("rosbags")
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from bag_corpus import find_bags, index_bag, interval_stats, write_index  # noqa: E402
+
+BAG = path.join(path.dirname(path.abspath(__file__)), "..", "..", "bagfiles", "rosbag2_2023_03-2")
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    shutil.copytree(BAG, tmp_path / "complete")
+    # Only the metadata and the -shm/-wal files of an interrupted recording
+    broken = tmp_path / "nested" / "broken"
+    broken.mkdir(parents=True)
+    shutil.copy(path.join(BAG, "metadata.yaml"), broken)
+    (broken / "rosbag2_2023_03-2_0.db3-wal").write_bytes(b"")
+    (tmp_path / "complete.cache").mkdir()
+    (tmp_path / "complete.cache" / "metadata.yaml").write_text("")
+    return tmp_path
+
+
+def test_interval_stats():
+    stats = interval_stats([0, 10, 20, 30, 100, 110], gap_factor=5)
+    assert stats["count"] == 6
+    assert stats["rate_hz"] == pytest.approx(5 / 110e-9)
+    assert stats["gaps"] == 1
+    assert stats["max_gap_s"] == pytest.approx(70e-9)
+    assert interval_stats([5])["rate_hz"] is None
+
+
+def test_index(corpus):
+    bags = find_bags(str(corpus))
+    assert bags == [str(corpus / "complete"), str(corpus / "nested" / "broken")]
+
+    complete, topics = index_bag(bags[0])
+    assert complete["error"] is None
+    assert complete["data_file_exists"] == 1
+    assert complete["messages"] == complete["metadata_messages"] == topics[0]["count"] == topics[0]["metadata_count"]
+    assert complete["duration_s"] == pytest.approx(complete["metadata_duration_s"], abs=1e-6)
+    assert topics[0]["rate_hz"] == pytest.approx(30, rel=0.05)
+
+    broken, topics = index_bag(bags[1])
+    assert broken["error"] is None
+    assert broken["data_file_exists"] == 0
+    assert json.loads(broken["orphan_files"]) == ["rosbag2_2023_03-2_0.db3-wal"]
+    assert broken["messages"] is None
+    assert topics[0]["count"] is None and topics[0]["metadata_count"] > 0
+
+    filename = str(corpus / "index.sqlite")
+    write_index(filename, [index_bag(bag) for bag in bags])
+    with sqlite3.connect(filename) as connection:
+        assert connection.execute("SELECT path FROM bags WHERE data_file_exists = 0").fetchall() == [(bags[1],)]
+        assert connection.execute("SELECT COUNT(*) FROM topics").fetchone() == (2,)
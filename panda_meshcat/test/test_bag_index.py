@@ -0,0 +1,64 @@
+import shutil
+import sqlite3
+import sys
+from os import path
+
+import pytest
+
+pytest.importorskip("rosbags")
+from rosbags.rosbag2 import Reader  # noqa: E402
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+import bag_index  # noqa: E402
+from bag_index import BagIndex  # noqa: E402
+
+BAG = path.join(path.dirname(path.abspath(__file__)), "..", "..", "bagfiles", "rosbag2_2023_03-2")
+TOPIC = "/joint_states"
+
+
+@pytest.fixture
+def bag(tmp_path):
+    return str(shutil.copytree(BAG, tmp_path / "bag"))
+
+
+@pytest.fixture
+def messages():
+    with Reader(BAG) as reader:
+        return [(timestamp, rawdata) for _, timestamp, rawdata in reader.messages()]
+
+
+def test_lookups(bag, messages):
+    with BagIndex(bag) as index:
+        timestamps = [timestamp for timestamp, _ in messages]
+        assert index.topics == {TOPIC: "sensor_msgs/msg/JointState"}
+        assert index.start == timestamps[0]
+        assert index.seek(TOPIC, timestamps[10]) == 10
+        assert index.seek(TOPIC, timestamps[10] + 1) == 11
+        assert index.nearest(TOPIC, timestamps[10] + 1) == 10
+        assert index.nearest(TOPIC, 0) == 0
+        assert index.nearest(TOPIC, timestamps[-1] + 10**9) == len(messages) - 1
+        assert index.range(TOPIC, timestamps[5], timestamps[8]) == (5, 8)
+        assert index.read(TOPIC, 500) == messages[500]
+        assert list(index.messages(TOPIC, timestamps[5], timestamps[8])) == messages[5:8]
+        assert list(index.messages(TOPIC)) == messages
+
+
+def test_index_is_persisted(bag, messages):
+    BagIndex(bag).close()
+    assert path.exists(bag + ".cache/index.npz")
+    with BagIndex(bag) as index:
+        assert index.read(TOPIC, 3) == messages[3]
+
+
+def test_scan_closes_its_connections(bag, monkeypatch):
+    opened = []
+
+    def connect(filename):
+        opened.append(bag_index.sqlite3.connect(f"file:{filename}?mode=ro", uri=True))
+        return opened[-1]
+
+    monkeypatch.setattr(bag_index, "connect", connect)
+    index = bag_index.scan(bag_index.data_files(bag))
+    assert TOPIC in index and len(opened) == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
@@ -0,0 +1,51 @@
+import sys
+from os import path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("rosbags")
+from rosbags.rosbag2 import Reader  # noqa: E402
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from joint_state_cdr import (JOINT_STATE, TYPESTORE, decode_joint_state, deserialize_cdr,  # noqa: E402
+                             deserialize_joint_state)
+
+BAG = path.join(path.dirname(path.abspath(__file__)), "..", "..", "bagfiles", "rosbag2_2023_03-2")
+
+
+def assert_same(expected, msg):
+    assert expected.header == msg.header
+    assert expected.name == msg.name
+    for field in ("position", "velocity", "effort"):
+        assert np.array_equal(getattr(expected, field), getattr(msg, field))
+
+
+@pytest.fixture(scope="module")
+def raws():
+    with Reader(BAG) as reader:
+        return [rawdata for _, _, rawdata in reader.messages()]
+
+
+def test_matches_deserialize_cdr(raws):
+    for raw in raws[:100]:
+        assert_same(deserialize_cdr(raw, JOINT_STATE), deserialize_joint_state(raw))
+
+
+def test_arrays_view_the_data(raws):
+    msg = deserialize_joint_state(raws[0])
+    assert not msg.position.flags.owndata and not msg.position.flags.writeable
+    assert msg.position.base is not None
+
+
+def test_other_layouts_use_the_generic_decoder(raws):
+    expected = deserialize_cdr(raws[0], JOINT_STATE)
+    big_endian = TYPESTORE.serialize_cdr(expected, JOINT_STATE, little_endian=False)
+    assert_same(expected, deserialize_joint_state(big_endian))
+
+    empty = type(expected)(header=expected.header, name=["a"], position=np.array([1.0]),
+                           velocity=np.array([]), effort=np.array([]))
+    assert_same(empty, deserialize_joint_state(TYPESTORE.serialize_cdr(empty, JOINT_STATE)))
+
+    with pytest.raises(ValueError):
+        decode_joint_state(raws[0] + bytes(8))
@@ -3,64 +3,586 @@
 # Simple pipe filter for ROS topic echo messages. Takes comma separated list of extraction rules as an argument. 
 # Without it, it returns the original data.
 #
+# Rules are path expressions of kommons.fieldpath (ROS2_packages/r2d2_publisher/kommons), parsed once at start:
+#
+#    transforms[0].header            attributes and indices
+#    transforms[*].child_frame_id    all items of a list, transforms[1:3] for a slice
+#    transforms[0].transform.{translation, rotation.w}    several fields at once
+#
+# To keep up with /tf and /joint_states rates, only the top-level sections of a message the rules start with
+# are parsed (`position` of a JointState skips header, name, velocity and effort), lists only up to the
+# highest index used (`transforms[0]` skips the other transforms), and messages without them are skipped.
+# The libyaml C loader and dumper are used when PyYAML has them, and output is written once per read from the
+# pipe instead of once per line. With --jobs N the documents of each read are parsed by a pool of N
+# processes; output keeps the input order and at most --in-flight reads are queued, so memory stays flat on
+# endless streams.
+#
+# --format (or the extension of --output) selects the output:
+#
+#    yaml      `## key` and the YAML of its value per key, `---` after each message (default)
+#    ndjson    one JSON object {key: value} per message
+#    csv       one row per message, nested lists and messages flattened to columns such as
+#              transforms[0].transform.translation.x; the header is taken from the first message, or
+#              from the file appended to
+#    npy       the numeric columns as a 2-D float64 array appended in place, column names in <file>.columns
+#    npz       one float64 array per numeric column, written at the end
+#
+# Files are appended to, so a stream can be extracted in several runs and loaded with one np.load. The
+# columns of the first message must then be the ones already in the file.
+#
+# With --bag, messages are read from a rosbag2 directory with the rosbags library instead of stdin, as fast as
+# the disk and CDR decoding allow. Only the connections of the --topic options are deserialized.
+#
 # Example usage:
 #
 #    ros2 topic echo /tf | ./pipefilter.py transforms[0].transform.rotation.w,transforms[0].header
+#    ros2 topic echo /tf | ./pipefilter.py "transforms[*].{child_frame_id,transform.translation}"
+#    ros2 topic echo /joint_states | ./pipefilter.py position --stats
+#    ./pipefilter.py "transforms[*].transform.translation" --jobs 4 < tf_dump.yaml > translations.yaml
+#    ros2 topic echo /joint_states | ./pipefilter.py header.stamp,position -o joints.npy
+#    ./pipefilter.py header.stamp,position --bag bagfiles/rosbag2_2023_03-2 --topic /joint_states -o joints.csv
 #
 
+import argparse
+import codecs
+import collections
+import csv
+import json
+import multiprocessing
+import os
+import re
+import select
+import signal
+import struct
 import sys
+import time
+from os import path
+
+import numpy as np
 import yaml
 
+try:
+    from kommons.fieldpath import compile_path, parse_path, split_paths
+except ImportError:
+    # Not installed: use the copy in the repository next to this script (the script is usually a symlink in ~/bin)
+    sys.path.insert(0, path.join(path.dirname(path.realpath(__file__)), "..", "ROS2_packages", "r2d2_publisher"))
+    from kommons.fieldpath import compile_path, parse_path, split_paths
+
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+CHUNK_SIZE = 1 << 16
+TOP_LEVEL = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*):", re.M)
+LIST_ITEM = "\n- "
+FORMATS = ("yaml", "ndjson", "csv", "npy", "npz")
+TEXT_FORMATS = ("yaml", "ndjson")
+NPY_HEADER_SIZE = 128
+BAG_BATCH_SIZE = 256
+
+
+def read_documents(fd, chunk_size=CHUNK_SIZE):
+    """
+    Yields the complete `---` separated documents read from fd, as one list per read. A fast producer gives
+    long lists, a slow one lists of a single document - output can be flushed per list either way.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    buffer = []
+    while True:
+        data = os.read(fd, chunk_size)
+        if not data:
+            return
+        lines = (pending + decoder.decode(data)).split("\n")
+        pending = lines.pop()
+        documents = []
+        for line in lines:
+            line = line.rstrip("\r")
+            if line == "---":
+                documents.append("\n".join(buffer))
+                buffer = []
+            else:
+                buffer.append(line)
+        if documents:
+            yield documents
+
+
+def read_bag(bag, topics, batch_size=BAG_BATCH_SIZE):
+    """
+    Yields lists of (message type, CDR data) of the topics in a rosbag2 directory, all topics when topics is
+    empty. Messages of other topics are not deserialized.
+    """
+    from rosbags.rosbag2 import Reader
+
+    with Reader(bag) as reader:
+        connections = [c for c in reader.connections if not topics or c.topic in topics]
+        if not connections:
+            available = ", ".join(sorted(set(c.topic for c in reader.connections)))
+            raise ValueError(f"No topic {', '.join(topics)} in {bag}, topics: {available}")
+        batch = []
+        for connection, timestamp, rawdata in reader.messages(connections=connections):
+            batch.append((connection.msgtype, rawdata))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def plain(value):
+    """Dicts, lists and numbers of a value of a deserialized bag message."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, "__dataclass_fields__"):
+        return {name: plain(getattr(value, name)) for name in value.__dataclass_fields__ if not name.startswith("__")}
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    return value
+
+
+def flatten(value, name, out):
+    """Appends the (column, value) pairs of the leaves of value to out, list items as name[i], dict items as name.key."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flatten(item, f"{name}.{key}", out)
+    elif isinstance(value, (list, tuple)):
+        for i, item in enumerate(value):
+            flatten(item, f"{name}[{i}]", out)
+    else:
+        out.append((name, value))
+    return out
+
+
+class PipeFilter(object):
+    """Extracts the requested fields of echoed documents, see the comment at the top."""
 
-keys = []
-if len(sys.argv) > 1:
-    keys = sys.argv[1].split(",")
-
-buffer = []
-
-
-def get_field(data, key):
-    if key is not None and key != "":
-        if key[0] == ".":
-            key = key[1:]
-        if key[0].isalpha(): 
-            prefix = ""
-            rest = key
-            while len(rest ) > 0:
-                c = rest[0]
-                if not c.isalpha():
-                    break
-                else:
-                    prefix += c
-                    rest = rest[1:]
-            return get_field(data[prefix], rest)
-        elif key[0] == "[":
-            prefix, rest = key[1:].split("]")
-            index = int(prefix)
-            return get_field(data[index], rest)
+    def __init__(self, keys, output="yaml", loader=Loader, dumper=Dumper, select=True):
+        if output not in FORMATS:
+            raise ValueError(f"Unknown output format {output}, expected one of {', '.join(FORMATS)}")
+        self.keys = keys
+        self.getters = [compile_path(key) for key in keys]
+        self.output = output
+        self.loader = loader
+        self.dumper = dumper
+        self.messages = 0
+        self.skipped = 0
+        self.errors = 0
+        self.typestore = None
+
+        # Top-level names the rules start with, None when a rule needs the whole document. For each of them the
+        # highest list index used, None when all items are needed.
+        self.roots = None
+        if select and keys:
+            steps = [parse_path(key) for key in keys]
+            if all(s and s[0][0] == "attr" for s in steps):
+                self.roots = {}
+                for s in steps:
+                    index = s[1][1] if len(s) > 1 and s[1][0] == "index" and s[1][1] >= 0 else None
+                    last = self.roots.get(s[0][1], -1)
+                    self.roots[s[0][1]] = None if index is None or last is None else max(index, last)
+
+    def select(self, text):
+        """The text of the sections in self.roots, None when one of them is missing."""
+        starts = [(m.start(), m.group(1)) for m in TOP_LEVEL.finditer(text)]
+        sections = []
+        for i, (start, name) in enumerate(starts):
+            if name in self.roots:
+                end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+                index = self.roots[name]
+                if index is not None:
+                    # Block list items of the echo output start at column 0, cut after item `index`
+                    position = start
+                    for _ in range(index + 2):
+                        position = text.find(LIST_ITEM, position + 1, end)
+                        if position < 0:
+                            break
+                    if position >= 0:
+                        end = position + 1
+                sections.append(text[start:end])
+        if len(sections) < len(self.roots):
+            return None
+        return "".join(sections)
+
+    def parse(self, text):
+        """The parsed document, None when it cannot match the keys."""
+        self.messages += 1
+        if self.roots is not None:
+            text = self.select(text)
+            if text is None:
+                self.skipped += 1
+                return None
+        return yaml.load(text, Loader=self.loader)
+
+    def format(self, data, convert=None):
+        """
+        Output of one parsed document or message: text for the yaml and ndjson formats, a list of
+        (column, value) pairs for the table formats. convert is applied to the extracted values.
+        """
+        if not self.keys:
+            values = {"": data}
         else:
-            print("# Error: unrecognized prefix")
-    return data
+            values = {key: get(data) for key, get in zip(self.keys, self.getters)}
+        if convert is not None:
+            values = {key: convert(value) for key, value in values.items()}
+        if self.output == "yaml":
+            if not self.keys:
+                return yaml.dump(values[""], Dumper=self.dumper) + "\n---\n"
+            parts = []
+            for key, value in values.items():
+                parts.append(f"## {key}\n")
+                parts.append(yaml.dump(value, Dumper=self.dumper))
+                parts.append("\n")
+            parts.append("---\n")
+            return "".join(parts)
+        if self.output == "ndjson":
+            return json.dumps(values if self.keys else values[""], default=str) + "\n"
+        row = []
+        for key, value in values.items():
+            flatten(value, key, row)
+        return row
+
+    def batch(self, documents):
+        """Outputs of a list of documents, joined to one string for the text formats."""
+        outputs = []
+        for text in documents:
+            try:
+                data = self.parse(text)
+                if data is not None:
+                    outputs.append(self.format(data))
+            except Exception:
+                self.errors += 1
+                if self.output == "yaml":
+                    outputs.append("# Error parsing YAML!\n")
+        return "".join(outputs) if self.output in TEXT_FORMATS else outputs
+
+    def bag_batch(self, messages):
+        """Outputs of a list of (message type, CDR data) of read_bag, like batch."""
+        if self.typestore is None:
+            # Message definitions of ROS 2 Foxy, the rosbags.serde functions are deprecated
+            from rosbags.typesys import Stores, get_typestore
+            self.typestore = get_typestore(Stores.ROS2_FOXY)
+
+        outputs = []
+        for msgtype, rawdata in messages:
+            self.messages += 1
+            try:
+                outputs.append(self.format(self.typestore.deserialize_cdr(rawdata, msgtype), plain))
+            except Exception:
+                self.errors += 1
+                if self.output == "yaml":
+                    outputs.append("# Error extracting fields!\n")
+        return "".join(outputs) if self.output in TEXT_FORMATS else outputs
+
+
+class TextWriter(object):
+    """Writes the yaml and ndjson output."""
+
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, batch):
+        self.out.write(batch)
+
+    def flush(self):
+        self.out.flush()
+
+    def close(self):
+        self.flush()
+
+
+class TableWriter(object):
+    """
+    Base of the table formats: the columns are the ones of the first row, later rows are matched by column
+    name - missing values are left empty (NaN for NumPy), additional ones are dropped.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.index = None
+
+    def start(self, columns):
+        self.columns = columns
+        self.index = {name: i for i, name in enumerate(columns)}
+
+    def align(self, row, missing):
+        if len(row) == len(self.columns) and all(name == column for (name, _), column in zip(row, self.columns)):
+            return [value for _, value in row]
+        values = [missing] * len(self.columns)
+        for name, value in row:
+            i = self.index.get(name)
+            if i is not None:
+                values[i] = value
+        return values
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class CsvWriter(TableWriter):
+    """
+    CSV rows under the header of the first row. header is the one of the file appended to, it is not written
+    again and the first row must have the same columns.
+    """
 
-def write_buffer(buffer, keys):
-    txt = "\n".join(buffer)
+    def __init__(self, out, header=None):
+        super().__init__()
+        self.out = out
+        self.header = header
+        self.writer = csv.writer(out, lineterminator="\n")
+
+    def write(self, rows):
+        for row in rows:
+            if self.columns is None:
+                columns = [name for name, _ in row]
+                if self.header is None:
+                    self.writer.writerow(columns)
+                elif columns != self.header:
+                    raise ValueError(f"{getattr(self.out, 'name', 'output')} has other columns, cannot append")
+                self.start(columns)
+            self.writer.writerow(self.align(row, ""))
+
+    def flush(self):
+        self.out.flush()
+
+
+def read_csv_header(filename):
+    """The header row of an existing CSV file, None when there is no file or it is empty."""
+    if not path.exists(filename):
+        return None
+    with open(filename, newline="") as f:
+        return next(csv.reader(f), None)
+
+
+def numeric(row):
+    """The numeric items of a row, as floats."""
+    return [(name, float(value)) for name, value in row if isinstance(value, (int, float))]
+
+
+def numeric_columns(row, filename):
+    """The columns of the first numeric row of a .npy or .npz output, which needs at least one."""
+    columns = [name for name, _ in row]
+    if not columns:
+        raise ValueError(f"{filename}: no numeric field in the first message")
+    return columns
+
+
+class NpyWriter(TableWriter):
+    """
+    Rows of floats appended in place to a 2-D float64 .npy file, which np.load(filename, mmap_mode="r") reads
+    while it grows. The header has a fixed size and its shape is rewritten on every flush. The column names
+    are stored beside it in <filename>.columns, one per line. An existing file is appended to when its columns
+    are the same.
+    """
+
+    def __init__(self, filename):
+        super().__init__()
+        self.filename = filename
+        self.file = None
+        self.rows = 0
+
+    def header(self):
+        text = "{'descr': '<f8', 'fortran_order': False, 'shape': (%d, %d), }" % (self.rows, len(self.columns))
+        text = text.ljust(NPY_HEADER_SIZE - 11) + "\n"
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(text)) + text.encode("latin1")
+
+    def open(self, columns):
+        self.start(columns)
+        columns_file = self.filename + ".columns"
+        if path.exists(self.filename):
+            with open(columns_file) as f:
+                existing = f.read().splitlines()
+            if existing != columns:
+                raise ValueError(f"{self.filename} has other columns, cannot append")
+            self.file = open(self.filename, "r+b")
+            if np.lib.format.read_magic(self.file) != (1, 0):
+                raise ValueError(f"{self.filename} was not written by pipefilter, cannot append")
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(self.file)
+            if self.file.tell() != NPY_HEADER_SIZE or fortran_order or dtype != np.float64 or shape[1:] != (
+                    len(columns),):
+                raise ValueError(f"{self.filename} was not written by pipefilter, cannot append")
+            self.rows = shape[0]
+            self.file.truncate(NPY_HEADER_SIZE + self.rows * len(columns) * 8)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            with open(columns_file, "w") as f:
+                f.write("".join(name + "\n" for name in columns))
+            self.file = open(self.filename, "w+b")
+            self.file.write(self.header())
+
+    def write(self, rows):
+        rows = [numeric(row) for row in rows]
+        if not rows:
+            return
+        if self.file is None:
+            self.open(numeric_columns(rows[0], self.filename))
+        values = np.array([self.align(row, np.nan) for row in rows], dtype="<f8").reshape(len(rows), -1)
+        self.file.write(values.tobytes())
+        self.rows += len(rows)
+
+    def flush(self):
+        if self.file is not None:
+            self.file.seek(0)
+            self.file.write(self.header())
+            self.file.seek(0, os.SEEK_END)
+            self.file.flush()
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+
+
+class NpzWriter(TableWriter):
+    """
+    One float64 array per column in a .npz file, np.load(filename)[column]. Rows are kept in memory and the
+    file is written on close - appended to the arrays of an existing file with the same columns. Use .npy
+    for endless streams.
+    """
+
+    def __init__(self, filename):
+        super().__init__()
+        self.filename = filename
+        self.values = []
+
+    def write(self, rows):
+        for row in rows:
+            row = numeric(row)
+            if self.columns is None:
+                self.start(numeric_columns(row, self.filename))
+            self.values.append(self.align(row, np.nan))
+
+    def close(self):
+        if self.columns is None:
+            return
+        values = np.array(self.values, dtype=np.float64).reshape(len(self.values), len(self.columns))
+        arrays = {name: values[:, i] for i, name in enumerate(self.columns)}
+        if path.exists(self.filename):
+            with np.load(self.filename) as existing:
+                if sorted(existing.files) != sorted(self.columns):
+                    raise ValueError(f"{self.filename} has other columns, cannot append")
+                arrays = {name: np.concatenate([existing[name], column]) for name, column in arrays.items()}
+        np.savez(self.filename, **arrays)
+
+
+def open_writer(output, filename):
+    if output in ("npy", "npz"):
+        if filename is None:
+            raise ValueError(f"--format {output} needs --output")
+        return NpyWriter(filename) if output == "npy" else NpzWriter(filename)
+    if filename is None:
+        return CsvWriter(sys.stdout) if output == "csv" else TextWriter(sys.stdout)
+    if output == "csv":
+        # Appended rows go under the header already in the file
+        header = read_csv_header(filename)
+        return CsvWriter(open(filename, "a", newline=""), header)
+    return TextWriter(open(filename, "a", newline=""))
+
+
+def run_serial(pipe, batches, writer, bag=False):
+    """Filter the batches of read_documents or read_bag into writer in this process, counting in pipe."""
+    batch = pipe.bag_batch if bag else pipe.batch
+    for documents in batches:
+        writer.write(batch(documents))
+        writer.flush()
+
+
+worker = None
+
+
+def init_worker(keys, output):
+    global worker
+    worker = PipeFilter(keys, output)
+    # Ctrl-C is handled by the main process, which terminates the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def worker_batch(documents, bag):
+    """Output of a list of documents in a pool worker, with the numbers of messages, skipped and errors."""
+    messages, skipped, errors = worker.messages, worker.skipped, worker.errors
+    output = worker.bag_batch(documents) if bag else worker.batch(documents)
+    return output, worker.messages - messages, worker.skipped - skipped, worker.errors - errors
+
+
+def run_parallel(pipe, batches, writer, jobs, in_flight=None, fd=None, bag=False):
+    """
+    Filter the batches of read_documents or read_bag into writer with a pool of jobs processes, one task per
+    batch, counting in pipe. Results are written in input order; at most in_flight tasks (default 2 * jobs)
+    are queued. When fd, the input of the batches, is idle, queued results are written without waiting.
+    """
+    in_flight = in_flight or 2 * jobs
+    pending = collections.deque()
+
+    def write(result):
+        output, messages, skipped, errors = result.get()
+        pipe.messages += messages
+        pipe.skipped += skipped
+        pipe.errors += errors
+        writer.write(output)
+
+    with multiprocessing.Pool(jobs, initializer=init_worker, initargs=(pipe.keys, pipe.output)) as pool:
+        for documents in batches:
+            pending.append(pool.apply_async(worker_batch, (documents, bag)))
+            while len(pending) >= in_flight or (pending and pending[0].ready()):
+                write(pending.popleft())
+            if pending and fd is not None and not select.select([fd], [], [], 0)[0]:
+                # Input is idle: finish what is queued instead of holding it until the next read
+                while pending:
+                    write(pending.popleft())
+            writer.flush()
+        while pending:
+            write(pending.popleft())
+        writer.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract fields from `ros2 topic echo` output.")
+    parser.add_argument("keys", nargs="?", default="", help="comma separated paths, e.g. transforms[0].header")
+    parser.add_argument("--format", choices=FORMATS, default=None,
+                        help="output format, by default the extension of --output or yaml")
+    parser.add_argument("--output", "-o", default=None, help="output file, appended to; stdout by default")
+    parser.add_argument("--bag", default=None, help="read a rosbag2 directory instead of stdin")
+    parser.add_argument("--topic", action="append", default=[],
+                        help="topic of --bag, can be repeated; all topics by default")
+    parser.add_argument("--stats", action="store_true", help="print messages per second to stderr at the end")
+    parser.add_argument("--jobs", type=int, default=1, help="number of parsing processes")
+    parser.add_argument("--in-flight", type=int, default=None,
+                        help="reads queued in the pool at most (default 2 * jobs)")
+    args = parser.parse_args()
+
+    output = args.format
+    if output is None:
+        extension = path.splitext(args.output or "")[1].lstrip(".")
+        output = extension if extension in FORMATS else "yaml"
     try:
-        data = yaml.safe_load(txt)
-        datas = [get_field(data, key) for key in keys]        
-        for data, key in zip(datas, keys):
-            print(f"## {key}")
-            print(yaml.dump(data))
-        print("---")
-    except:
-        print("# Error parsing YAML!")
-
-
-for line in sys.stdin:
-    line = line.rstrip("\r\n")
-    if line == "---":
-        write_buffer(buffer, keys)
-        buffer = []
-    else:
-        buffer.append(line)
+        pipe = PipeFilter(split_paths(args.keys), output)
+        writer = open_writer(output, args.output)
+    except ValueError as e:
+        parser.error(str(e))
+
+    bag = args.bag is not None
+    fd = None if bag else sys.stdin.fileno()
+    batches = read_bag(args.bag, args.topic) if bag else read_documents(fd)
+    start = time.perf_counter()
+    try:
+        if args.jobs > 1:
+            run_parallel(pipe, batches, writer, args.jobs, args.in_flight, fd, bag)
+        else:
+            run_serial(pipe, batches, writer, bag)
+    except ValueError as e:
+        parser.error(str(e))
+    except (BrokenPipeError, KeyboardInterrupt):
+        # Reader went away (| head) or Ctrl-C: stop quietly, without a second error flushing stdout at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    writer.close()
+    if args.stats:
+        elapsed = time.perf_counter() - start
+        print(f"# {pipe.messages} messages ({pipe.skipped} skipped, {pipe.errors} errors) in {elapsed:.2f} s, "
+              f"{pipe.messages / max(elapsed, 1e-9):.0f} msg/s", file=sys.stderr)
 
 
+if __name__ == "__main__":
+    main()
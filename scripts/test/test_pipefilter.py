@@ -0,0 +1,127 @@
+import csv
+import io
+import subprocess
+import sys
+from os import path
+
+import numpy as np
+import pytest
+
+SCRIPTS = path.dirname(path.dirname(path.abspath(__file__)))
+BAG = path.join(SCRIPTS, "..", "bagfiles", "rosbag2_2023_03-2")
+
+sys.path.insert(0, SCRIPTS)
+from pipefilter import (PipeFilter, TextWriter, flatten, open_writer, run_parallel,  # noqa: E402
+                        run_serial)
+
+
+def tf_document(i):
+    return (f"transforms:\n- header:\n    stamp:\n      sec: {i}\n      nanosec: 0\n    frame_id: world\n"
+            f"  child_frame_id: link{i}\n  transform:\n    translation:\n      x: {i}.5\n      y: 0.0\n"
+            f"      z: 1.0\n")
+
+
+def rows(keys, documents):
+    pipe = PipeFilter(keys, "csv")
+    return pipe.batch(documents)
+
+
+def test_flatten():
+    value = {"a": [1, {"b": 2.5}], "c": "text"}
+    assert flatten(value, "key", []) == [("key.a[0]", 1), ("key.a[1].b", 2.5), ("key.c", "text")]
+    assert flatten(3, "x", []) == [("x", 3)]
+    assert flatten([], "empty", []) == []
+
+
+def test_csv_append_keeps_one_header(tmp_path):
+    filename = str(tmp_path / "tf.csv")
+    keys = ["transforms[0].header.stamp.sec", "transforms[0].transform.translation"]
+    for run in range(2):
+        writer = open_writer("csv", filename)
+        writer.write(rows(keys, [tf_document(2 * run), tf_document(2 * run + 1)]))
+        writer.close()
+        writer.out.close()
+
+    with open(filename, newline="") as f:
+        table = list(csv.reader(f))
+    assert table[0] == ["transforms[0].header.stamp.sec", "transforms[0].transform.translation.x",
+                        "transforms[0].transform.translation.y", "transforms[0].transform.translation.z"]
+    assert [row[0:2] for row in table[1:]] == [["0", "0.5"], ["1", "1.5"], ["2", "2.5"], ["3", "3.5"]]
+
+
+def test_csv_append_rejects_other_columns(tmp_path):
+    filename = str(tmp_path / "tf.csv")
+    writer = open_writer("csv", filename)
+    writer.write(rows(["transforms[0].header.stamp.sec"], [tf_document(0)]))
+    writer.out.close()
+
+    writer = open_writer("csv", filename)
+    with pytest.raises(ValueError, match="other columns"):
+        writer.write(rows(["transforms[0].child_frame_id"], [tf_document(1)]))
+    writer.out.close()
+
+
+@pytest.mark.parametrize("output", ["npy", "npz"])
+def test_numeric_append_round_trip(tmp_path, output):
+    filename = str(tmp_path / f"tf.{output}")
+    keys = ["transforms[0].header.stamp.sec", "transforms[0].child_frame_id", "transforms[0].transform.translation.x"]
+    for run in range(2):
+        writer = open_writer(output, filename)
+        writer.write(rows(keys, [tf_document(i) for i in range(3 * run, 3 * run + 3)]))
+        writer.close()
+
+    expected = np.array([[i, i + 0.5] for i in range(6)])
+    if output == "npy":
+        np.testing.assert_array_equal(np.load(filename), expected)
+        with open(filename + ".columns") as f:
+            assert f.read().splitlines() == [keys[0], keys[2]]
+    else:
+        with np.load(filename) as arrays:
+            np.testing.assert_array_equal(arrays[keys[0]], expected[:, 0])
+            np.testing.assert_array_equal(arrays[keys[2]], expected[:, 1])
+
+    writer = open_writer(output, filename)
+    with pytest.raises(ValueError, match="other columns"):
+        writer.write(rows(keys[0:1], [tf_document(6)]))
+        writer.close()
+
+
+@pytest.mark.parametrize("output", ["npy", "npz"])
+def test_numeric_output_needs_a_numeric_field(tmp_path, output):
+    writer = open_writer(output, str(tmp_path / f"tf.{output}"))
+    with pytest.raises(ValueError, match="no numeric field"):
+        writer.write(rows(["transforms[0].child_frame_id"], [tf_document(0)]))
+
+
+def test_jobs_keep_the_input_order():
+    keys = ["transforms[0].child_frame_id", "transforms[0].transform.translation.x"]
+    batches = [[tf_document(i) for i in range(start, start + 3)] for start in range(0, 60, 3)]
+
+    serial = io.StringIO()
+    run_serial(PipeFilter(keys, "ndjson"), batches, TextWriter(serial))
+    parallel = io.StringIO()
+    pipe = PipeFilter(keys, "ndjson")
+    run_parallel(pipe, batches, TextWriter(parallel), jobs=3, in_flight=4)
+
+    assert parallel.getvalue() == serial.getvalue()
+    assert len(parallel.getvalue().splitlines()) == pipe.messages == 60
+    assert '"link59"' in parallel.getvalue().splitlines()[-1]
+
+
+def test_bag_topic(tmp_path):
+    pytest.importorskip("rosbags")
+    filename = str(tmp_path / "joints.npy")
+    result = subprocess.run([sys.executable, path.join(SCRIPTS, "pipefilter.py"), "header.stamp,position",
+                             "--bag", BAG, "--topic", "/joint_states", "-o", filename],
+                            capture_output=True, text=True, check=True)
+    # No deprecation warnings of rosbags
+    assert result.stderr == ""
+    joints = np.load(filename)
+    assert joints.shape == (1016, 11)
+    assert np.all(np.diff(joints[:, 0] + joints[:, 1] * 1e-9) >= 0.0)
+    np.testing.assert_allclose(joints[0, 3], -0.7842164701913532)
+
+    result = subprocess.run([sys.executable, path.join(SCRIPTS, "pipefilter.py"), "position",
+                             "--bag", BAG, "--topic", "/tf"], capture_output=True, text=True)
+    assert result.returncode != 0
+    assert "No topic /tf" in result.stderr